@@ -0,0 +1,89 @@
+"""
+Recall@1 and queries/sec of the ANN options in core.ann_index against
+brute-force search, on synthetic face-like embeddings (identities drawn
+around a few hundred "demographic" centres, queries are noisy re-captures
+of enrolled faces):
+
+    python benchmarks/ann_recall.py --sizes 10000,50000,100000 --nprobe 4,8,16,32
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+import numpy as np  # noqa: E402
+
+from core.ann_index import build_hnsw, build_ivf, search_hnsw, search_ivf, top_k  # noqa: E402
+
+
+def normalise(x):
+    return (x / np.linalg.norm(x, axis=-1, keepdims=True)).astype(np.float32)
+
+
+def synthetic_embeddings(n, queries, dim, seed=0):
+    rng = np.random.default_rng(seed)
+    centres = rng.normal(size=(256, dim))
+    faces = normalise(centres[rng.integers(0, len(centres), n)] + rng.normal(scale=0.8, size=(n, dim)))
+    targets = rng.integers(0, n, queries)
+    query = normalise(faces[targets] + rng.normal(scale=0.35 / np.sqrt(dim) * 4, size=(queries, dim)))
+    return faces, query
+
+
+def measure(search, queries, truth):
+    start = time.perf_counter()
+    found = [search(q) for q in queries]
+    seconds = time.perf_counter() - start
+    recall = sum(1 for f, t in zip(found, truth) if f == t) / len(truth)
+    return {"recall_at_1": round(recall, 4), "qps": round(len(queries) / seconds, 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10000,50000,100000")
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--dim", type=int, default=128)
+    parser.add_argument("--nprobe", default="4,8,16,32")
+    parser.add_argument("--ef", default="32,64,128", help="hnswlib ef values (when installed)")
+    args = parser.parse_args()
+
+    try:
+        import hnswlib  # noqa: F401
+        has_hnsw = True
+    except ImportError:
+        has_hnsw = False
+
+    results = {"dim": args.dim, "queries": args.queries, "sizes": {}}
+    for n in (int(s) for s in args.sizes.split(",")):
+        faces, queries = synthetic_embeddings(n, args.queries, args.dim)
+        truth = [int(top_k(faces @ q, 1)[0]) for q in queries]
+
+        row = {"brute_force": measure(lambda q: int(top_k(faces @ q, 1)[0]), queries, truth)}
+
+        start = time.perf_counter()
+        ivf = build_ivf(faces)
+        row["ivf_build_seconds"] = round(time.perf_counter() - start, 2)
+        row["ivf_nlist"] = len(ivf["centroids"])
+        for nprobe in (int(p) for p in args.nprobe.split(",")):
+            row[f"ivf_nprobe_{nprobe}"] = measure(
+                lambda q: search_ivf(ivf, faces, q, 1, nprobe)[0][0], queries, truth
+            )
+
+        if has_hnsw:
+            start = time.perf_counter()
+            hnsw = build_hnsw(faces)
+            row["hnsw_build_seconds"] = round(time.perf_counter() - start, 2)
+            for ef in (int(e) for e in args.ef.split(",")):
+                row[f"hnsw_ef_{ef}"] = measure(lambda q: search_hnsw(hnsw, q, 1, ef)[0][0], queries, truth)
+
+        results["sizes"][str(n)] = row
+        print(f"{n} faces done", file=sys.stderr)
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Sync vs. async attendance pipeline against local stubs.
+
+Runs mark_batch_attendance_s3 and mark_batch_attendance_async on the same
+synthetic roster with fixed per-call S3/Rekognition latency, for a range of
+AWS_MAX_CONCURRENCY values:
+
+    python benchmarks/async_concurrency.py --students 40 --images 2 --latency 0.02
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from benchmarks.stubs import StubRekognition, StubS3, install, synthetic_jpeg  # noqa: E402
+
+BUCKET = "ict-attendances"
+BATCH = "bench-batch"
+
+
+def build_roster(s3, students):
+    for i in range(students):
+        er = f"{92310000000 + i}"
+        s3.put_object(Bucket=BUCKET, Key=f"{BATCH}/{er}_Student{i}_1.jpg", Body=f"ref:{er}".encode())
+
+
+def group_files(images):
+    return [io.BytesIO(synthetic_jpeg(seed)) for seed in range(images)]
+
+
+def run_sync(args):
+    from core.mark_batch_attendance import mark_batch_attendance_s3
+
+    start = time.perf_counter()
+    present, absent, _, _, _ = mark_batch_attendance_s3(BATCH, "lab", "bench", group_files(args.images), s3_bucket=BUCKET)
+    return time.perf_counter() - start, len(present), len(absent)
+
+
+def run_async(args, concurrency):
+    import core.async_attendance as async_attendance
+
+    async_attendance.AWS_MAX_CONCURRENCY = concurrency
+    async_attendance._executor = None
+
+    start = time.perf_counter()
+    present, absent, _, _, _ = asyncio.run(
+        async_attendance.mark_batch_attendance_async(BATCH, "lab", "bench", group_files(args.images), s3_bucket=BUCKET)
+    )
+    return time.perf_counter() - start, len(present), len(absent)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--students", type=int, default=40)
+    parser.add_argument("--images", type=int, default=2)
+    parser.add_argument("--latency", type=float, default=0.02, help="seconds per stubbed AWS call")
+    parser.add_argument("--concurrency", default="1,4,10,32", help="comma separated AWS_MAX_CONCURRENCY values")
+    args = parser.parse_args()
+
+    s3 = StubS3(latency=args.latency)
+    rekognition = StubRekognition(latency=args.latency)
+    install(s3, rekognition)
+    build_roster(s3, args.students)
+
+    os.chdir(tempfile.mkdtemp(prefix="attendance-bench-"))
+
+    seconds, present, absent = run_sync(args)
+    results = {
+        "students": args.students,
+        "images": args.images,
+        "latency_per_call": args.latency,
+        "sync": {"seconds": round(seconds, 3), "present": present, "absent": absent},
+        "async": {},
+    }
+
+    for concurrency in (int(c) for c in args.concurrency.split(",")):
+        seconds, present, absent = run_async(args, concurrency)
+        results["async"][str(concurrency)] = {
+            "seconds": round(seconds, 3),
+            "speedup": round(results["sync"]["seconds"] / seconds, 2),
+            "present": present,
+            "absent": absent,
+        }
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
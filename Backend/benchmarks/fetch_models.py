@@ -0,0 +1,72 @@
+"""
+Downloads the ONNX models the local recognition backend loads
+(core.local_recognition) from opencv_zoo, to LOCAL_DETECTOR_MODEL and
+LOCAL_EMBEDDING_MODEL (models/ under the working directory by default).
+Files already present are left alone.
+
+    python benchmarks/fetch_models.py
+    python benchmarks/fetch_models.py --force
+"""
+import argparse
+import json
+import os
+import sys
+import urllib.request
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from core.local_recognition import LOCAL_DETECTOR_MODEL, LOCAL_EMBEDDING_MODEL  # noqa: E402
+
+ZOO = "https://github.com/opencv/opencv_zoo/raw/main/models"
+MODELS = {
+    LOCAL_DETECTOR_MODEL: f"{ZOO}/face_detection_yunet/face_detection_yunet_2023mar.onnx",
+    LOCAL_EMBEDDING_MODEL: f"{ZOO}/face_recognition_sface/face_recognition_sface_2021dec.onnx",
+}
+
+
+def fetch(url, path):
+    """Download to a temporary name first, so an interrupted run leaves no partial model."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.part"
+    with urllib.request.urlopen(url, timeout=60) as response, open(tmp, "wb") as f:
+        while chunk := response.read(1 << 20):
+            f.write(chunk)
+    os.replace(tmp, path)
+    return os.path.getsize(path)
+
+
+def check(path):
+    """Loads the model the way LocalRecognitionClient does; raises if OpenCV cannot."""
+    import cv2
+
+    if "detection" in os.path.basename(path):
+        cv2.FaceDetectorYN.create(path, "", (320, 320))
+    else:
+        cv2.FaceRecognizerSF.create(path, "")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--force", action="store_true", help="download even if the file exists")
+    args = parser.parse_args()
+
+    summary = {}
+    for path, url in MODELS.items():
+        if os.path.exists(path) and not args.force:
+            summary[path] = "present"
+            continue
+        try:
+            size = fetch(url, path)
+            check(path)
+            summary[path] = f"downloaded ({size} bytes)"
+        except Exception as e:
+            print(f"Could not fetch {url}: {e}", file=sys.stderr)
+            summary[path] = "missing"
+    print(json.dumps(summary, indent=2))
+    if "missing" in summary.values():
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
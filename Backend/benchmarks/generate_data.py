@@ -0,0 +1,230 @@
+"""
+Seeded load-test data for the backend, in the layouts it writes itself:
+
+    <batch>/<ER>_<Name>_<n>.jpg                 reference photos (upload_multiple_images)
+    students.xlsx                               roster workbook (update_student_excel)
+    reports/<YYYYMMDD>_<batch>_<section>_<subject>.xlsx
+                                                one report per class (save_attendance_to_excel
+                                                columns, parse_metadata_from_filename name)
+
+Every batch is split into sections; each section has --classes-per-day classes
+on weekdays for --months months. Students keep their own attendance rate
+(--min-rate..--max-rate), so some fall below the eligibility threshold.
+Objects are built and uploaded on --workers threads; the same arguments
+always produce the same bytes (see the digest in the summary).
+
+From Python, generate(StubS3(), bucket, parse_args([...])) fills the
+in-memory stub instead.
+
+Upload to a local S3 emulator (MinIO, LocalStack), or to a directory laid out
+as <bucket>/<key> (for `aws s3 sync`) when no endpoint is given:
+
+    python benchmarks/generate_data.py --batches 4 --students 500 --months 6 --endpoint-url http://localhost:9000
+    python benchmarks/generate_data.py --batches 2 --students 120 --months 3 --out generated/
+"""
+import argparse
+import hashlib
+import json
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from benchmarks import synthetic  # noqa: E402
+from benchmarks.stubs import synthetic_jpeg  # noqa: E402
+
+SUBJECTS = ("OS", "CN", "DBMS", "AI")
+PHOTO_SIZE = 160
+
+
+class DirectoryS3:
+    """put_object into <root>/<bucket>/<key>: a stand-in that outlives the process."""
+
+    def __init__(self, root):
+        self.root = root
+
+    def put_object(self, Bucket, Key, Body=b"", **kwargs):
+        path = os.path.join(self.root, Bucket, Key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(Body)
+        return {}
+
+
+def batch_names(count, first_year=2022):
+    return [f"{first_year + i}-{first_year + i + 4}" for i in range(count)]
+
+
+def section_names(count):
+    return [chr(ord("A") + i) for i in range(count)]
+
+
+def _add_months(day, months):
+    month = day.month - 1 + months
+    year, month = day.year + month // 12, month % 12 + 1
+    return day.replace(year=year, month=month, day=1)
+
+
+def class_days(start, months):
+    """Weekdays from start up to `months` calendar months later."""
+    end = _add_months(start, months)
+    day = start
+    while day < end:
+        if day.weekday() < 5:
+            yield day
+        day += timedelta(days=1)
+
+
+def build_students(batches, students, sections, seed, min_rate, max_rate):
+    """
+    {batch: [{"er", "name", "phone", "section", "rate"}]}, students dealt to
+    sections in turn, each with a fixed attendance rate.
+    """
+    rng = random.Random(f"{seed}:students")
+    roster = {}
+    for b, batch in enumerate(batches):
+        people = synthetic.students(students, seed=f"{seed}:{batch}", first_er=92200000000 + b * 1000000)
+        roster[batch] = [
+            {
+                "er": er,
+                "name": name,
+                "phone": f"9{rng.randrange(10**8, 10**9)}",
+                "section": sections[i % len(sections)],
+                "rate": rng.uniform(min_rate, max_rate),
+            }
+            for i, (er, name) in enumerate(people)
+        ]
+    return roster
+
+
+def plan_objects(args):
+    """(key, build) for every object, build() returning its bytes; cheap to enumerate."""
+    batches = batch_names(args.batches)
+    sections = section_names(args.sections)
+    roster = build_students(batches, args.students, sections, args.seed, args.min_rate, args.max_rate)
+
+    start = datetime.strptime(args.start, "%Y-%m-%d")
+    enrolled_at = start - timedelta(days=7)
+
+    for batch in batches:
+        for student in roster[batch]:
+            for n in range(1, args.photos + 1):
+                key = synthetic.reference_key(batch, student["er"], student["name"], n)
+                photo_seed = int(hashlib.sha1(f"{args.seed}:{key}".encode()).hexdigest()[:8], 16)
+                yield key, lambda s=photo_seed: synthetic_jpeg(s, PHOTO_SIZE, PHOTO_SIZE)
+
+    yield "students.xlsx", lambda: synthetic.students_workbook(
+        {batch: [(s["er"], s["name"], s["phone"]) for s in roster[batch]] for batch in batches},
+        uploaded_at=enrolled_at,
+    )
+
+    subjects = args.subjects.split(",")
+    for d, day in enumerate(class_days(start, args.months)):
+        for batch in batches:
+            for section in sections:
+                members = [s for s in roster[batch] if s["section"] == section]
+                for slot in range(min(args.classes_per_day, len(subjects))):
+                    subject = subjects[(d * args.classes_per_day + slot) % len(subjects)]
+                    taken_at = day.replace(hour=9 + slot, minute=0)
+                    key = f"reports/{synthetic.report_filename(taken_at, batch, section, subject)}"
+                    yield key, lambda k=key, m=members, b=batch, sec=section, sub=subject, t=taken_at: _report(
+                        args.seed, k, m, b, sec, sub, t
+                    )
+
+
+def _report(seed, key, members, batch, section, subject, taken_at):
+    rng = random.Random(f"{seed}:{key}")
+    present, absent = [], []
+    for s in members:
+        (present if rng.random() < s["rate"] else absent).append((s["er"], s["name"]))
+    return synthetic.report_workbook(present, absent, batch, section, subject, taken_at)
+
+
+def generate(s3, bucket, args):
+    """Build and upload every planned object on args.workers threads; returns a summary."""
+    digests = {}
+    counts = {"photos": 0, "workbooks": 0, "reports": 0}
+    total_bytes = 0
+    lock = threading.Lock()
+    # Bounded, so a large plan never has every object in memory at once
+    slots = threading.BoundedSemaphore(args.workers * 4)
+
+    def upload(key, build):
+        nonlocal total_bytes
+        try:
+            body = build()
+            s3.put_object(Bucket=bucket, Key=key, Body=body)
+        finally:
+            slots.release()
+        kind = "reports" if key.startswith("reports/") else "workbooks" if key.endswith(".xlsx") else "photos"
+        with lock:
+            digests[key] = hashlib.sha256(body).hexdigest()
+            counts[kind] += 1
+            total_bytes += len(body)
+
+    started = time.perf_counter()
+    futures = []
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        for key, build in plan_objects(args):
+            slots.acquire()
+            futures.append(pool.submit(upload, key, build))
+    for future in futures:
+        future.result()
+
+    manifest = hashlib.sha256("".join(f"{k}:{digests[k]}\n" for k in sorted(digests)).encode())
+    return {
+        "bucket": bucket,
+        "objects": len(digests),
+        **counts,
+        "bytes": total_bytes,
+        "seconds": round(time.perf_counter() - started, 2),
+        "digest": manifest.hexdigest(),
+    }
+
+
+def parse_args(argv=None):
+    """Generator settings; parse_args([]) gives the defaults for use from Python."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batches", type=int, default=2)
+    parser.add_argument("--students", type=int, default=120, help="students per batch")
+    parser.add_argument("--sections", type=int, default=2, help="sections per batch")
+    parser.add_argument("--photos", type=int, default=2, help="reference photos per student")
+    parser.add_argument("--months", type=int, default=3)
+    parser.add_argument("--start", default="2025-07-01", help="first class day (YYYY-MM-DD)")
+    parser.add_argument("--classes-per-day", type=int, default=3, help="classes per section each weekday")
+    parser.add_argument("--subjects", default=",".join(SUBJECTS))
+    parser.add_argument("--min-rate", type=float, default=0.55, help="lowest per-student attendance rate")
+    parser.add_argument("--max-rate", type=float, default=0.98, help="highest per-student attendance rate")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=16, help="parallel uploads")
+    parser.add_argument("--bucket", default=os.getenv("BUCKET_NAME", "ict-attendances"))
+    parser.add_argument("--endpoint-url", help="S3-compatible endpoint (MinIO, LocalStack)")
+    parser.add_argument("--out", default="generated", help="directory to write to when no endpoint is given")
+    return parser.parse_args(argv)
+
+
+def main():
+    args = parse_args()
+    if args.endpoint_url:
+        import boto3
+
+        region = os.getenv("AWS_REGION", "ap-south-1")
+        s3 = boto3.client("s3", endpoint_url=args.endpoint_url, region_name=region)
+        try:
+            s3.create_bucket(Bucket=args.bucket, CreateBucketConfiguration={"LocationConstraint": region})
+        except (s3.exceptions.BucketAlreadyOwnedByYou, s3.exceptions.BucketAlreadyExists):
+            pass
+    else:
+        s3 = DirectoryS3(args.out)
+
+    print(json.dumps(generate(s3, args.bucket, args), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+"""
+HTTP load test: requests/sec and latency percentiles for one endpoint.
+
+Against a running server:
+
+    python benchmarks/load_test.py --url http://localhost:5000/ --concurrency 16 --duration 15
+
+Or start the Flask dev server and the gunicorn profile on free ports and
+compare the two on the same path:
+
+    python benchmarks/load_test.py --compare --path / --concurrency 16 --duration 15
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _worker(url, deadline, latencies, errors, lock):
+    local_latencies = []
+    local_errors = 0
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            with urllib.request.urlopen(url, timeout=30) as resp:
+                resp.read()
+        except urllib.error.HTTPError as e:
+            # Any HTTP answer is a served request; only count 5xx as errors
+            e.read()
+            if e.code >= 500:
+                local_errors += 1
+        except Exception:
+            local_errors += 1
+            continue
+        local_latencies.append(time.perf_counter() - start)
+
+    with lock:
+        latencies.extend(local_latencies)
+        errors.append(local_errors)
+
+
+def run_load(url, concurrency, duration):
+    latencies, errors = [], []
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    threads = [
+        threading.Thread(target=_worker, args=(url, deadline, latencies, errors, lock))
+        for _ in range(concurrency)
+    ]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+
+    def pct(p):
+        if not latencies:
+            return None
+        return round(latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000, 2)
+
+    return {
+        "url": url,
+        "concurrency": concurrency,
+        "duration_seconds": round(elapsed, 2),
+        "requests": len(latencies),
+        "errors": sum(errors),
+        "requests_per_second": round(len(latencies) / elapsed, 1),
+        "latency_ms": {
+            "p50": pct(0.50),
+            "p90": pct(0.90),
+            "p99": pct(0.99),
+            "mean": round(statistics.mean(latencies) * 1000, 2) if latencies else None,
+        },
+    }
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_until_up(url, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            urllib.request.urlopen(url, timeout=2).read()
+            return
+        except urllib.error.HTTPError:
+            return
+        except Exception:
+            time.sleep(0.2)
+    raise RuntimeError(f"Server at {url} did not come up")
+
+
+def _start_server(kind, port):
+    env = dict(os.environ)
+    env.setdefault("AWS_REGION", "ap-south-1")
+    env["PORT"] = str(port)
+
+    if kind == "dev":
+        cmd = [sys.executable, "main.py"]
+    else:
+        cmd = [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "wsgi:app"]
+        env["GUNICORN_BIND"] = f"127.0.0.1:{port}"
+
+    return subprocess.Popen(
+        cmd, cwd=BACKEND_DIR, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        start_new_session=True,
+    )
+
+
+def _stop_server(proc):
+    import signal
+
+    try:
+        os.killpg(proc.pid, signal.SIGTERM)
+        proc.wait(timeout=30)
+    except Exception:
+        os.killpg(proc.pid, signal.SIGKILL)
+
+
+def compare(path, concurrency, duration):
+    results = {}
+    for kind in ("dev", "gunicorn"):
+        port = _free_port()
+        proc = _start_server(kind, port)
+        try:
+            url = f"http://127.0.0.1:{port}{path}"
+            _wait_until_up(url)
+            run_load(url, concurrency, min(2, duration))   # warm-up
+            results[kind] = run_load(url, concurrency, duration)
+        finally:
+            _stop_server(proc)
+
+    dev_rps = results["dev"]["requests_per_second"]
+    if dev_rps:
+        results["speedup"] = round(results["gunicorn"]["requests_per_second"] / dev_rps, 2)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="target URL (single run)")
+    parser.add_argument("--compare", action="store_true", help="start dev server and gunicorn and compare")
+    parser.add_argument("--path", default="/", help="path used with --compare")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=15)
+    args = parser.parse_args()
+
+    if args.compare:
+        result = compare(args.path, args.concurrency, args.duration)
+    elif args.url:
+        result = run_load(args.url, args.concurrency, args.duration)
+    else:
+        parser.error("pass --url or --compare")
+
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
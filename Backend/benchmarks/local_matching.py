@@ -0,0 +1,162 @@
+"""
+Accuracy and throughput of the local recognition backend vs. Rekognition on
+stored fixtures:
+
+    fixtures/references/<ER>_<Name>_<n>.jpg   enrolment photos
+    fixtures/groups/<photo>.jpg               class photos
+    fixtures/expected.json                    {"<photo>.jpg": ["<ER>", ...]}
+
+    python benchmarks/local_matching.py --fixtures path/to/fixtures --backends local,rekognition
+
+make_fixtures.py builds such a set from a directory of portraits. --backends
+stub runs the hash-based StubRekognition instead, which checks the harness
+without models or AWS; its precision and recall mean nothing.
+
+--mode compare runs the full-image comparison path (every reference against
+every group photo); --mode search crops the group photos' faces and searches
+them against a collection (for Rekognition, an existing --collection such as
+"students"; the local backend indexes the references into a scratch one).
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from core.mark_batch_attendance import (  # noqa: E402
+    compare_reference,
+    detect_and_assess,
+    extract_student_details_from_key,
+    search_face_crop,
+    select_image_crops,
+)
+
+
+def load_fixtures(root):
+    ref_dir, group_dir = os.path.join(root, "references"), os.path.join(root, "groups")
+    references = {}
+    for name in sorted(os.listdir(ref_dir)):
+        with open(os.path.join(ref_dir, name), "rb") as f:
+            references[name] = f.read()
+
+    with open(os.path.join(root, "expected.json")) as f:
+        expected = {photo: set(ers) for photo, ers in json.load(f).items()}
+
+    groups = {}
+    for photo in expected:
+        with open(os.path.join(group_dir, photo), "rb") as f:
+            groups[photo] = f.read()
+    return references, groups, expected
+
+
+def make_client(backend):
+    if backend == "stub":
+        from benchmarks.stubs import StubRekognition
+        return StubRekognition()
+    if backend == "local":
+        from core.local_recognition import LocalRecognitionClient
+        return LocalRecognitionClient()
+
+    import boto3
+    from core.aws_clients import AWS_ACCESS_KEY, AWS_REGION, AWS_SECRET_KEY
+    return boto3.client(
+        "rekognition",
+        region_name=AWS_REGION,
+        aws_access_key_id=AWS_ACCESS_KEY,
+        aws_secret_access_key=AWS_SECRET_KEY,
+    )
+
+
+def predict_compare(client, references, group_bytes):
+    present = set()
+    for name, ref_bytes in references.items():
+        er, _ = extract_student_details_from_key(name)
+        if er not in present and compare_reference(client, ref_bytes, group_bytes):
+            present.add(er)
+    return present, len(references)
+
+
+def predict_search(client, roster, group_bytes):
+    _, faces = detect_and_assess(client, group_bytes, 1)
+    crops = select_image_crops(group_bytes, faces, {"image_index": 1})
+    present = {er for er in (search_face_crop(client, c["bytes"], roster) for c in crops) if er}
+    return present, 1 + len(crops)
+
+
+def run_backend(backend, args, references, groups, expected):
+    import core.mark_batch_attendance as pipeline
+
+    client = make_client(backend)
+    roster = dict(extract_student_details_from_key(name) for name in references)
+
+    if args.mode == "search":
+        if backend in ("local", "stub"):
+            pipeline.FACE_COLLECTION_ID = "benchmark"
+            client.create_collection(CollectionId="benchmark")
+            for name, ref_bytes in references.items():
+                client.index_faces(
+                    CollectionId="benchmark", Image={"Bytes": ref_bytes},
+                    ExternalImageId=os.path.splitext(name)[0],
+                )
+        else:
+            pipeline.FACE_COLLECTION_ID = args.collection
+
+    tp = fp = fn = calls = 0
+    start = time.perf_counter()
+    for photo, group_bytes in groups.items():
+        if args.mode == "search":
+            present, n = predict_search(client, roster, group_bytes)
+        else:
+            present, n = predict_compare(client, references, group_bytes)
+        calls += n
+        tp += len(present & expected[photo])
+        fp += len(present - expected[photo])
+        fn += len(expected[photo] - present)
+    seconds = time.perf_counter() - start
+
+    precision = tp / (tp + fp) if tp + fp else 0.0
+    recall = tp / (tp + fn) if tp + fn else 0.0
+    return {
+        "precision": round(precision, 3),
+        "recall": round(recall, 3),
+        "f1": round(2 * precision * recall / (precision + recall), 3) if precision + recall else 0.0,
+        "seconds": round(seconds, 3),
+        "calls": calls,
+        "calls_per_sec": round(calls / seconds, 1) if seconds else None,
+        "group_photos_per_sec": round(len(groups) / seconds, 2) if seconds else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fixtures", required=True)
+    parser.add_argument("--backends", default="local,rekognition")
+    parser.add_argument("--mode", choices=("compare", "search"), default="compare")
+    parser.add_argument("--collection", default="students", help="Rekognition collection for --mode search")
+    parser.add_argument("--out", help="also write the results to this JSON file")
+    args = parser.parse_args()
+
+    references, groups, expected = load_fixtures(args.fixtures)
+    results = {
+        "references": len(references),
+        "group_photos": len(groups),
+        "mode": args.mode,
+        "backends": {},
+    }
+    for backend in args.backends.split(","):
+        results["backends"][backend] = run_backend(backend, args, references, groups, expected)
+    if "stub" in results["backends"]:
+        results["note"] = "stub scores are hash-based: a harness check, not a measure of accuracy"
+
+    print(json.dumps(results, indent=2))
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+            f.write("\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+Seeded fixture set for local_matching.py, in the layout it reads:
+
+    <out>/references/<ER>_<Name>_1.jpg
+    <out>/groups/group_<nn>.jpg
+    <out>/expected.json
+
+With --source, a directory of portraits grouped by person (the LFW layout,
+<person>/<photo>.jpg), each student is a person with at least two photos:
+the first becomes the enrolment photo and the others are pasted into the
+class photos, so every match is against a different photo of the same face.
+Without --source the tiles are synthetic texture, which only exercises the
+harness (--backends stub); accuracy needs real faces.
+
+    python benchmarks/make_fixtures.py --source lfw/ --students 40 --groups 12 --out fixtures/
+    python benchmarks/make_fixtures.py --students 20 --groups 6 --out fixtures/
+"""
+import argparse
+import hashlib
+import json
+import os
+import random
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from benchmarks import synthetic  # noqa: E402
+from benchmarks.stubs import synthetic_jpeg  # noqa: E402
+
+TILE = 160
+COLUMNS = 6
+
+
+def _decode(data):
+    import cv2
+    import numpy as np
+
+    return cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+
+
+def _encode(img):
+    import cv2
+
+    ok, buf = cv2.imencode(".jpg", img, [cv2.IMWRITE_JPEG_QUALITY, 92])
+    return buf.tobytes()
+
+
+def source_people(source, count, rng):
+    """[[photo bytes, ...]] for `count` people with two or more photos."""
+    people = []
+    for person in sorted(os.listdir(source)):
+        folder = os.path.join(source, person)
+        if not os.path.isdir(folder):
+            continue
+        photos = sorted(p for p in os.listdir(folder) if p.lower().endswith((".jpg", ".jpeg", ".png")))
+        if len(photos) >= 2:
+            people.append([os.path.join(folder, p) for p in photos])
+    if len(people) < count:
+        raise SystemExit(f"{source} has only {len(people)} people with two or more photos")
+
+    chosen = rng.sample(people, count)
+    loaded = []
+    for paths in chosen:
+        photos = []
+        for path in paths:
+            with open(path, "rb") as f:
+                photos.append(f.read())
+        loaded.append(photos)
+    return loaded
+
+
+def synthetic_people(count, seed):
+    """Two texture tiles per student, the same for the same seed."""
+    return [
+        [synthetic_jpeg(int(hashlib.sha1(f"{seed}:{i}:{n}".encode()).hexdigest()[:8], 16), TILE, TILE) for n in range(2)]
+        for i in range(count)
+    ]
+
+
+def group_photo(tiles):
+    """Tiles laid out COLUMNS to a row on a grey canvas."""
+    import cv2
+    import numpy as np
+
+    rows = (len(tiles) + COLUMNS - 1) // COLUMNS
+    canvas = np.full((rows * TILE, COLUMNS * TILE, 3), 128, dtype=np.uint8)
+    for i, data in enumerate(tiles):
+        tile = cv2.resize(_decode(data), (TILE, TILE))
+        r, c = divmod(i, COLUMNS)
+        canvas[r * TILE:(r + 1) * TILE, c * TILE:(c + 1) * TILE] = tile
+    return _encode(canvas)
+
+
+def make_fixtures(out, students, groups, present_rate=0.7, source=None, seed=0):
+    """Write the fixture set; returns {"references", "group_photos", "faces"}."""
+    rng = random.Random(seed)
+    people = source_people(source, students, rng) if source else synthetic_people(students, seed)
+    roster = synthetic.students(students, seed=seed)
+
+    os.makedirs(os.path.join(out, "references"), exist_ok=True)
+    os.makedirs(os.path.join(out, "groups"), exist_ok=True)
+    for (er, name), photos in zip(roster, people):
+        with open(os.path.join(out, "references", os.path.basename(synthetic.reference_key("", er, name))), "wb") as f:
+            f.write(photos[0])
+
+    expected, faces = {}, 0
+    for g in range(groups):
+        present = [i for i in range(students) if rng.random() < present_rate] or [rng.randrange(students)]
+        rng.shuffle(present)
+        tiles = [rng.choice(people[i][1:]) for i in present]
+        photo = f"group_{g + 1:02d}.jpg"
+        with open(os.path.join(out, "groups", photo), "wb") as f:
+            f.write(group_photo(tiles))
+        expected[photo] = sorted(roster[i][0] for i in present)
+        faces += len(present)
+
+    with open(os.path.join(out, "expected.json"), "w") as f:
+        json.dump(expected, f, indent=2, sort_keys=True)
+    return {"references": students, "group_photos": groups, "faces": faces}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--source", help="portraits as <person>/<photo>.jpg; synthetic tiles when omitted")
+    parser.add_argument("--students", type=int, default=20)
+    parser.add_argument("--groups", type=int, default=6, help="class photos to compose")
+    parser.add_argument("--present-rate", type=float, default=0.7)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default="fixtures")
+    args = parser.parse_args()
+
+    summary = make_fixtures(args.out, args.students, args.groups, args.present_rate, args.source, args.seed)
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
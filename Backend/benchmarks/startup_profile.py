@@ -0,0 +1,103 @@
+"""
+Backend cold-start profile.
+
+Imports `main` in fresh interpreters with `python -X importtime`, reports the
+wall-clock import time and the heaviest top-level packages, and optionally
+records the result under a label in a JSON file so runs can be compared.
+
+    python benchmarks/startup_profile.py --runs 5
+    python benchmarks/startup_profile.py --label after --output benchmarks/results/startup_importtime.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run_once(module):
+    env = dict(os.environ)
+    env.setdefault("AWS_REGION", "ap-south-1")
+    env["PYTHONDONTWRITEBYTECODE"] = "1"
+
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    wall = time.perf_counter() - start
+
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{proc.stderr[-2000:]}")
+
+    # Lines look like: "import time:       self [us] |  cumulative | imported package".
+    # Summing *self* time per top-level package attributes every module's
+    # cost to its own package, no matter who imported it first.
+    packages = defaultdict(int)
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        self_us, _, name = [p.strip() for p in line[len("import time:"):].split("|")]
+        packages[name.split(".")[0]] += int(self_us)
+
+    return wall, packages
+
+
+def profile(module, runs, top):
+    walls = []
+    totals = defaultdict(list)
+    for _ in range(runs):
+        wall, packages = run_once(module)
+        walls.append(wall)
+        for name, us in packages.items():
+            totals[name].append(us)
+
+    heaviest = sorted(
+        ((name, statistics.median(values) / 1000.0) for name, values in totals.items()),
+        key=lambda item: item[1],
+        reverse=True,
+    )[:top]
+
+    return {
+        "module": module,
+        "runs": runs,
+        "python": sys.version.split()[0],
+        "wall_seconds_median": round(statistics.median(walls), 3),
+        "wall_seconds_min": round(min(walls), 3),
+        "top_imports_ms": {name: round(ms, 1) for name, ms in heaviest},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="main")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--label", help="store the result under this label in --output")
+    parser.add_argument("--output", help="JSON file to merge the labelled result into")
+    args = parser.parse_args()
+
+    result = profile(args.module, args.runs, args.top)
+    print(json.dumps(result, indent=2))
+
+    if args.output:
+        data = {}
+        if os.path.exists(args.output):
+            with open(args.output) as f:
+                data = json.load(f)
+        data[args.label or "latest"] = result
+        with open(args.output, "w") as f:
+            json.dump(data, f, indent=2)
+            f.write("\n")
+
+
+if __name__ == "__main__":
+    main()
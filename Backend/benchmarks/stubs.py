@@ -0,0 +1,204 @@
+"""
+Local stand-ins for the S3 and Rekognition clients, with configurable
+per-call latency. Install them with core.aws_clients.register_client so the
+real pipelines run unchanged without AWS.
+"""
+import hashlib
+import io
+import threading
+import time
+from datetime import datetime, timezone
+
+
+class _Exceptions:
+    class ResourceNotFoundException(Exception):
+        pass
+
+    class NoSuchKey(Exception):
+        pass
+
+
+class StubS3:
+    """In-memory bucket store implementing the S3 calls the backend uses."""
+
+    exceptions = _Exceptions
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.objects = {}          # (bucket, key) -> (bytes, LastModified)
+        self.calls = {}
+        self._lock = threading.Lock()
+
+    def _call(self, name):
+        with self._lock:
+            self.calls[name] = self.calls.get(name, 0) + 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    # -------- writes --------
+    def put_object(self, Bucket, Key, Body=b"", **kwargs):
+        self._call("put_object")
+        data = Body.read() if hasattr(Body, "read") else Body
+        if isinstance(data, str):
+            data = data.encode()
+        with self._lock:
+            self.objects[(Bucket, Key)] = (bytes(data), datetime.now(timezone.utc))
+        return {}
+
+    def upload_file(self, Filename, Bucket, Key, **kwargs):
+        with open(Filename, "rb") as f:
+            self.put_object(Bucket=Bucket, Key=Key, Body=f.read())
+
+    def upload_fileobj(self, Fileobj, Bucket, Key, **kwargs):
+        self.put_object(Bucket=Bucket, Key=Key, Body=Fileobj.read())
+
+    # -------- reads --------
+    def get_object(self, Bucket, Key, **kwargs):
+        self._call("get_object")
+        try:
+            data, modified = self.objects[(Bucket, Key)]
+        except KeyError:
+            raise self.exceptions.NoSuchKey(f"NoSuchKey: {Key}")
+        return {"Body": io.BytesIO(data), "ContentLength": len(data), "LastModified": modified}
+
+    def list_objects_v2(self, Bucket, Prefix="", ContinuationToken=None, MaxKeys=1000, **kwargs):
+        self._call("list_objects_v2")
+        with self._lock:
+            keys = sorted(k for b, k in self.objects if b == Bucket and k.startswith(Prefix))
+        start = int(ContinuationToken) if ContinuationToken else 0
+        page = keys[start:start + MaxKeys]
+
+        response = {
+            "KeyCount": len(page),
+            "Contents": [
+                {
+                    "Key": key,
+                    "Size": len(self.objects[(Bucket, key)][0]),
+                    "LastModified": self.objects[(Bucket, key)][1],
+                }
+                for key in page
+            ],
+            "IsTruncated": start + MaxKeys < len(keys),
+        }
+        if response["IsTruncated"]:
+            response["NextContinuationToken"] = str(start + MaxKeys)
+        if not page:
+            del response["Contents"]
+        return response
+
+    def get_paginator(self, operation):
+        assert operation == "list_objects_v2"
+        return _Paginator(self)
+
+
+class _Paginator:
+    def __init__(self, s3):
+        self.s3 = s3
+
+    def paginate(self, **kwargs):
+        token = None
+        while True:
+            page = self.s3.list_objects_v2(ContinuationToken=token, **kwargs)
+            yield page
+            if not page.get("IsTruncated"):
+                return
+            token = page["NextContinuationToken"]
+
+
+def _digest(data):
+    return int(hashlib.sha1(data).hexdigest()[:8], 16)
+
+
+class StubRekognition:
+    """
+    Deterministic fake: detect_faces returns `faces_per_image` faces and
+    compare_faces matches a reference when a hash of (reference, group image)
+    falls under `match_rate`.
+    """
+
+    exceptions = _Exceptions
+
+    def __init__(self, latency=0.0, faces_per_image=30, match_rate=0.5):
+        self.latency = latency
+        self.faces_per_image = faces_per_image
+        self.match_rate = match_rate
+        self.collections = {}      # CollectionId -> [ExternalImageId, ...]
+        self.calls = {}
+        self._lock = threading.Lock()
+
+    def _call(self, name):
+        with self._lock:
+            self.calls[name] = self.calls.get(name, 0) + 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def detect_faces(self, Image, Attributes=None):
+        self._call("detect_faces")
+        faces = []
+        per_row = 10
+        for i in range(self.faces_per_image):
+            faces.append({
+                "BoundingBox": {
+                    "Width": 0.08, "Height": 0.1,
+                    "Left": 0.02 + (i % per_row) * 0.095,
+                    "Top": 0.05 + (i // per_row) * 0.12,
+                },
+                "Confidence": 99.0,
+                "Quality": {"Sharpness": 80.0, "Brightness": 70.0},
+                "Pose": {"Yaw": 5.0, "Pitch": 3.0, "Roll": 0.0},
+            })
+        return {"FaceDetails": faces}
+
+    def compare_faces(self, SourceImage, TargetImage, SimilarityThreshold=80, **kwargs):
+        self._call("compare_faces")
+        score = _digest(SourceImage["Bytes"] + TargetImage["Bytes"][:64]) % 1000 / 1000.0
+        matched = score < self.match_rate
+        return {
+            "FaceMatches": [{"Similarity": 99.0}] if matched else [],
+            "UnmatchedFaces": [],
+        }
+
+    def search_faces_by_image(self, CollectionId, Image, FaceMatchThreshold=80, MaxFaces=1, **kwargs):
+        """Matches a crop to one indexed face when its hash falls under match_rate."""
+        self._call("search_faces_by_image")
+        if CollectionId not in self.collections:
+            raise self.exceptions.ResourceNotFoundException(CollectionId)
+        faces = self.collections[CollectionId]
+        digest = _digest(Image["Bytes"])
+        if not faces or digest % 1000 / 1000.0 >= self.match_rate:
+            return {"FaceMatches": []}
+        external_id = faces[digest % len(faces)]
+        return {"FaceMatches": [{"Similarity": 99.0, "Face": {"FaceId": f"face-{external_id}", "ExternalImageId": external_id}}]}
+
+    def index_faces(self, CollectionId, Image, ExternalImageId=None, **kwargs):
+        self._call("index_faces")
+        if CollectionId not in self.collections:
+            raise self.exceptions.ResourceNotFoundException(CollectionId)
+        with self._lock:
+            self.collections[CollectionId].append(ExternalImageId)
+        return {"FaceRecords": [{"Face": {"FaceId": f"face-{ExternalImageId}", "ExternalImageId": ExternalImageId}}]}
+
+    def create_collection(self, CollectionId):
+        self._call("create_collection")
+        self.collections.setdefault(CollectionId, [])
+        return {"StatusCode": 200}
+
+
+def install(s3, rekognition, region="ap-south-1"):
+    """Route core.aws_clients.get_client to the stand-ins."""
+    from core.aws_clients import register_client
+
+    register_client("s3", s3, region)
+    register_client("rekognition", rekognition, region)
+
+
+def synthetic_jpeg(seed, width=640, height=480):
+    """A decodable JPEG with some texture so the quality check has work to do."""
+    import cv2
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    img = rng.integers(0, 255, size=(height, width, 3), dtype=np.uint8)
+    img = cv2.GaussianBlur(img, (5, 5), 0)
+    ok, buf = cv2.imencode(".jpg", img)
+    return buf.tobytes()
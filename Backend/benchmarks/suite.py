@@ -0,0 +1,342 @@
+"""
+Regression benchmarks for the backend's heavy entry points, run in-process
+against the local S3 / Rekognition stubs (benchmarks/stubs.py) on seeded
+synthetic data (benchmarks/synthetic.py):
+
+    mark_batch_attendance_s3, upload_multiple_images   per roster size (--students)
+    assess_quality_only                                 per group photo count (--images)
+    class_overview, generate_overall_attendance,
+    list_s3_reports                                     per report history size (--reports)
+
+Each case runs once to warm up, then --iterations timed times, then once more
+under tracemalloc. The JSON written to stdout (or --output) has throughput,
+p50/p99 latency, stub API calls per operation and peak traced memory for
+every case; --baseline compares against an earlier run and exits 1 on a
+regression:
+
+    python benchmarks/suite.py --output benchmarks/results/suite.json
+    python benchmarks/suite.py --students 50,500,5000 --reports 10,200,2000 --baseline benchmarks/results/suite.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from benchmarks import synthetic  # noqa: E402
+from benchmarks.stubs import StubRekognition, StubS3, install, synthetic_jpeg  # noqa: E402
+
+BUCKET = "ict-attendances"
+REGION = "ap-south-1"
+BATCH = "2024-2028"
+SECTION = "A"
+
+
+def configure_environment(args):
+    """Point every module at the stub bucket; must run before core is imported."""
+    os.environ["AWS_REGION"] = REGION
+    os.environ["BUCKET_NAME"] = BUCKET
+    os.environ["AWS_BUCKET_NAME"] = BUCKET
+    # The rate limiter would otherwise pace stub calls at the production budget
+    os.environ["REKOGNITION_TPS"] = str(args.rekognition_tps)
+    os.environ.setdefault("TRACING", "off")
+
+
+class _DiscardBus:
+    """Drops published events: only the request path is measured."""
+
+    def publish(self, event):
+        pass
+
+    def redeliver(self, event, consumer, handler, attempt=1):
+        pass
+
+    def drain(self, timeout=None):
+        return True
+
+
+def _percentile(sorted_values, p):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * p))]
+
+
+def _call_counts(s3, rekognition):
+    counts = {f"s3.{name}": n for name, n in s3.calls.items()}
+    counts.update({f"rekognition.{name}": n for name, n in rekognition.calls.items()})
+    return counts
+
+
+def _check(result):
+    """Fail the case on the error values these functions return instead of raising."""
+    if isinstance(result, tuple) and len(result) == 2 and isinstance(result[1], int) and result[1] >= 500:
+        raise RuntimeError(result[0].get_json().get("error"))
+    if isinstance(result, dict) and "error" in result:
+        raise RuntimeError(result["error"])
+    return result
+
+
+def measure(name, params, stubs, operation, iterations):
+    """Time operation(i) for i in 1..iterations after a warm-up call."""
+    s3, rekognition = stubs
+    result = {"name": name, "params": params, "iterations": iterations}
+    try:
+        _check(operation(0))
+
+        before = _call_counts(s3, rekognition)
+        latencies = []
+        for i in range(1, iterations + 1):
+            start = time.perf_counter()
+            _check(operation(i))
+            latencies.append(time.perf_counter() - start)
+        after = _call_counts(s3, rekognition)
+
+        tracemalloc.start()
+        try:
+            _check(operation(iterations + 1))
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+    except Exception as e:
+        print(f"{name} {params} failed: {e}", file=sys.stderr)
+        result["error"] = str(e)
+        return result
+
+    latencies.sort()
+    result.update({
+        "ops_per_second": round(iterations / sum(latencies), 3),
+        "mean_ms": round(sum(latencies) / iterations * 1000, 2),
+        "p50_ms": round(_percentile(latencies, 0.50) * 1000, 2),
+        "p99_ms": round(_percentile(latencies, 0.99) * 1000, 2),
+        "api_calls_per_op": {
+            api: round((after[api] - before.get(api, 0)) / iterations, 2)
+            for api in sorted(after) if after[api] != before.get(api, 0)
+        },
+        "peak_memory_mb": round(peak / 2**20, 2),
+    })
+    print(f"{name} {params}: p50 {result['p50_ms']} ms, p99 {result['p99_ms']} ms", file=sys.stderr)
+    return result
+
+
+# -------------------------------
+# CASES
+# -------------------------------
+
+def _stubs(args):
+    from core.roster_cache import invalidate_roster
+
+    s3 = StubS3(latency=args.s3_latency)
+    rekognition = StubRekognition(latency=args.rekognition_latency, faces_per_image=args.faces)
+    install(s3, rekognition, REGION)
+    invalidate_roster(BUCKET, BATCH)
+    return s3, rekognition
+
+
+def _group_images(args):
+    return [synthetic_jpeg(seed, args.width, args.height) for seed in range(args.images)]
+
+
+def bench_mark_attendance(args, students):
+    from core.mark_batch_attendance import mark_batch_attendance_s3
+
+    s3, rekognition = _stubs(args)
+    synthetic.seed_roster(s3, rekognition, BUCKET, BATCH, synthetic.students(students, args.seed))
+    images = _group_images(args)
+
+    def operation(i):
+        files = [io.BytesIO(data) for data in images]
+        return mark_batch_attendance_s3(BATCH, SECTION, "OS", files, s3_bucket=BUCKET, region=REGION)
+
+    return measure("mark_batch_attendance_s3", {"students": students, "images": args.images},
+                   (s3, rekognition), operation, args.iterations)
+
+
+def bench_upload(args, students):
+    from werkzeug.datastructures import FileStorage
+    from core.upload_to_s3 import EXCEL_FILE, upload_multiple_images
+
+    s3, rekognition = _stubs(args)
+    roster = synthetic.students(students, args.seed)
+    synthetic.seed_roster(s3, rekognition, BUCKET, BATCH, roster)
+    # upload_multiple_images appends to the local students.xlsx, then uploads it
+    with open(EXCEL_FILE, "wb") as f:
+        f.write(synthetic.students_workbook({BATCH: [(er, name, "9800000000") for er, name in roster]}))
+    photos = [synthetic_jpeg(1000 + n) for n in range(args.upload_photos)]
+
+    def operation(i):
+        files = [FileStorage(io.BytesIO(data), filename=f"photo_{n}.jpg") for n, data in enumerate(photos)]
+        return upload_multiple_images(BATCH, f"{93310000000 + i}", "New Student", "9800000000", files)
+
+    return measure("upload_multiple_images", {"students": students, "photos": args.upload_photos},
+                   (s3, rekognition), operation, args.iterations)
+
+
+def bench_quality(args):
+    from core.check_image_quality import assess_quality_only
+
+    s3, rekognition = _stubs(args)
+    images = _group_images(args)
+
+    def operation(i):
+        return assess_quality_only([io.BytesIO(data) for data in images])
+
+    return measure("assess_quality_only", {"images": args.images, "size": f"{args.width}x{args.height}"},
+                   (s3, rekognition), operation, args.iterations)
+
+
+def _seed_history(args, reports):
+    s3, rekognition = _stubs(args)
+    roster = synthetic.students(args.class_size, args.seed)
+    s3.put_object(Bucket=BUCKET, Key="students.xlsx", Body=synthetic.students_workbook(
+        {BATCH: [(er, name, "9800000000") for er, name in roster]}
+    ))
+    synthetic.seed_reports(s3, BUCKET, BATCH, roster, reports, seed=args.seed, section=SECTION)
+    return s3, rekognition
+
+
+def bench_class_overview(args, reports):
+    from flask import Flask
+    from core.overview import class_overview
+
+    stubs = _seed_history(args, reports)
+    app = Flask(__name__)
+
+    def operation(i):
+        # The view itself, without core.response_cache in front of it
+        with app.test_request_context("/api/overview"):
+            return class_overview.__wrapped__()
+
+    return measure("class_overview", {"reports": reports, "class_size": args.class_size},
+                   stubs, operation, args.iterations)
+
+
+def bench_overall_attendance(args, reports):
+    from core.generate_attendance_charts import generate_overall_attendance
+
+    stubs = _seed_history(args, reports)
+    return measure("generate_overall_attendance", {"reports": reports, "class_size": args.class_size},
+                   stubs, lambda i: generate_overall_attendance(chart="png"), args.iterations)
+
+
+def bench_list_reports(args, reports):
+    from core.reports_service import list_s3_reports
+
+    stubs = _seed_history(args, reports)
+    return measure("list_s3_reports", {"reports": reports, "class_size": args.class_size},
+                   stubs, lambda i: list_s3_reports(), args.iterations)
+
+
+# -------------------------------
+# BASELINE COMPARISON
+# -------------------------------
+
+def _case_key(result):
+    return result["name"], json.dumps(result["params"], sort_keys=True)
+
+
+def regressions(results, baseline, tolerance):
+    """Cases slower (p50) or bigger (peak memory) than baseline by more than tolerance, or making more API calls."""
+    previous = {_case_key(r): r for r in baseline["results"] if "error" not in r}
+    found = []
+    for result in results:
+        old = previous.get(_case_key(result))
+        if old is None:
+            continue
+        label = f"{result['name']} {result['params']}"
+        if "error" in result:
+            found.append(f"{label}: failed ({result['error']})")
+            continue
+        for metric in ("p50_ms", "peak_memory_mb"):
+            if old[metric] and result[metric] > old[metric] * (1 + tolerance):
+                found.append(f"{label}: {metric} {old[metric]} -> {result[metric]}")
+        for api, calls in result["api_calls_per_op"].items():
+            if calls > old["api_calls_per_op"].get(api, 0):
+                found.append(f"{label}: {api} calls {old['api_calls_per_op'].get(api, 0)} -> {calls}")
+    return found
+
+
+def _sizes(value):
+    return [int(v) for v in value.split(",") if v]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--students", default="50,500,5000", help="comma separated roster sizes")
+    parser.add_argument("--reports", default="10,200", help="comma separated report history sizes (up to 2000)")
+    parser.add_argument("--class-size", type=int, default=60, help="students per report")
+    parser.add_argument("--images", type=int, default=2, help="group photos per attendance call")
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=960)
+    parser.add_argument("--faces", type=int, default=30, help="faces the stub detects per photo")
+    parser.add_argument("--upload-photos", type=int, default=3, help="reference photos per enrolment")
+    parser.add_argument("--iterations", type=int, default=5)
+    parser.add_argument("--s3-latency", type=float, default=0.0, help="seconds per stubbed S3 call")
+    parser.add_argument("--rekognition-latency", type=float, default=0.0, help="seconds per stubbed Rekognition call")
+    parser.add_argument("--rekognition-tps", type=float, default=100000, help="REKOGNITION_TPS for the rate limiter")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--only", help="comma separated case names to run")
+    parser.add_argument("--label", default="current")
+    parser.add_argument("--output", help="write the JSON here instead of stdout")
+    parser.add_argument("--baseline", help="earlier suite JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed p50 / memory growth over the baseline")
+    args = parser.parse_args()
+
+    configure_environment(args)
+    from core.event_bus import set_bus
+
+    set_bus(_DiscardBus())
+    output = os.path.abspath(args.output) if args.output else None
+    baseline_path = os.path.abspath(args.baseline) if args.baseline else None
+    # The pipelines write uploads/, students.xlsx and hit-rate files to the cwd
+    os.chdir(tempfile.mkdtemp(prefix="attendance-suite-"))
+
+    cases = []
+    for students in _sizes(args.students):
+        cases.append(("mark_batch_attendance_s3", lambda n=students: bench_mark_attendance(args, n)))
+        cases.append(("upload_multiple_images", lambda n=students: bench_upload(args, n)))
+    cases.append(("assess_quality_only", lambda: bench_quality(args)))
+    for reports in _sizes(args.reports):
+        cases.append(("class_overview", lambda n=reports: bench_class_overview(args, n)))
+        cases.append(("generate_overall_attendance", lambda n=reports: bench_overall_attendance(args, n)))
+        cases.append(("list_s3_reports", lambda n=reports: bench_list_reports(args, n)))
+
+    only = set(args.only.split(",")) if args.only else None
+    # Keep the backend's own prints out of the JSON on stdout
+    with contextlib.redirect_stdout(sys.stderr):
+        results = [run() for name, run in cases if not only or name in only]
+
+    report = {
+        "label": args.label,
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {k: v for k, v in vars(args).items() if k not in ("output", "baseline", "label", "only")},
+        "max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    if output:
+        with open(output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    if baseline_path:
+        with open(baseline_path) as f:
+            found = regressions(results, json.load(f), args.tolerance)
+        for line in found:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        if found:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
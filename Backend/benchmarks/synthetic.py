@@ -0,0 +1,138 @@
+"""
+Seeded synthetic data for the benchmarks and generate_data.py: batch rosters
+(reference photos plus their faces in the stub collection), students.xlsx
+and attendance reports, in the layouts the backend itself writes. Workbooks
+come out byte-identical for the same inputs.
+"""
+import io
+import random
+import re
+import zipfile
+from datetime import datetime, timedelta
+
+FIRST_NAMES = [
+    "Aarav", "Aditi", "Arjun", "Bhavya", "Dev", "Diya", "Harsh", "Isha", "Jay", "Kavya",
+    "Krish", "Meera", "Neel", "Nisha", "Om", "Priya", "Rahul", "Riya", "Sahil", "Tanvi",
+]
+LAST_NAMES = [
+    "Patel", "Shah", "Mehta", "Joshi", "Desai", "Trivedi", "Parmar", "Solanki", "Rana", "Vyas",
+]
+
+
+def workbook_bytes(wb, stamp):
+    """
+    Save a workbook byte-for-byte reproducibly: openpyxl stamps the document
+    properties and zip entries with the current time.
+    """
+    wb.properties.created = stamp
+    raw = io.BytesIO()
+    wb.save(raw)
+
+    out = io.BytesIO()
+    with zipfile.ZipFile(raw) as src, zipfile.ZipFile(out, "w", zipfile.ZIP_DEFLATED) as dst:
+        for info in src.infolist():
+            data = src.read(info.filename)
+            if info.filename == "docProps/core.xml":
+                # Set on save, whatever the workbook says
+                data = re.sub(rb"(<dcterms:modified[^>]*>)[^<]*", rb"\g<1>" + stamp.strftime("%Y-%m-%dT%H:%M:%SZ").encode(), data)
+            entry = zipfile.ZipInfo(info.filename, date_time=stamp.timetuple()[:6])
+            entry.compress_type = zipfile.ZIP_DEFLATED
+            dst.writestr(entry, data)
+    return out.getvalue()
+
+
+def students(count, seed=0, first_er=92310000000):
+    """[(er_number, name)] with distinct ER numbers."""
+    rng = random.Random(seed)
+    return [
+        (str(first_er + i), f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}")
+        for i in range(count)
+    ]
+
+
+def reference_key(batch_name, er_number, name, n=1):
+    """Key upload_multiple_images gives a student's n-th reference photo."""
+    return f"{batch_name}/{er_number}_{name.replace(' ', '_')}_{n}.jpg"
+
+
+def seed_roster(s3, rekognition, bucket, batch_name, roster, collection_id="students"):
+    """Reference photos under <batch>/ and their faces in the stub collection."""
+    rekognition.create_collection(CollectionId=collection_id)
+    for er, name in roster:
+        s3.put_object(Bucket=bucket, Key=reference_key(batch_name, er, name), Body=f"ref:{er}".encode())
+        rekognition.index_faces(
+            CollectionId=collection_id,
+            Image={"S3Object": {"Bucket": bucket, "Name": reference_key(batch_name, er, name)}},
+            ExternalImageId=f"{er}_{name.replace(' ', '_')}",
+        )
+
+
+def students_workbook(batches, uploaded_at=None):
+    """
+    students.xlsx as update_student_excel leaves it: one sheet per batch and a
+    "Batch Info" summary. batches: {batch_name: [(er, name, parent_phone)]}.
+    """
+    from openpyxl import Workbook
+
+    uploaded_at = uploaded_at or datetime(2025, 7, 1, 9, 0)
+    stamp = uploaded_at.strftime("%Y-%m-%d %H:%M:%S")
+    wb = Workbook()
+    wb.remove(wb["Sheet"])
+    summary_rows = []
+    for batch_name, rows in batches.items():
+        sheet = wb.create_sheet(batch_name)
+        sheet.append(["ER Number", "Student Name", "Parent Phone", "Batch Name", "Upload Date & Time"])
+        for er, name, phone in rows:
+            sheet.append([er, name, phone, batch_name, stamp])
+            summary_rows.append([batch_name, er, name, phone, stamp])
+
+    summary = wb.create_sheet("Batch Info")
+    summary.append(["Batch Name", "ER Number", "Student Name", "Parent Phone", "Last Updated"])
+    for row in summary_rows:
+        summary.append(row)
+    return workbook_bytes(wb, uploaded_at)
+
+
+def report_workbook(present, absent, batch_name, class_name, subject, taken_at):
+    """A report in the layout save_attendance_to_excel writes."""
+    from openpyxl import Workbook
+
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "Attendance"
+    ws.append(["ER Number", "Name", "Date", "Time", "Class", "Subject", "Batch", "Status"])
+    date, time_ = taken_at.strftime("%d-%m-%Y"), taken_at.strftime("%H:%M:%S")
+    for status, rows in (("Present", present), ("Absent", absent)):
+        for er, name in rows:
+            ws.append([er, name, date, time_, class_name, subject, batch_name, status])
+    return workbook_bytes(wb, taken_at)
+
+
+def report_filename(taken_at, batch_name, section, subject):
+    """date_batch_section_subject.xlsx, the name parse_metadata_from_filename reads."""
+    return f"{taken_at.strftime('%Y%m%d')}_{batch_name}_{section}_{subject}.xlsx"
+
+
+def seed_reports(s3, bucket, batch_name, roster, count, seed=0, section="A",
+                 subjects=("OS", "CN", "DBMS", "AI"), attendance_rate=0.8,
+                 start=datetime(2025, 7, 1, 9, 0)):
+    """
+    `count` reports under reports/, one class per subject a day, each student
+    present with probability attendance_rate. Returns the keys.
+    """
+    rng = random.Random(seed)
+    keys = []
+    for i in range(count):
+        subject = subjects[i % len(subjects)]
+        taken_at = start + timedelta(days=i // len(subjects), hours=i % len(subjects))
+        present, absent = [], []
+        for student in roster:
+            (present if rng.random() < attendance_rate else absent).append(student)
+
+        key = f"reports/{report_filename(taken_at, batch_name, section, subject)}"
+        s3.put_object(
+            Bucket=bucket, Key=key,
+            Body=report_workbook(present, absent, batch_name, section, subject, taken_at),
+        )
+        keys.append(key)
+    return keys
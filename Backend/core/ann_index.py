@@ -0,0 +1,172 @@
+import os
+import threading
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# -------------------------------
+# APPROXIMATE NEAREST NEIGHBOURS
+# -------------------------------
+# Embedding indexes with at least ANN_MIN_ROWS faces (institution-wide
+# collections) are searched through an ANN structure instead of a full
+# matrix-vector product:
+#   "ivf"  - inverted file in pure NumPy: rows bucketed by their nearest of
+#            ANN_NLIST centroids, a query scans its ANN_NPROBE closest buckets
+#   "hnsw" - hnswlib graph (optional dependency), ANN_EF controls the search
+# Raising ANN_NPROBE / ANN_EF trades latency for recall.
+ANN_BACKEND = os.getenv("ANN_BACKEND", "ivf")
+ANN_MIN_ROWS = int(os.getenv("ANN_MIN_ROWS", 20000))
+ANN_NLIST = int(os.getenv("ANN_NLIST", 0))          # 0: 4 * sqrt(rows)
+ANN_NPROBE = int(os.getenv("ANN_NPROBE", 16))
+ANN_KMEANS_ITERATIONS = int(os.getenv("ANN_KMEANS_ITERATIONS", 10))
+ANN_HNSW_M = int(os.getenv("ANN_HNSW_M", 16))
+ANN_HNSW_EF_CONSTRUCTION = int(os.getenv("ANN_HNSW_EF_CONSTRUCTION", 200))
+ANN_EF = int(os.getenv("ANN_EF", 64))
+
+# File suffixes written next to an embedding index version
+ANN_SUFFIXES = (".ivf.npz", ".hnsw")
+
+
+def top_k(similarities, k):
+    """Indices of the k largest similarities, best first."""
+    import numpy as np
+
+    k = min(k, len(similarities))
+    if k <= 0:
+        return np.zeros(0, dtype=np.int64)
+    top = np.argpartition(-similarities, k - 1)[:k]
+    return top[np.argsort(-similarities[top])]
+
+
+# -------------------------------
+# IVF (pure NumPy)
+# -------------------------------
+
+def _assign(matrix, centroids, chunk=8192):
+    import numpy as np
+
+    labels = np.empty(len(matrix), dtype=np.int32)
+    for start in range(0, len(matrix), chunk):
+        labels[start:start + chunk] = (matrix[start:start + chunk] @ centroids.T).argmax(axis=1)
+    return labels
+
+
+def build_ivf(matrix, nlist=None, iterations=None, seed=0):
+    """
+    Spherical k-means over (a sample of) the L2-normalised rows, then every
+    row bucketed by nearest centroid. Returns {"centroids", "order", "offsets"}:
+    bucket c holds rows order[offsets[c]:offsets[c + 1]].
+    """
+    import numpy as np
+
+    matrix = np.asarray(matrix, dtype=np.float32)
+    n = len(matrix)
+    nlist = min(n, nlist or ANN_NLIST or max(1, int(4 * np.sqrt(n))))
+    iterations = iterations or ANN_KMEANS_ITERATIONS
+
+    rng = np.random.default_rng(seed)
+    sample = matrix[rng.choice(n, size=min(n, nlist * 64), replace=False)]
+    centroids = sample[rng.choice(len(sample), size=nlist, replace=False)].copy()
+
+    for _ in range(iterations):
+        labels = _assign(sample, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, sample)
+        norms = np.linalg.norm(sums, axis=1, keepdims=True)
+        empty = norms[:, 0] == 0
+        # Empty clusters restart from random sample points
+        sums[empty] = sample[rng.choice(len(sample), size=int(empty.sum()))]
+        centroids = sums / np.maximum(np.linalg.norm(sums, axis=1, keepdims=True), 1e-12)
+
+    labels = _assign(matrix, centroids)
+    order = np.argsort(labels, kind="stable").astype(np.int64)
+    offsets = np.zeros(nlist + 1, dtype=np.int64)
+    np.cumsum(np.bincount(labels, minlength=nlist), out=offsets[1:])
+    return {"centroids": centroids.astype(np.float32), "order": order, "offsets": offsets}
+
+
+def search_ivf(ivf, matrix, query, k=1, nprobe=None):
+    """[(row, similarity)] of the best k rows among the nprobe nearest buckets."""
+    import numpy as np
+
+    nprobe = min(nprobe or ANN_NPROBE, len(ivf["centroids"]))
+    probes = top_k(ivf["centroids"] @ query, nprobe)
+    order, offsets = ivf["order"], ivf["offsets"]
+
+    candidates = np.concatenate([order[offsets[c]:offsets[c + 1]] for c in probes])
+    if not len(candidates):
+        return []
+    candidates.sort()     # sequential reads from the memory-mapped matrix
+    similarities = matrix[candidates] @ query
+    return [(int(candidates[i]), float(similarities[i])) for i in top_k(similarities, k)]
+
+
+# -------------------------------
+# HNSW (hnswlib, optional)
+# -------------------------------
+
+def build_hnsw(matrix):
+    import hnswlib
+    import numpy as np
+
+    index = hnswlib.Index(space="ip", dim=matrix.shape[1])
+    index.init_index(max_elements=len(matrix), ef_construction=ANN_HNSW_EF_CONSTRUCTION, M=ANN_HNSW_M)
+    index.add_items(np.asarray(matrix, dtype=np.float32), np.arange(len(matrix)))
+    return index
+
+
+def search_hnsw(index, query, k=1, ef=None):
+    index.set_ef(max(ef or ANN_EF, k))
+    labels, distances = index.knn_query(query[None, :], k=k)
+    # "ip" distance is 1 - inner product
+    return [(int(row), 1.0 - float(d)) for row, d in zip(labels[0], distances[0])]
+
+
+# -------------------------------
+# PER-VERSION STRUCTURES
+# -------------------------------
+
+def load_or_build(base_path, matrix, backend=None):
+    """
+    ANN structure for an index version (base_path without suffix), loaded
+    from disk when it was built before, otherwise built and saved.
+    """
+    import numpy as np
+
+    backend = backend or ANN_BACKEND
+    if backend == "hnsw":
+        try:
+            import hnswlib
+        except ImportError:
+            print("hnswlib is not installed, using the IVF index")
+            backend = "ivf"
+
+    if backend == "hnsw":
+        path = base_path + ".hnsw"
+        if os.path.exists(path):
+            index = hnswlib.Index(space="ip", dim=matrix.shape[1])
+            index.load_index(path, max_elements=len(matrix))
+        else:
+            index = build_hnsw(matrix)
+            tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            index.save_index(tmp)
+            os.replace(tmp, path)
+        return ("hnsw", index)
+
+    path = base_path + ".ivf.npz"
+    if os.path.exists(path):
+        with np.load(path) as data:
+            ivf = {name: data[name] for name in ("centroids", "order", "offsets")}
+    else:
+        ivf = build_ivf(matrix)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp.npz"
+        np.savez(tmp, **ivf)
+        os.replace(tmp, path)
+    return ("ivf", ivf)
+
+
+def search_ann(ann, matrix, query, k=1):
+    kind, structure = ann
+    if kind == "hnsw":
+        return search_hnsw(structure, query, k)
+    return search_ivf(structure, matrix, query, k)
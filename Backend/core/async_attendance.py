@@ -0,0 +1,362 @@
+import asyncio
+import contextvars
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from flask import Blueprint, jsonify, request
+
+from core.attendance_events import complete_attendance
+from core.aws_clients import aws_error_code, get_client
+from core.face_dedup import dedup_faces, search_passes
+from core.mark_batch_attendance import (
+    FACE_CROP_MATCHING,
+    build_absent_list,
+    compare_reference,
+    detect_and_assess,
+    ensure_batch_collection,
+    get_photo_bytes_from_s3,
+    new_session_stats,
+    search_face_crop,
+    select_image_crops,
+)
+from core.match_scheduler import record_reference_result, references_by_student, save_hit_rates
+from core.pipeline_metrics import in_attendance_context, observe_matches
+from core.quality_check import analyze_image_quality, add_face_metrics
+from core.roster_cache import get_roster
+from core.tracing import set_attributes
+from core.video_keyframes import VideoError, expand_uploads
+
+# Max S3 / Rekognition calls in flight per request
+AWS_MAX_CONCURRENCY = int(os.getenv("AWS_MAX_CONCURRENCY", 10))
+
+async_bp = Blueprint("async_attendance", __name__)
+
+# -------------------------------
+# AWAITABLE I/O
+# -------------------------------
+# boto3 is blocking, so calls run on a dedicated thread pool and are awaited
+# like aioboto3 coroutines; a per-request semaphore caps how many are in flight.
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=AWS_MAX_CONCURRENCY, thread_name_prefix="aws-io"
+                )
+    return _executor
+
+
+async def _io(limit, fn, *args):
+    async with limit:
+        loop = asyncio.get_running_loop()
+        # Copy the context so the worker thread sees this run's metric labels
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(_get_executor(), partial(context.run, fn, *args))
+
+
+# -------------------------------
+# ASYNC PIPELINES
+# -------------------------------
+
+async def _assess_one(limit, rekognition, group_bytes, idx):
+    try:
+        return await _io(limit, detect_and_assess, rekognition, group_bytes, idx)
+    except Exception as e:
+        print(f"Error in Rekognition detect_faces: {e}")
+        quality_report = analyze_image_quality(group_bytes)
+        quality_report["image_index"] = idx
+        add_face_metrics(quality_report, [])
+        quality_report["error"] = f"Face detection failed: {str(e)}"
+        return quality_report, []
+
+
+async def assess_quality_async(group_image_files):
+    """Concurrent version of check_image_quality.assess_quality_only."""
+    rekognition = get_client("rekognition")
+    limit = asyncio.Semaphore(AWS_MAX_CONCURRENCY)
+
+    group_images = [img.read() for img in group_image_files]
+    results = await asyncio.gather(*[
+        _assess_one(limit, rekognition, group_bytes, idx)
+        for idx, group_bytes in enumerate(group_images, start=1)
+    ])
+    return [quality_report for quality_report, _ in results]
+
+
+async def _match_unique_faces_async(limit, rekognition, clusters, roster, reports_by_index, stats, collection_id):
+    """
+    Searches unique faces AWS_MAX_CONCURRENCY at a time, then the other
+    cluster members while students are missing, stopping once the roster is complete.
+    """
+    matched, failed_images = set(), set()
+    for crops, is_representative in zip(search_passes(clusters), (True, False)):
+        for start in range(0, len(crops), AWS_MAX_CONCURRENCY):
+            if matched.issuperset(roster):
+                if is_representative:
+                    stats["match_calls_skipped"] += len(crops) - start
+                break
+
+            chunk = crops[start:start + AWS_MAX_CONCURRENCY]
+            stats["match_calls"] += len(chunk)
+            if not is_representative:
+                stats["match_calls_saved_by_dedup"] -= len(chunk)
+            results = await asyncio.gather(
+                *[_io(limit, search_face_crop, rekognition, crop["bytes"], roster, collection_id)
+                  for crop in chunk],
+                return_exceptions=True,
+            )
+
+            for crop, er in zip(chunk, results):
+                if isinstance(er, Exception):
+                    if aws_error_code(er) == "ResourceNotFoundException":
+                        raise er
+                    print(f"Search error for face {crop['face_index']} of image {crop['image_index']}: {er}")
+                    reports_by_index[crop["image_index"]]["match_errors"] += 1
+                    failed_images.add(crop["image_index"])
+                elif er:
+                    matched.add(er)
+    return matched, failed_images
+
+
+async def _compare_all_async(limit, rekognition, s3_bucket, references, images, failed_ers, stats, present_ers=()):
+    """
+    Reference/group image comparisons in rounds: round N compares the Nth
+    best reference of every student not yet matched against all images
+    concurrently, so later references are skipped once one matches.
+    """
+    schedule = references_by_student(references)
+    matched = set(present_ers)
+    attempted = 0
+    for _, quality_report in images:
+        quality_report["match_errors"] = 0
+
+    for rank in range(max((len(keys) for keys in schedule.values()), default=0)):
+        pending = [
+            (er, keys[rank]) for er, keys in schedule.items()
+            if er not in matched and rank < len(keys)
+        ]
+        if not pending:
+            break
+        attempted += len(pending) * len(images)
+
+        references = await asyncio.gather(
+            *[_io(limit, get_photo_bytes_from_s3, s3_bucket, key) for _, key in pending],
+            return_exceptions=True,
+        )
+        pairs = []
+        for (er, key), student_bytes in zip(pending, references):
+            if isinstance(student_bytes, Exception):
+                print(f"Compare error for {key}: {student_bytes}")
+                failed_ers.add(er)
+                continue
+            pairs.extend(
+                (er, key, student_bytes, group_bytes, quality_report)
+                for group_bytes, quality_report in images
+            )
+        stats["match_calls"] += len(pairs)
+
+        results = await asyncio.gather(
+            *[_io(limit, compare_reference, rekognition, student_bytes, group_bytes)
+              for _, _, student_bytes, group_bytes, _ in pairs],
+            return_exceptions=True,
+        )
+        for (er, key, _, _, quality_report), found in zip(pairs, results):
+            if isinstance(found, Exception):
+                print(f"Compare error for {key}: {found}")
+                failed_ers.add(er)
+                quality_report["match_errors"] += 1
+                continue
+            record_reference_result(key, found)
+            if found:
+                matched.add(er)
+
+    total = sum(len(keys) for keys in schedule.values()) * len(images)
+    stats["match_calls_skipped"] += total - attempted
+    await _io(limit, save_hit_rates)
+    return matched
+
+
+@in_attendance_context
+async def mark_batch_attendance_async(
+    batch_name,
+    class_name,
+    subject,
+    group_image_files,
+    s3_bucket="ict-attendances",
+    region="ap-south-1",
+    tiling=None,
+):
+    """
+    Concurrent version of mark_batch_attendance_s3: detection overlaps the
+    roster listing, then unique-face searches (or, as a fallback, rounds of
+    reference/group image comparisons) are issued concurrently until the
+    roster is complete. Same return value.
+    """
+    rekognition = get_client("rekognition", region)
+    limit = asyncio.Semaphore(AWS_MAX_CONCURRENCY)
+
+    group_images = [img.read() for img in group_image_files]
+
+    detections = asyncio.gather(*[
+        _io(limit, detect_and_assess, rekognition, group_bytes, idx, tiling)
+        for idx, group_bytes in enumerate(group_images, start=1)
+    ])
+
+    batch_roster = await _io(limit, get_roster, s3_bucket, batch_name)
+    roster = batch_roster["students"]
+
+    detections = await detections
+    quality_reports = [quality_report for quality_report, _ in detections]
+
+    stats = new_session_stats()
+    stats["images"] = len(group_images)
+    stats["faces_detected"] = sum(len(faces) for _, faces in detections)
+
+    present_ers, failed_ers = set(), set()
+    with_faces = [
+        (group_bytes, quality_report, faces)
+        for group_bytes, (quality_report, faces) in zip(group_images, detections)
+        if faces
+    ]
+    compare_images = [(group_bytes, quality_report) for group_bytes, quality_report, _ in with_faces]
+
+    if FACE_CROP_MATCHING and with_faces:
+        selections = await asyncio.gather(
+            *[_io(limit, select_image_crops, group_bytes, faces, quality_report)
+              for group_bytes, quality_report, faces in with_faces],
+            return_exceptions=True,
+        )
+
+        session_crops, crop_images, compare_images = [], {}, []
+        for (group_bytes, quality_report, _), crops in zip(with_faces, selections):
+            if isinstance(crops, Exception):
+                print(f"Crop selection failed for image {quality_report['image_index']}, comparing full image: {crops}")
+                compare_images.append((group_bytes, quality_report))
+                continue
+            quality_report["match_errors"] = 0
+            # Every face rejected by the selection thresholds: compare in full
+            if not crops:
+                compare_images.append((group_bytes, quality_report))
+                continue
+            session_crops.extend(crops)
+            crop_images[quality_report["image_index"]] = (group_bytes, quality_report)
+
+        if session_crops:
+            clusters = await _io(limit, dedup_faces, session_crops)
+            stats["faces_selected"] = len(session_crops)
+            stats["unique_faces"] = len(clusters)
+            stats["match_calls_saved_by_dedup"] = len(session_crops) - len(clusters)
+
+            reports_by_index = {i: report for i, (_, report) in crop_images.items()}
+            try:
+                collection_id = await _io(
+                    limit, ensure_batch_collection, rekognition, s3_bucket, batch_name, batch_roster["keys"]
+                )
+                matched, failed_images = await _match_unique_faces_async(
+                    limit, rekognition, clusters, roster, reports_by_index, stats, collection_id
+                )
+                present_ers |= matched
+                # Images with a failed search are compared in full
+                compare_images.extend(crop_images[i] for i in sorted(failed_images))
+            except Exception as e:
+                print(f"Crop matching unavailable, comparing full images: {e}")
+                compare_images.extend(crop_images.values())
+
+    if compare_images:
+        present_ers = await _compare_all_async(
+            limit, rekognition, s3_bucket, batch_roster["references"], compare_images, failed_ers, stats, present_ers
+        )
+
+    present_students = {
+        er: {"er_number": er, "name": name} for er, name in roster.items() if er in present_ers
+    }
+    absent_students = build_absent_list(roster, present_ers, failed_ers)
+    attendance_list = list(present_students.values())
+    observe_matches(len(attendance_list))
+    set_attributes(images=stats["images"], faces=stats["faces_detected"], present=len(attendance_list))
+
+    # The report upload runs on a thread; analytics and alerts are queued
+    report_url = await _io(
+        limit, complete_attendance,
+        attendance_list, absent_students, batch_name, class_name, subject, s3_bucket, region,
+    )
+
+    return attendance_list, absent_students, report_url, quality_reports, stats
+
+
+# -------------------------------
+# ROUTES (alongside the sync ones)
+# -------------------------------
+# Flask runs an async view to completion on the worker thread that received
+# the request, so under gunicorn (WSGI, gthread) each call still holds one
+# worker thread for its whole duration. What these routes gain is the AWS
+# calls of a single request running concurrently (lower latency), not more
+# requests per worker; that needs an ASGI server, which is not set up here.
+
+@async_bp.route("/api/async/check_quality", methods=["POST"])
+async def check_quality_async():
+    try:
+        group_images = request.files.getlist('class_images')
+        if not group_images:
+            return jsonify({"success": False, "error": "No images provided"}), 400
+
+        quality_reports = await assess_quality_async(group_images)
+
+        return jsonify({
+            "success": True,
+            "quality_reports": quality_reports
+        }), 200
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+@async_bp.route("/api/async/take_attendance", methods=["POST"])
+async def take_attendance_async():
+    try:
+        batch_name = request.form.get('batch_name')
+        subject_name = request.form.get('subject_name')
+        lab_name = request.form.get('lab_name', '')
+        tiling = request.form.get('tiling') or None
+
+        uploads = request.files.getlist('class_images')
+        clips = request.files.getlist('class_video')
+        if not batch_name or not subject_name or not (uploads or clips):
+            return jsonify({"success": False, "error": "Batch, Subject, and class_images are required"}), 400
+        if tiling not in (None, "auto", "on", "off"):
+            return jsonify({"success": False, "error": "tiling must be auto, on or off"}), 400
+
+        # Decoding is CPU-bound: off the event loop, outside the AWS limit
+        group_images, videos = await asyncio.get_running_loop().run_in_executor(
+            _get_executor(), expand_uploads, uploads, clips
+        )
+        if not group_images:
+            return jsonify({"success": False, "error": "No usable frames found in the uploaded video"}), 400
+
+        attendance_list, absent_students, file_url, quality_reports, session_stats = await mark_batch_attendance_async(
+            batch_name=batch_name,
+            class_name=lab_name,
+            subject=subject_name,
+            group_image_files=group_images,
+            tiling=tiling
+        )
+        return jsonify({
+            "success": True,
+            "present": attendance_list,
+            "absent": absent_students,
+            "report_url": file_url,
+            "quality_reports": quality_reports,
+            "session": session_stats,
+            "videos": videos
+        }), 200
+    except VideoError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
@@ -0,0 +1,71 @@
+import os
+from datetime import datetime
+from dotenv import load_dotenv
+from core.event_bus import publish, subscribe
+from core.response_cache import invalidate_reports_cache
+
+load_dotenv()
+
+# -------------------------------
+# POST-ATTENDANCE CONSUMERS
+# -------------------------------
+# A finished attendance run (sync, async or live) writes its report on the
+# request path, so the URL it returns always points at a saved report, then
+# publishes "report.saved" for the follow-ups that need the report in S3:
+# the analytics cache refresh, a new eligibility snapshot and, with
+# ABSENCE_ALERTS=1, the parent alerts of core.low_attendance_alert.
+# Follow-ups that exhaust their retries are dead-lettered; replay them with
+#
+#   python -m core.attendance_events
+REPORT_SAVED = "report.saved"
+
+ABSENCE_ALERTS = os.getenv("ABSENCE_ALERTS", "0") == "1"
+
+
+def complete_attendance(present, absent, batch_name, class_name, subject, s3_bucket, region):
+    """Save a finished run's report, queue its follow-ups; returns the report URL."""
+    from core.mark_batch_attendance import report_location, save_attendance_to_excel
+
+    taken_at = datetime.now()
+    _, report_key, report_url = report_location(batch_name, class_name, subject, s3_bucket, region, taken_at)
+    save_attendance_to_excel(present, absent, batch_name, class_name, subject, s3_bucket, region, now=taken_at)
+    publish(REPORT_SAVED, {
+        "report_key": report_key,
+        "report_url": report_url,
+        "batch_name": batch_name,
+        "subject": subject,
+    })
+    return report_url
+
+
+def refresh_analytics(event):
+    invalidate_reports_cache()
+
+
+def refresh_eligibility(event):
+    from core.eligibility_snapshot import refresh_snapshot
+
+    refresh_snapshot(force=True)
+
+
+def send_absence_alerts(event):
+    from core.low_attendance_alert import trigger_alert
+
+    summary = trigger_alert(event["payload"]["report_key"])
+    # Retried deliveries skip parents already texted (notification ledger)
+    if summary["failed"]:
+        raise RuntimeError(f"{summary['failed']} absence alerts failed")
+
+
+subscribe(REPORT_SAVED, "analytics", refresh_analytics)
+subscribe(REPORT_SAVED, "eligibility", refresh_eligibility)
+if ABSENCE_ALERTS:
+    subscribe(REPORT_SAVED, "notifications", send_absence_alerts)
+
+
+if __name__ == "__main__":
+    from core.event_bus import SyncEventBus, replay_dead_letters, set_bus
+
+    # Inline, so every replayed delivery has finished (or been dead-lettered again) on exit
+    set_bus(SyncEventBus())
+    print(f"Replayed {replay_dead_letters()} dead-lettered deliveries")
@@ -0,0 +1,100 @@
+import os
+import threading
+from dotenv import load_dotenv
+
+# -----------------------
+# Load environment
+# -----------------------
+load_dotenv()
+
+AWS_REGION = os.getenv("AWS_REGION", "ap-south-1")
+# AWS_ACCESS_KEY / AWS_SECRET_KEY (main.py's names), else the standard
+# AWS_ACCESS_KEY_ID / AWS_SECRET_ACCESS_KEY; with neither set, boto3's default
+# credential chain (instance role, ~/.aws) is used.
+AWS_ACCESS_KEY = os.getenv("AWS_ACCESS_KEY") or os.getenv("AWS_ACCESS_KEY_ID")
+AWS_SECRET_KEY = os.getenv("AWS_SECRET_KEY") or os.getenv("AWS_SECRET_ACCESS_KEY")
+
+# -----------------------
+# Shared, lazily created boto3 clients
+# -----------------------
+# Clients are built on first use rather than at import time (boto3 loads its
+# service models when a client is created), then shared: boto3 clients are
+# thread-safe, client *creation* is not, hence the lock.
+_clients = {}
+_lock = threading.Lock()
+
+# Calls to these services go through core.rate_limiter (token buckets +
+# throttling retries), so botocore's own retries are switched off for them.
+RATE_LIMITED_SERVICES = {"rekognition"}
+
+# "rekognition" (AWS) or "local" (core.local_recognition: OpenCV models on
+# CPU, no AWS calls, no per-call cost)
+RECOGNITION_BACKEND = os.getenv("RECOGNITION_BACKEND", "rekognition")
+
+
+def _wrap(service, client):
+    if service in RATE_LIMITED_SERVICES:
+        from core.rate_limiter import RateLimitedClient
+        client = RateLimitedClient(client)
+    elif service == "s3":
+        # Latency and bytes per call (core.pipeline_metrics)
+        from core.pipeline_metrics import InstrumentedS3Client
+        client = InstrumentedS3Client(client)
+    return _traced(service, client)
+
+
+def _traced(service, client):
+    # One span per API call when TRACING is on (core.tracing)
+    from core.tracing import TRACING_ENABLED, TracedClient
+    return TracedClient(client, service) if TRACING_ENABLED else client
+
+
+def get_client(service, region=None):
+    region = region or AWS_REGION
+    local = service == "rekognition" and RECOGNITION_BACKEND == "local"
+    # One local backend (and its collections) whatever region is asked for
+    key = (service, "local" if local else region)
+
+    client = _clients.get(key)
+    if client is None:
+        with _lock:
+            client = _clients.get(key)
+            if client is None and local:
+                from core.local_recognition import LocalRecognitionClient
+                client = _clients[key] = _traced(service, LocalRecognitionClient())
+            elif client is None:
+                import boto3
+                from botocore.config import Config
+
+                config = None
+                # core.rate_limiter retries throttling and transient errors
+                if service in RATE_LIMITED_SERVICES:
+                    config = Config(retries={"mode": "standard", "max_attempts": 1})
+
+                client = _wrap(service, boto3.client(
+                    service,
+                    region_name=region,
+                    aws_access_key_id=AWS_ACCESS_KEY,
+                    aws_secret_access_key=AWS_SECRET_KEY,
+                    config=config
+                ))
+                _clients[key] = client
+    return client
+
+
+def aws_error_code(error):
+    """botocore ClientError code (or the exception class name for stand-ins)."""
+    code = getattr(error, "response", {}).get("Error", {}).get("Code")
+    return code or type(error).__name__
+
+
+def register_client(service, client, region=None):
+    """Install a ready-made client (local stand-ins for benchmarks and tests)."""
+    with _lock:
+        _clients[(service, region or AWS_REGION)] = _wrap(service, client)
+
+
+def reset_clients():
+    """Forget every cached client (e.g. in a freshly forked worker)."""
+    with _lock:
+        _clients.clear()
@@ -0,0 +1,285 @@
+import bisect
+import fcntl
+import io
+import json
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from dotenv import load_dotenv
+from core.aws_clients import get_client
+
+load_dotenv()
+
+# -------------------------------
+# ELIGIBILITY SNAPSHOTS
+# -------------------------------
+# Per-student attendance (present / total / percentage, per batch and per
+# subject) is rebuilt from the reports every ELIGIBILITY_SNAPSHOT_INTERVAL
+# seconds and after each saved report, and stored as one versioned JSON
+# document ("s3": snapshots/eligibility.json in the bucket, shared by every
+# worker and host; "local": ELIGIBILITY_SNAPSHOT_DIR). /api/eligibility and
+# /api/trigger-low-attendance-alert only read the latest snapshot.
+#
+# A student's total is the number of reports of their batch they appear in
+# (present or absent), so both endpoints agree on every percentage.
+BUCKET_NAME = os.getenv("BUCKET_NAME", "ict-attendances")
+REPORTS_PREFIX = "reports/"
+ELIGIBILITY_SNAPSHOT_INTERVAL = int(os.getenv("ELIGIBILITY_SNAPSHOT_INTERVAL", 300))
+ELIGIBILITY_SNAPSHOT_STORE = os.getenv("ELIGIBILITY_SNAPSHOT_STORE", "s3")
+ELIGIBILITY_SNAPSHOT_DIR = os.getenv("ELIGIBILITY_SNAPSHOT_DIR", "snapshots")
+SNAPSHOT_KEY = "snapshots/eligibility.json"
+
+_latest = None          # {"snapshot", "percentages"} of the snapshot being served
+_report_rows = {}       # report key -> (ETag, rows): reports are parsed once
+_build_lock = threading.Lock()
+_scheduler_pid = None
+
+
+# -------------------------------
+# BUILD
+# -------------------------------
+
+def _column(df, *names):
+    for name in names:
+        if name in df.columns:
+            return df[name]
+    return None
+
+
+def report_rows(key, body):
+    """
+    One row per student of a report: (er_number, name, batch, subject, present).
+    Reports without a Status column (CSV exports) list present students only.
+    """
+    import pandas as pd
+
+    df = pd.read_csv(io.BytesIO(body), dtype=str) if key.endswith(".csv") else pd.read_excel(io.BytesIO(body), dtype=str)
+    er_numbers = _column(df, "ER Number")
+    if er_numbers is None or df.empty:
+        return []
+
+    rows = pd.DataFrame({
+        "er_number": er_numbers.astype(str).str.strip(),
+        "name": _column(df, "Name", "Student Name"),
+        "batch": _column(df, "Batch"),
+        "subject": _column(df, "Subject", "Subject Name"),
+    }).fillna({"batch": "Unknown", "subject": "Unknown"})
+    status = _column(df, "Status")
+    rows["present"] = True if status is None else status.astype(str).str.lower().eq("present")
+
+    # A student listed twice in one report counts once, present if either says so
+    rows = rows.sort_values("present", ascending=False).drop_duplicates("er_number")
+    return list(rows.itertuples(index=False, name=None))
+
+
+def _list_reports(s3):
+    paginator = s3.get_paginator("list_objects_v2")
+    for page in paginator.paginate(Bucket=BUCKET_NAME, Prefix=REPORTS_PREFIX):
+        for obj in page.get("Contents", []):
+            key = obj["Key"]
+            if key.endswith((".xlsx", ".csv")) and os.path.basename(key).lower() != "students.xlsx":
+                yield key, obj.get("ETag") or str(obj.get("LastModified"))
+
+
+def build_snapshot(version=1):
+    import pandas as pd
+
+    s3 = get_client("s3")
+    reports = dict(_list_reports(s3))
+
+    for key, etag in reports.items():
+        cached = _report_rows.get(key)
+        if cached and cached[0] == etag:
+            continue
+        try:
+            body = s3.get_object(Bucket=BUCKET_NAME, Key=key)["Body"].read()
+            _report_rows[key] = (etag, report_rows(key, body))
+        except Exception as e:
+            print(f"ELIGIBILITY: skipping unreadable report {key}: {e}")
+            _report_rows[key] = (etag, [])
+    for key in set(_report_rows) - set(reports):
+        del _report_rows[key]
+
+    frame = pd.DataFrame(
+        [row for key in reports for row in _report_rows[key][1]],
+        columns=["er_number", "name", "batch", "subject", "present"],
+    )
+
+    students = []
+    if not frame.empty:
+        frame["present"] = frame["present"].astype(int)
+        by_subject = frame.groupby(["er_number", "batch", "subject"])["present"].agg(["sum", "count"])
+        names = frame.groupby("er_number")["name"].first()
+
+        for (er, batch), subjects in by_subject.groupby(level=[0, 1]):
+            present, total = int(subjects["sum"].sum()), int(subjects["count"].sum())
+            students.append({
+                "er_number": er,
+                "name": names.get(er) or er,
+                "batch": batch,
+                "present_count": present,
+                "total_classes": total,
+                "attendance_percentage": round(present / total * 100, 1) if total else 0.0,
+                "subjects": [
+                    {
+                        "subject": subject,
+                        "present": int(row["sum"]),
+                        "total": int(row["count"]),
+                        "percentage": round(row["sum"] / row["count"] * 100, 1),
+                    }
+                    for (_, _, subject), row in subjects.iterrows()
+                ],
+            })
+
+    present_total = sum(s["present_count"] for s in students)
+    class_total = sum(s["total_classes"] for s in students)
+    subject_summary = (
+        frame[frame["present"] == 1].groupby("subject")["er_number"].nunique()
+        if not frame.empty else {}
+    )
+
+    # Sorted by percentage so a threshold query is a bisect
+    students.sort(key=lambda s: (s["attendance_percentage"], s["er_number"]))
+    return {
+        "version": version,
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+        "reports": len(reports),
+        "students": students,
+        "avg_attendance_pct": f"{round(present_total / class_total * 100, 1) if class_total else 0.0}%",
+        "subject_summary": [
+            {"subject": str(subject), "present": int(count)} for subject, count in dict(subject_summary).items()
+        ],
+    }
+
+
+# -------------------------------
+# STORE
+# -------------------------------
+
+def _local_path():
+    return os.path.join(ELIGIBILITY_SNAPSHOT_DIR, "eligibility.json")
+
+
+def load_stored_snapshot():
+    try:
+        if ELIGIBILITY_SNAPSHOT_STORE == "local":
+            with open(_local_path()) as f:
+                return json.load(f)
+        body = get_client("s3").get_object(Bucket=BUCKET_NAME, Key=SNAPSHOT_KEY)["Body"].read()
+        return json.loads(body)
+    except Exception:
+        return None
+
+
+def store_snapshot(snapshot):
+    data = json.dumps(snapshot)
+    if ELIGIBILITY_SNAPSHOT_STORE == "local":
+        os.makedirs(ELIGIBILITY_SNAPSHOT_DIR, exist_ok=True)
+        tmp = f"{_local_path()}.tmp"
+        with open(tmp, "w") as f:
+            f.write(data)
+        os.replace(tmp, _local_path())
+    else:
+        get_client("s3").put_object(
+            Bucket=BUCKET_NAME, Key=SNAPSHOT_KEY, Body=data.encode(), ContentType="application/json"
+        )
+
+
+# -------------------------------
+# SERVE
+# -------------------------------
+
+def snapshot_age(snapshot):
+    generated_at = datetime.fromisoformat(snapshot["generated_at"])
+    return round((datetime.now(timezone.utc) - generated_at).total_seconds(), 1)
+
+
+def _serve(snapshot):
+    global _latest
+    if _latest is None or snapshot["version"] >= _latest["snapshot"]["version"]:
+        _latest = {
+            "snapshot": snapshot,
+            "percentages": [s["attendance_percentage"] for s in snapshot["students"]],
+        }
+
+
+def refresh_snapshot(force=False):
+    """
+    Serve the stored snapshot if it is fresh (another worker built it),
+    otherwise build, store and serve a new version. Returns the snapshot.
+    """
+    with _build_lock:
+        stored = load_stored_snapshot()
+        if stored and not force and snapshot_age(stored) < ELIGIBILITY_SNAPSHOT_INTERVAL:
+            _serve(stored)
+            return stored
+
+        # One builder per host; the others keep serving what they have
+        os.makedirs(ELIGIBILITY_SNAPSHOT_DIR, exist_ok=True)
+        with open(os.path.join(ELIGIBILITY_SNAPSHOT_DIR, ".build.lock"), "w") as lock:
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                if stored:
+                    _serve(stored)
+                return stored
+
+            snapshot = build_snapshot(version=(stored or {}).get("version", 0) + 1)
+            store_snapshot(snapshot)
+            _serve(snapshot)
+            return snapshot
+
+
+def latest_snapshot():
+    """The snapshot being served; built on the spot only if none exists yet."""
+    if _latest is None:
+        stored = load_stored_snapshot()
+        if stored:
+            _serve(stored)
+        else:
+            refresh_snapshot(force=True)
+    if _latest is None:
+        raise ValueError("Eligibility snapshot is still being built")
+    return _latest["snapshot"]
+
+
+def snapshot_info(snapshot):
+    return {
+        "version": snapshot["version"],
+        "generated_at": snapshot["generated_at"],
+        "age_seconds": snapshot_age(snapshot),
+        "reports": snapshot["reports"],
+    }
+
+
+def students_below(threshold):
+    """Students under the threshold percentage, lowest first."""
+    latest_snapshot()
+    served = _latest
+    return served["snapshot"]["students"][:bisect.bisect_left(served["percentages"], threshold)]
+
+
+# -------------------------------
+# SCHEDULER
+# -------------------------------
+
+def _run_scheduler():
+    while True:
+        try:
+            refresh_snapshot()
+        except Exception as e:
+            print("ELIGIBILITY SNAPSHOT ERROR:", e)
+        time.sleep(ELIGIBILITY_SNAPSHOT_INTERVAL)
+
+
+def start_snapshot_scheduler():
+    """
+    Refresh snapshots in the background, once per process (call again after
+    a fork). ELIGIBILITY_SNAPSHOT_INTERVAL=0 disables.
+    """
+    global _scheduler_pid
+    if _scheduler_pid == os.getpid() or ELIGIBILITY_SNAPSHOT_INTERVAL <= 0:
+        return
+    _scheduler_pid = os.getpid()
+    threading.Thread(target=_run_scheduler, name="eligibility-snapshots", daemon=True).start()
@@ -0,0 +1,221 @@
+import fcntl
+import json
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from dotenv import load_dotenv
+from core.ann_index import ANN_MIN_ROWS, ANN_SUFFIXES, load_or_build, search_ann, top_k
+
+load_dotenv()
+
+# -------------------------------
+# PER-BATCH EMBEDDING INDEX
+# -------------------------------
+# Roster embeddings for the local recognition backend, built at enrolment
+# (upload_multiple_images) rather than per attendance request. One index
+# per batch prefix, laid out as
+#
+#   <EMBEDDING_INDEX_DIR>/<batch>/current.json     {"version": ..., "count": n}
+#   <EMBEDDING_INDEX_DIR>/<batch>/<version>.npy    float32 (n, dim), memory-mapped
+#   <EMBEDDING_INDEX_DIR>/<batch>/<version>.json   [{"key", "external_id"}] per row
+#
+# Writers build a complete new version and swap current.json with
+# os.replace, so readers always see a consistent matrix + id table.
+EMBEDDING_INDEX_DIR = os.getenv("EMBEDDING_INDEX_DIR", "embedding_index")
+# Old versions kept after a swap (readers may still have them mapped)
+EMBEDDING_INDEX_KEEP_VERSIONS = int(os.getenv("EMBEDDING_INDEX_KEEP_VERSIONS", 2))
+
+_loaded = {}       # name -> (current.json mtime_ns, version, ids, matrix)
+_ann = {}          # (name, version) -> ANN structure (core.ann_index)
+_lock = threading.Lock()
+# Held by writers (with the file lock) for a whole write, ANN build included,
+# so it is kept apart from _lock, which searches take
+_write_mutex = threading.Lock()
+
+
+def index_name(batch_prefix):
+    """Directory name for a batch prefix as passed to list_student_images_from_s3."""
+    return re.sub(r"[^a-zA-Z0-9_\-]", "_", batch_prefix.strip("/")) or "_"
+
+
+def _index_dir(name):
+    return os.path.join(EMBEDDING_INDEX_DIR, index_name(name))
+
+
+def index_exists(name):
+    return os.path.exists(os.path.join(_index_dir(name), "current.json"))
+
+
+@contextmanager
+def _write_lock(name):
+    """Serialises writers of one index across threads and worker processes."""
+    path = _index_dir(name)
+    os.makedirs(path, exist_ok=True)
+    with _write_mutex, open(os.path.join(path, ".lock"), "w") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def load_index(name):
+    """
+    (ids, matrix) of an index: ids is a list of {"key", "external_id"}, the
+    matrix a read-only memory-mapped float32 array, or (None, None) when the
+    index does not exist. Reloaded only when current.json changes.
+    """
+    import numpy as np
+
+    path = _index_dir(name)
+    current = os.path.join(path, "current.json")
+    try:
+        mtime = os.stat(current).st_mtime_ns
+    except FileNotFoundError:
+        return None, None
+
+    cached = _loaded.get(name)
+    if cached and cached[0] == mtime:
+        return cached[2], cached[3]
+
+    with open(current) as f:
+        version = json.load(f)["version"]
+    with open(os.path.join(path, f"{version}.json")) as f:
+        ids = json.load(f)
+    matrix = np.load(os.path.join(path, f"{version}.npy"), mmap_mode="r")
+
+    _loaded[name] = (mtime, version, ids, matrix)
+    return ids, matrix
+
+
+def _write_version(name, ids, matrix):
+    import numpy as np
+
+    path = _index_dir(name)
+    version = f"{time.time_ns()}-{os.getpid()}"
+
+    np.save(os.path.join(path, f"{version}.npy"), np.ascontiguousarray(matrix, dtype=np.float32))
+    with open(os.path.join(path, f"{version}.json"), "w") as f:
+        json.dump(ids, f)
+    # The ANN structure is built here, before the swap, so searches only load it
+    if len(ids) >= ANN_MIN_ROWS:
+        load_or_build(os.path.join(path, version), np.load(os.path.join(path, f"{version}.npy"), mmap_mode="r"))
+
+    tmp = os.path.join(path, f"current.json.{version}")
+    with open(tmp, "w") as f:
+        json.dump({"version": version, "count": len(ids)}, f)
+    os.replace(tmp, os.path.join(path, "current.json"))
+
+    versions = sorted(
+        (f[:-4] for f in os.listdir(path) if f.endswith(".npy")),
+        key=lambda v: int(v.split("-")[0]),
+    )
+    for old in versions[:-EMBEDDING_INDEX_KEEP_VERSIONS]:
+        for ext in (".npy", ".json") + ANN_SUFFIXES:
+            try:
+                os.remove(os.path.join(path, old + ext))
+            except OSError:
+                pass
+
+
+def create_index(name, dim):
+    import numpy as np
+
+    with _write_lock(name):
+        if not index_exists(name):
+            _write_version(name, [], np.zeros((0, dim), dtype=np.float32))
+
+
+def add_embeddings(name, entries):
+    """
+    Insert or replace rows: entries is a list of (key, external_id, vector),
+    key identifying the source image (a re-upload replaces its row).
+    """
+    import numpy as np
+
+    if not entries:
+        return
+    with _write_lock(name):
+        ids, matrix = load_index(name)
+        ids, matrix = list(ids or []), np.asarray(matrix) if matrix is not None else None
+
+        new_keys = {key for key, _, _ in entries}
+        keep = [i for i, entry in enumerate(ids) if entry["key"] not in new_keys]
+        vectors = np.stack([np.asarray(v, dtype=np.float32) for _, _, v in entries])
+
+        rows = [matrix[keep]] if matrix is not None and keep else []
+        _write_version(
+            name,
+            [ids[i] for i in keep] + [{"key": k, "external_id": e} for k, e, _ in entries],
+            np.vstack(rows + [vectors]),
+        )
+
+
+def remove_embeddings(name, er_number=None, keys=()):
+    """Drop every row of a student (by ER number) and/or of specific image keys."""
+    import numpy as np
+
+    with _write_lock(name):
+        ids, matrix = load_index(name)
+        if ids is None:
+            return 0
+
+        keys = set(keys)
+        keep = [
+            i for i, entry in enumerate(ids)
+            if entry["key"] not in keys
+            and not (er_number and entry["external_id"].split("_", 1)[0] == er_number)
+        ]
+        if len(keep) != len(ids):
+            _write_version(name, [ids[i] for i in keep], np.asarray(matrix)[keep])
+        return len(ids) - len(keep)
+
+
+def rebuild_index(name, entries, dim):
+    """Replace the whole index with `entries` ((key, external_id, vector)) in one swap."""
+    import numpy as np
+
+    vectors = (
+        np.stack([np.asarray(v, dtype=np.float32) for _, _, v in entries])
+        if entries else np.zeros((0, dim), dtype=np.float32)
+    )
+    with _write_lock(name):
+        _write_version(name, [{"key": k, "external_id": e} for k, e, _ in entries], vectors)
+
+
+def _get_ann(name, matrix):
+    """
+    ANN structure of the loaded version of an index, saved by the writer.
+    Loaded (or, for a version written before it was, built) outside _lock.
+    """
+    version = _loaded[name][1]
+    ann = _ann.get((name, version))
+    if ann is None:
+        ann = load_or_build(os.path.join(_index_dir(name), version), matrix)
+        with _lock:
+            for stale in [key for key in _ann if key[0] == name and key[1] != version]:
+                del _ann[stale]
+            ann = _ann.setdefault((name, version), ann)
+    return ann
+
+
+def search_index(name, query, k=1):
+    """
+    Top-k rows by cosine similarity to an L2-normalised query:
+    [(external_id, key, cosine)], best first. None when the index is missing.
+    Indexes of ANN_MIN_ROWS or more rows are searched approximately.
+    """
+    ids, matrix = load_index(name)
+    if ids is None:
+        return None
+    if not ids:
+        return []
+
+    if len(ids) >= ANN_MIN_ROWS:
+        hits = search_ann(_get_ann(name, matrix), matrix, query, k)
+    else:
+        similarities = matrix @ query
+        hits = [(i, float(similarities[i])) for i in top_k(similarities, k)]
+    return [(ids[i]["external_id"], ids[i]["key"], cosine) for i, cosine in hits]
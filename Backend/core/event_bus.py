@@ -0,0 +1,242 @@
+import atexit
+import fcntl
+import json
+import os
+import queue
+import threading
+import time
+import uuid
+from datetime import datetime
+from dotenv import load_dotenv
+from prometheus_client import Counter
+from core.tracing import span
+
+load_dotenv()
+
+# -------------------------------
+# EVENT BUS
+# -------------------------------
+# Work that follows an event (a finished attendance run, a saved report) is
+# handed to consumers subscribed to that event type instead of being done in
+# the request. Each consumer gets its own delivery: a failing consumer is
+# retried with exponential backoff up to EVENT_MAX_RETRIES times and then
+# written to DEAD_LETTER_FILE, without holding up the others.
+#
+# EVENT_BUS "local" (default) runs deliveries on EVENT_WORKERS threads in
+# this process; events still queued when the process exits are drained for
+# up to EVENT_DRAIN_TIMEOUT seconds and lost after that. "sync" runs them
+# inline in publish() (scripts, debugging). Other transports plug in with
+# register_bus.
+EVENT_BUS = os.getenv("EVENT_BUS", "local")
+EVENT_WORKERS = int(os.getenv("EVENT_WORKERS", 2))
+EVENT_MAX_RETRIES = int(os.getenv("EVENT_MAX_RETRIES", 3))
+EVENT_RETRY_BASE_DELAY = float(os.getenv("EVENT_RETRY_BASE_DELAY", 2))
+EVENT_DRAIN_TIMEOUT = float(os.getenv("EVENT_DRAIN_TIMEOUT", 30))
+DEAD_LETTER_FILE = os.getenv("DEAD_LETTER_FILE", "dead_letters.jsonl")
+
+EVENT_DELIVERIES = Counter(
+    "event_deliveries_total",
+    "Event deliveries to consumers by outcome (ok, retry, dead_letter)",
+    ["event", "consumer", "result"],
+)
+
+_consumers = {}     # event type -> {consumer name: handler}
+_consumers_lock = threading.Lock()
+
+
+def subscribe(event_type, name, handler):
+    """Call handler(event) for every event of this type; name identifies it in metrics and dead letters."""
+    with _consumers_lock:
+        _consumers.setdefault(event_type, {})[name] = handler
+
+
+def consumers_for(event_type):
+    with _consumers_lock:
+        return dict(_consumers.get(event_type, {}))
+
+
+def new_event(event_type, payload):
+    return {
+        "id": uuid.uuid4().hex,
+        "type": event_type,
+        "published_at": datetime.now().isoformat(),
+        "payload": payload,
+    }
+
+
+def _retry_delay(attempt):
+    return EVENT_RETRY_BASE_DELAY * (2 ** (attempt - 1))
+
+
+def dead_letter(event, consumer, attempts, error):
+    line = json.dumps({
+        "event": event,
+        "consumer": consumer,
+        "attempts": attempts,
+        "error": str(error),
+        "failed_at": datetime.now().isoformat(),
+    })
+    try:
+        with open(DEAD_LETTER_FILE, "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                f.write(line + "\n")
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+    except OSError as e:
+        print(f"Could not write dead letter for {consumer}: {e}")
+    EVENT_DELIVERIES.labels(event["type"], consumer, "dead_letter").inc()
+    print(f"Event {event['type']} {event['id']} dead-lettered for {consumer} after {attempts} attempts: {error}")
+
+
+def _deliver(event, consumer, handler, attempt):
+    """Run one delivery; returns the retry delay, or None when it is finished."""
+    try:
+        with span(f"event {event['type']}", consumer=consumer, event_id=event["id"], attempt=attempt):
+            handler(event)
+    except Exception as e:
+        if attempt > EVENT_MAX_RETRIES:
+            dead_letter(event, consumer, attempt, e)
+            return None
+        print(f"Consumer {consumer} failed on {event['type']} (attempt {attempt}), retrying: {e}")
+        EVENT_DELIVERIES.labels(event["type"], consumer, "retry").inc()
+        return _retry_delay(attempt)
+    EVENT_DELIVERIES.labels(event["type"], consumer, "ok").inc()
+    return None
+
+
+class SyncEventBus:
+    """Deliveries run inline, retries included, before publish() returns."""
+
+    def publish(self, event):
+        for consumer, handler in consumers_for(event["type"]).items():
+            self.redeliver(event, consumer, handler)
+
+    def redeliver(self, event, consumer, handler):
+        attempt = 1
+        while True:
+            delay = _deliver(event, consumer, handler, attempt)
+            if delay is None:
+                return
+            time.sleep(delay)
+            attempt += 1
+
+    def drain(self, timeout=None):
+        return True
+
+
+class LocalEventBus:
+    """In-process queue worked by background threads; retries wait on timers, not workers."""
+
+    def __init__(self, workers=None):
+        self._queue = queue.Queue()
+        self._pending = 0
+        self._idle = threading.Condition()
+        for i in range(workers or EVENT_WORKERS):
+            threading.Thread(target=self._work, name=f"event-worker-{i}", daemon=True).start()
+
+    def publish(self, event):
+        for consumer, handler in consumers_for(event["type"]).items():
+            self.redeliver(event, consumer, handler)
+
+    def redeliver(self, event, consumer, handler, attempt=1):
+        with self._idle:
+            self._pending += 1
+        self._queue.put((event, consumer, handler, attempt))
+
+    def _done(self):
+        with self._idle:
+            self._pending -= 1
+            if not self._pending:
+                self._idle.notify_all()
+
+    def _retry_later(self, job, delay):
+        timer = threading.Timer(delay, self._queue.put, args=(job,))
+        timer.daemon = True
+        timer.start()
+
+    def _work(self):
+        while True:
+            event, consumer, handler, attempt = self._queue.get()
+            delay = _deliver(event, consumer, handler, attempt)
+            if delay is None:
+                self._done()
+            else:
+                # Still pending: the retry is re-queued when the timer fires
+                self._retry_later((event, consumer, handler, attempt + 1), delay)
+
+    def pending(self):
+        with self._idle:
+            return self._pending
+
+    def drain(self, timeout=None):
+        """Wait until every queued delivery (retries included) has finished."""
+        with self._idle:
+            return self._idle.wait_for(lambda: not self._pending, timeout)
+
+
+_bus_factories = {"local": LocalEventBus, "sync": SyncEventBus}
+_bus = None
+_bus_lock = threading.Lock()
+
+
+def register_bus(name, factory):
+    _bus_factories[name] = factory
+
+
+def get_bus():
+    global _bus
+    if _bus is None:
+        with _bus_lock:
+            if _bus is None:
+                _bus = _bus_factories[EVENT_BUS]()
+    return _bus
+
+
+def set_bus(bus):
+    """Install a bus instance (tests, scripts)."""
+    global _bus
+    _bus = bus
+
+
+def publish(event_type, payload):
+    """Hand an event to its consumers; returns the event (with its id)."""
+    event = new_event(event_type, payload)
+    get_bus().publish(event)
+    return event
+
+
+def replay_dead_letters():
+    """
+    Deliver every dead-lettered event again to the consumer that failed it.
+    Entries whose consumer no longer exists are kept. Returns the count replayed.
+    """
+    try:
+        with open(DEAD_LETTER_FILE, "r+") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                entries = [json.loads(line) for line in f if line.strip()]
+                f.seek(0)
+                f.truncate()
+                replay = []
+                for entry in entries:
+                    handler = consumers_for(entry["event"]["type"]).get(entry["consumer"])
+                    if handler is None:
+                        f.write(json.dumps(entry) + "\n")
+                    else:
+                        replay.append((entry["event"], entry["consumer"], handler))
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+    except FileNotFoundError:
+        return 0
+
+    bus = get_bus()
+    for event, consumer, handler in replay:
+        bus.redeliver(event, consumer, handler)
+    return len(replay)
+
+
+@atexit.register
+def _drain_on_exit():
+    if _bus is not None and not _bus.drain(EVENT_DRAIN_TIMEOUT):
+        print("Exiting with undelivered events")
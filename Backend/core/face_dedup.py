@@ -0,0 +1,134 @@
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# -------------------------------
+# SESSION FACE DE-DUPLICATION
+# -------------------------------
+# Overlapping photos of one class show most students several times. Faces
+# are clustered across the session's images before matching so each person
+# is matched once. Two faces from the same image are never merged.
+# Identity comes from the local backend's SFace embedding
+# (RECOGNITION_BACKEND=local): crops at FACE_DEDUP_SIMILARITY cosine or more
+# are one person. Without it (Rekognition), and for crops SFace finds no face
+# in, only exact duplicates are merged, by a 32x32 pixel descriptor at
+# FACE_DEDUP_EXACT_SIMILARITY. A wrong merge still costs nothing: matching
+# searches the other members while roster students are unmatched (see
+# search_passes).
+FACE_DEDUP = os.getenv("FACE_DEDUP", "1") == "1"
+# SFace cosine to merge two crops. Kept well above the match threshold
+# (LOCAL_MATCH_COSINE): a missed merge only costs one extra call.
+FACE_DEDUP_SIMILARITY = float(os.getenv("FACE_DEDUP_SIMILARITY", 0.6))
+# Pixel-descriptor cosine treated as the same crop seen twice
+FACE_DEDUP_EXACT_SIMILARITY = float(os.getenv("FACE_DEDUP_EXACT_SIMILARITY", 0.99))
+DESCRIPTOR_SIZE = 32
+
+
+def face_descriptor(crop_bytes):
+    """
+    Pixel descriptor of a face crop: equalised 32x32 grayscale, mean-centred
+    and L2-normalised. Only near-identical crops score close to 1; not an
+    identity embedding.
+    """
+    import cv2
+    import numpy as np
+
+    img = cv2.imdecode(np.frombuffer(crop_bytes, np.uint8), cv2.IMREAD_GRAYSCALE)
+    if img is None:
+        return np.zeros(DESCRIPTOR_SIZE * DESCRIPTOR_SIZE, dtype=np.float32)
+
+    img = cv2.resize(img, (DESCRIPTOR_SIZE, DESCRIPTOR_SIZE), interpolation=cv2.INTER_AREA)
+    img = cv2.equalizeHist(img)
+
+    vector = img.astype(np.float32).ravel()
+    vector -= vector.mean()
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm > 0 else vector
+
+
+def identity_embedder():
+    """crop bytes -> SFace embedding (None without a face) on the local backend, else None."""
+    from core.aws_clients import RECOGNITION_BACKEND, get_client
+
+    if RECOGNITION_BACKEND != "local":
+        return None
+    client = get_client("rekognition")
+
+    def embed(crop_bytes):
+        try:
+            return client.embed_face(crop_bytes)
+        except Exception:
+            return None
+    return embed
+
+
+def face_key(crop_bytes, embed=None):
+    """(pixel descriptor, identity embedding or None) of a crop, compared with same_face."""
+    return face_descriptor(crop_bytes), embed(crop_bytes) if embed else None
+
+
+def same_face(a, b, threshold=None):
+    """True when two face_key()s are one person: same identity, or the same crop."""
+    threshold = FACE_DEDUP_SIMILARITY if threshold is None else threshold
+    if a[1] is not None and b[1] is not None and float(a[1] @ b[1]) >= threshold:
+        return True
+    return float(a[0] @ b[0]) >= FACE_DEDUP_EXACT_SIMILARITY
+
+
+def dedup_faces(crops, embed=None, threshold=None):
+    """
+    Greedily cluster face crops (each with "image_index" and "pixels") from
+    all images of a session. `embed` maps crop bytes to an L2-normalised
+    identity vector or None (default: identity_embedder()).
+
+    Returns a list of {"representative": crop, "members": [crops]}, the
+    representative being the largest crop of the cluster.
+    """
+    if not FACE_DEDUP or len(crops) < 2:
+        return [{"representative": crop, "members": [crop]} for crop in crops]
+
+    embed = embed or identity_embedder()
+    clusters = []
+    keys = []          # first member's face_key per cluster
+
+    for crop in crops:
+        key = face_key(crop["bytes"], embed)
+
+        best = None
+        for i, cluster_key in enumerate(keys):
+            if crop["image_index"] not in clusters[i]["images"] and same_face(key, cluster_key, threshold):
+                best = i
+                break
+
+        if best is None:
+            clusters.append({"members": [crop], "images": {crop["image_index"]}})
+            keys.append(key)
+        else:
+            clusters[best]["members"].append(crop)
+            clusters[best]["images"].add(crop["image_index"])
+
+    return [
+        {
+            "representative": max(cluster["members"], key=lambda c: c.get("pixels", 0)),
+            "members": cluster["members"],
+        }
+        for cluster in clusters
+    ]
+
+
+def search_passes(clusters):
+    """
+    (representatives, other members): the crops to search first, and the
+    ones still to search while roster students remain unmatched. A merged
+    look-alike is found in the second pass rather than reported absent.
+    """
+    return (
+        [cluster["representative"] for cluster in clusters],
+        [
+            member
+            for cluster in clusters
+            for member in cluster["members"]
+            if member is not cluster["representative"]
+        ],
+    )
@@ -0,0 +1,94 @@
+import os
+from dotenv import load_dotenv
+from core.quality_check import decode_image
+
+load_dotenv()
+
+# -------------------------------
+# SELECTION THRESHOLDS
+# -------------------------------
+# Faces failing any of these are not sent for matching. Sharpness/brightness
+# are Rekognition's Quality scores (0-100), pose angles are in degrees.
+FACE_MIN_SIZE_PX = int(os.getenv("FACE_MIN_SIZE_PX", 40))
+FACE_MIN_SHARPNESS = float(os.getenv("FACE_MIN_SHARPNESS", 20))
+FACE_MIN_BRIGHTNESS = float(os.getenv("FACE_MIN_BRIGHTNESS", 15))
+FACE_MAX_YAW = float(os.getenv("FACE_MAX_YAW", 50))
+FACE_MAX_PITCH = float(os.getenv("FACE_MAX_PITCH", 40))
+# Context kept around the bounding box, as a fraction of its size
+FACE_CROP_MARGIN = float(os.getenv("FACE_CROP_MARGIN", 0.3))
+FACE_CROP_JPEG_QUALITY = int(os.getenv("FACE_CROP_JPEG_QUALITY", 90))
+
+
+def face_rejection_reason(face, img_width, img_height):
+    """Why a detected face should not be matched, or None if it is usable."""
+    box = face["BoundingBox"]
+    if min(box["Width"] * img_width, box["Height"] * img_height) < FACE_MIN_SIZE_PX:
+        return "too_small"
+
+    quality = face.get("Quality", {})
+    if quality.get("Sharpness", 100.0) < FACE_MIN_SHARPNESS:
+        return "blurry"
+    if quality.get("Brightness", 100.0) < FACE_MIN_BRIGHTNESS:
+        return "too_dark"
+
+    pose = face.get("Pose", {})
+    if abs(pose.get("Yaw", 0.0)) > FACE_MAX_YAW or abs(pose.get("Pitch", 0.0)) > FACE_MAX_PITCH:
+        return "extreme_pose"
+
+    return None
+
+
+def crop_box(img, box, margin=FACE_CROP_MARGIN):
+    """Crop a Rekognition BoundingBox (ratios) plus margin from a decoded image."""
+    height, width = img.shape[:2]
+    left = box["Left"] - box["Width"] * margin
+    top = box["Top"] - box["Height"] * margin
+    right = box["Left"] + box["Width"] * (1 + margin)
+    bottom = box["Top"] + box["Height"] * (1 + margin)
+
+    x1, y1 = max(0, int(left * width)), max(0, int(top * height))
+    x2, y2 = min(width, int(right * width)), min(height, int(bottom * height))
+    return img[y1:y2, x1:x2]
+
+
+def select_faces(image_bytes, faces):
+    """
+    Crop the usable faces out of a group image.
+    Returns (crops, rejected) where crops is a list of
+    {"face_index", "box", "pixels", "bytes"} (JPEG) and rejected counts drops by reason.
+    """
+    # Lazy import to avoid startup cost / crash if libraries are missing
+    import cv2
+
+    img = decode_image(image_bytes)
+    if img is None:
+        raise ValueError("Could not decode image")
+
+    height, width = img.shape[:2]
+    crops = []
+    rejected = {}
+
+    for i, face in enumerate(faces):
+        reason = face_rejection_reason(face, width, height)
+        if reason:
+            rejected[reason] = rejected.get(reason, 0) + 1
+            continue
+
+        crop = crop_box(img, face["BoundingBox"])
+        if crop.size == 0:
+            rejected["out_of_frame"] = rejected.get("out_of_frame", 0) + 1
+            continue
+
+        ok, buf = cv2.imencode(".jpg", crop, [cv2.IMWRITE_JPEG_QUALITY, FACE_CROP_JPEG_QUALITY])
+        if not ok:
+            rejected["encode_failed"] = rejected.get("encode_failed", 0) + 1
+            continue
+
+        crops.append({
+            "face_index": i,
+            "box": face["BoundingBox"],
+            "pixels": int(crop.shape[0] * crop.shape[1]),
+            "bytes": buf.tobytes(),
+        })
+
+    return crops, rejected
@@ -1,28 +1,89 @@
-import matplotlib
-matplotlib.use('Agg')
-
-import matplotlib.pyplot as plt
 import io
 import base64
-import pandas as pd
-import boto3
+from functools import lru_cache
 import os
 from dotenv import load_dotenv
+from core.aws_clients import get_client
 
 load_dotenv()
-AWS_ACCESS_KEY = os.getenv("AWS_ACCESS_KEY_ID")
-AWS_SECRET_KEY = os.getenv("AWS_SECRET_ACCESS_KEY")
 AWS_REGION = os.getenv("AWS_REGION")
 BUCKET_NAME = os.getenv("AWS_BUCKET_NAME")
 EXCEL_FOLDER_KEY = os.getenv("EXCEL_FOLDER_KEY", "reports/")
 
-def generate_overall_attendance():
-    s3 = boto3.client(
-        's3',
-        region_name=AWS_REGION,
-        aws_access_key_id=AWS_ACCESS_KEY,
-        aws_secret_access_key=AWS_SECRET_KEY
+CHART_FORMATS = ("png", "svg", "data")
+
+
+def _read_report(pd, data):
+    """
+    One report as a DataFrame with lower-case column names. The charts read
+    "student name"; reports written by save_attendance_to_excel call that
+    column "Name", so it is renamed when "Student Name" is absent.
+    """
+    df = pd.read_excel(io.BytesIO(data))
+    df.columns = [col.strip().lower() for col in df.columns]
+    if 'student name' not in df.columns:
+        df = df.rename(columns={'name': 'student name'})
+    return df
+
+
+@lru_cache(maxsize=32)
+def _render_subject_pie_chart(subject_summary, fmt):
+    """
+    Render the subject pie chart for a ((subject, present_count), ...) tuple.
+    Cached on the summary itself, so unchanged data never re-renders.
+    """
+    # Lazy import, and the Figure API rather than pyplot: no global figure
+    # state, so concurrent requests can render safely.
+    from matplotlib.figure import Figure
+
+    subjects = [subject for subject, _ in subject_summary]
+    counts = [count for _, count in subject_summary]
+
+    fig = Figure(figsize=(8, 8))
+    ax = fig.subplots()
+    ax.pie(
+        counts,
+        labels=subjects,
+        autopct='%1.1f%%',
+        startangle=140
     )
+    ax.set_title('Subject-wise Attendance Distribution')
+    fig.tight_layout()
+
+    buf = io.BytesIO()
+    fig.savefig(buf, format=fmt)
+    buf.seek(0)
+
+    if fmt == "svg":
+        return buf.getvalue().decode()
+    return base64.b64encode(buf.getvalue()).decode()
+
+
+def render_subject_pie_chart(subject_summary, fmt="png"):
+    """
+    subject_summary: list of {"subject": str, "present": int}
+    fmt: "png" (base64), "svg" (markup) or "data" (the summary itself,
+    for clients that draw the chart themselves).
+    """
+    if fmt not in CHART_FORMATS:
+        raise ValueError(f"Unsupported chart format: {fmt}")
+    if fmt == "data":
+        return subject_summary
+    if not subject_summary:
+        return None
+
+    key = tuple((item["subject"], item["present"]) for item in subject_summary)
+    return _render_subject_pie_chart(key, fmt)
+
+
+def generate_overall_attendance(chart="png"):
+    """
+    chart: "png" / "svg" / "data" to include subject_pie_chart in that
+    format, or None to skip chart rendering entirely (JSON callers).
+    """
+    import pandas as pd
+
+    s3 = get_client('s3', AWS_REGION)
 
     response = s3.list_objects_v2(Bucket=BUCKET_NAME, Prefix=EXCEL_FOLDER_KEY)
     files = [file['Key'] for file in response.get('Contents', []) if file['Key'].endswith('.xlsx')]
@@ -33,8 +94,7 @@ def generate_overall_attendance():
     combined_df = pd.DataFrame()
     for file_key in files:
         obj = s3.get_object(Bucket=BUCKET_NAME, Key=file_key)
-        df = pd.read_excel(io.BytesIO(obj['Body'].read()))
-        df.columns = [col.strip().lower() for col in df.columns]
+        df = _read_report(pd, obj['Body'].read())
         combined_df = pd.concat([combined_df, df], ignore_index=True)
 
     required_cols = ['date', 'subject', 'student name', 'er number', 'status']
@@ -150,43 +210,31 @@ def generate_overall_attendance():
     else:
         avg_attendance_pct = 0.0
 
-    # Generate Subject Pie Chart (based on PRESENT counts)
-    subject_summary = (
+    # Subject summary (based on PRESENT counts) - the chart is rendered from this
+    subject_summary_df = (
         present_df.groupby('subject')
         .agg({'er number': pd.Series.nunique})
         .reset_index()
     )
+    subject_summary = [
+        {"subject": str(subject), "present": int(count)}
+        for subject, count in zip(subject_summary_df['subject'], subject_summary_df['er number'])
+    ]
 
-    fig, ax = plt.subplots(figsize=(8, 8))
-    ax.pie(
-        subject_summary['er number'],
-        labels=subject_summary['subject'],
-        autopct='%1.1f%%',
-        startangle=140
-    )
-    ax.set_title('Subject-wise Attendance Distribution')
-    plt.tight_layout()
-
-    buf = io.BytesIO()
-    fig.savefig(buf, format='png')
-    plt.close(fig)
-    buf.seek(0)
-    subject_pie_chart = base64.b64encode(buf.getvalue()).decode()
+    subject_pie_chart = render_subject_pie_chart(subject_summary, chart) if chart else None
 
     return {
         "students": students,
         "daily_trend_data": daily_trend_data,
+        "subject_summary": subject_summary,
         "subject_pie_chart": subject_pie_chart,
         "avg_attendance_pct": f"{avg_attendance_pct}%"
     }
 
 def get_student_details(er_number):
-    s3 = boto3.client(
-        's3',
-        region_name=AWS_REGION,
-        aws_access_key_id=AWS_ACCESS_KEY,
-        aws_secret_access_key=AWS_SECRET_KEY
-    )
+    import pandas as pd
+
+    s3 = get_client('s3', AWS_REGION)
 
     response = s3.list_objects_v2(Bucket=BUCKET_NAME, Prefix=EXCEL_FOLDER_KEY)
     files = [file['Key'] for file in response.get('Contents', []) if file['Key'].endswith('.xlsx')]
@@ -197,8 +245,7 @@ def get_student_details(er_number):
     combined_df = pd.DataFrame()
     for file_key in files:
         obj = s3.get_object(Bucket=BUCKET_NAME, Key=file_key)
-        df = pd.read_excel(io.BytesIO(obj['Body'].read()))
-        df.columns = [col.strip().lower() for col in df.columns]
+        df = _read_report(pd, obj['Body'].read())
         combined_df = pd.concat([combined_df, df], ignore_index=True)
 
     required_cols = ['date', 'subject', 'student name', 'er number', 'status']
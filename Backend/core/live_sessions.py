@@ -0,0 +1,392 @@
+import json
+import os
+import threading
+import time
+import uuid
+
+from flask import Blueprint, Response, jsonify, request
+
+from core.attendance_events import complete_attendance
+from core.aws_clients import aws_error_code, get_client
+from core.face_dedup import FACE_DEDUP, face_key, identity_embedder, same_face
+from core.mark_batch_attendance import (
+    FACE_CROP_MATCHING,
+    build_absent_list,
+    compare_full_images,
+    detect_and_assess,
+    ensure_batch_collection,
+    new_session_stats,
+    search_face_crop,
+    select_image_crops,
+)
+from core.pipeline_metrics import attendance_context, observe_matches
+from core.rate_limiter import worker_count
+from core.roster_cache import get_roster
+from core.video_keyframes import VideoError, expand_uploads
+
+live_bp = Blueprint("live_sessions", __name__)
+
+# -------------------------------
+# LIVE SESSIONS
+# -------------------------------
+# A classroom device opens a session, posts frames as they are captured and
+# closes it; each frame is matched on arrival and only the close writes the
+# report. Sessions live in this worker's memory, so clients must reach the
+# same worker for a whole session: the routes refuse to serve when gunicorn
+# runs more than one worker, unless LIVE_SESSION_STICKY_ROUTING=1 says the
+# proxy pins each session to one worker.
+LIVE_SESSION_IDLE_TIMEOUT = int(os.getenv("LIVE_SESSION_IDLE_TIMEOUT", 1800))
+# How long a closed session's final state stays readable
+LIVE_SESSION_RETENTION = int(os.getenv("LIVE_SESSION_RETENTION", 600))
+LIVE_SESSION_STICKY_ROUTING = os.getenv("LIVE_SESSION_STICKY_ROUTING", "0") == "1"
+SSE_KEEPALIVE_SECONDS = 15
+# An event stream holds a worker thread, so it ends after this long; the
+# EventSource reconnects (SSE_RETRY_MS later) with Last-Event-ID and only
+# gets a new state if the session changed meanwhile
+SSE_MAX_SECONDS = int(os.getenv("SSE_MAX_SECONDS", 300))
+SSE_RETRY_MS = 2000
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+def _expire_sessions():
+    """
+    Drop closed sessions after LIVE_SESSION_RETENTION. An open session idle
+    for LIVE_SESSION_IDLE_TIMEOUT is closed like an explicit close, so the
+    attendance from its frames is saved; one that never got a frame is dropped.
+    """
+    now = time.monotonic()
+    idle = []
+    with _sessions_lock:
+        for session_id, session in list(_sessions.items()):
+            if session["status"] == "closed":
+                if now - session["updated_at"] > LIVE_SESSION_RETENTION:
+                    del _sessions[session_id]
+            elif now - session["updated_at"] > LIVE_SESSION_IDLE_TIMEOUT:
+                idle.append(session)
+
+    # Outside _sessions_lock: closing writes the report to S3
+    for session in idle:
+        if not session["stats"]["images"]:
+            print(f"Live session {session['id']} expired without frames, dropping it")
+            with _sessions_lock:
+                _sessions.pop(session["id"], None)
+            continue
+        print(f"Live session {session['id']} idle for {LIVE_SESSION_IDLE_TIMEOUT}s, closing it")
+        try:
+            close_session(session)
+        except Exception as e:
+            print(f"Could not close idle live session {session['id']}: {e}")
+
+
+def create_session(batch_name, class_name, subject, s3_bucket="ict-attendances", region="ap-south-1", tiling=None):
+    _expire_sessions()
+    batch_roster = get_roster(s3_bucket, batch_name)
+
+    session = {
+        "id": uuid.uuid4().hex,
+        "status": "open",
+        "batch_name": batch_name,
+        "class_name": class_name,
+        "subject": subject,
+        "s3_bucket": s3_bucket,
+        "region": region,
+        "tiling": tiling,
+        "roster": batch_roster,
+        "present_ers": set(),
+        "failed_ers": set(),
+        "known_faces": [],        # descriptors of faces already matched
+        "quality_reports": [],
+        "stats": dict(new_session_stats(), frames_skipped=0, faces_skipped_known=0),
+        "report_url": None,
+        "version": 0,
+        "updated_at": time.monotonic(),
+        "lock": threading.Lock(),           # one frame at a time per session
+        "changed": threading.Condition(),   # wakes event streams
+    }
+    with _sessions_lock:
+        _sessions[session["id"]] = session
+    return session
+
+
+def get_session(session_id):
+    _expire_sessions()
+    return _sessions.get(session_id)
+
+
+def _roster_complete(session):
+    return session["present_ers"].issuperset(session["roster"]["students"])
+
+
+def _is_known_face(session, key):
+    return any(same_face(known, key) for known in session["known_faces"])
+
+
+def _notify(session):
+    with session["changed"]:
+        session["version"] += 1
+        session["updated_at"] = time.monotonic()
+        session["changed"].notify_all()
+
+
+def _match_frame(session, rekognition, frame_bytes, quality_report, faces):
+    """Match one frame's faces, skipping students and faces already accounted for."""
+    roster = session["roster"]["students"]
+    stats = session["stats"]
+
+    if FACE_CROP_MATCHING:
+        try:
+            crops = select_image_crops(frame_bytes, faces, quality_report)
+            quality_report["match_errors"] = 0
+            stats["faces_selected"] += len(crops)
+            if not crops:
+                raise ValueError("no face passed selection")
+
+            collection_id = ensure_batch_collection(
+                rekognition, session["s3_bucket"], session["batch_name"], session["roster"]["keys"]
+            )
+            # Faces already matched in earlier frames are skipped, by the same
+            # rule (and FACE_DEDUP switch) as the batch pipeline's dedup
+            embed = identity_embedder() if FACE_DEDUP else None
+            search_failed = False
+            for i, crop in enumerate(crops):
+                if _roster_complete(session):
+                    stats["match_calls_skipped"] += len(crops) - i
+                    break
+
+                key = face_key(crop["bytes"], embed) if FACE_DEDUP else None
+                if key is not None and _is_known_face(session, key):
+                    stats["faces_skipped_known"] += 1
+                    continue
+
+                stats["unique_faces"] += 1
+                try:
+                    stats["match_calls"] += 1
+                    er = search_face_crop(rekognition, crop["bytes"], roster, collection_id)
+                except Exception as e:
+                    if aws_error_code(e) == "ResourceNotFoundException":
+                        raise
+                    print(f"Search error for face {crop['face_index']} of frame {quality_report['image_index']}: {e}")
+                    quality_report["match_errors"] += 1
+                    search_failed = True
+                    continue
+
+                if er:
+                    session["present_ers"].add(er)
+                    if key is not None:
+                        session["known_faces"].append(key)
+            # A failed search cannot be pinned on one student: compare the
+            # frame in full, which flags only students whose compare fails
+            if not search_failed:
+                return
+            print(f"Search failed for frame {quality_report['image_index']}, comparing full frame")
+        except Exception as e:
+            print(f"Crop matching unavailable for frame {quality_report['image_index']}, comparing full frame: {e}")
+
+    session["present_ers"] = compare_full_images(
+        rekognition, session["s3_bucket"], session["roster"]["references"],
+        [(frame_bytes, quality_report)], session["failed_ers"], stats, session["present_ers"],
+    )
+
+
+def add_frame(session, frame_bytes):
+    """Detect and match one frame; returns its quality report (None when skipped)."""
+    with session["lock"]:
+        if session["status"] != "open":
+            raise ValueError("Session is closed")
+
+        stats = session["stats"]
+        stats["images"] += 1
+        idx = stats["images"]
+
+        if _roster_complete(session):
+            stats["frames_skipped"] += 1
+            _notify(session)
+            return None
+
+        rekognition = get_client("rekognition", session["region"])
+        with attendance_context(session["batch_name"]):
+            quality_report, faces = detect_and_assess(rekognition, frame_bytes, idx, session["tiling"])
+            session["quality_reports"].append(quality_report)
+            stats["faces_detected"] += len(faces)
+
+            if faces:
+                _match_frame(session, rekognition, frame_bytes, quality_report, faces)
+
+        _notify(session)
+        return quality_report
+
+
+def close_session(session):
+    """Save the session's report and publish its final state."""
+    with session["lock"]:
+        if session["status"] == "open":
+            attendance_list, absent_students = _present_absent(session)
+            with attendance_context(session["batch_name"]):
+                observe_matches(len(attendance_list))
+            session["report_url"] = complete_attendance(
+                attendance_list, absent_students,
+                session["batch_name"], session["class_name"], session["subject"],
+                session["s3_bucket"], session["region"],
+            )
+            session["status"] = "closed"
+            session["known_faces"] = []
+            _notify(session)
+    return snapshot(session)
+
+
+def _present_absent(session):
+    roster = session["roster"]["students"]
+    # Copies: a frame may be updating the sets while a snapshot is taken
+    present_ers, failed_ers = set(session["present_ers"]), set(session["failed_ers"])
+    present = [
+        {"er_number": er, "name": name} for er, name in roster.items() if er in present_ers
+    ]
+    return present, build_absent_list(roster, present_ers, failed_ers)
+
+
+def snapshot(session):
+    present, absent = _present_absent(session)
+    return {
+        "session_id": session["id"],
+        "status": session["status"],
+        "batch_name": session["batch_name"],
+        "subject": session["subject"],
+        "version": session["version"],
+        "present": present,
+        "absent": absent,
+        "session": session["stats"],
+        "report_url": session["report_url"],
+    }
+
+
+# -------------------------------
+# ROUTES
+# -------------------------------
+
+def _not_found():
+    return jsonify({"success": False, "error": "Session not found"}), 404
+
+
+@live_bp.before_request
+def require_single_worker():
+    if worker_count() > 1 and not LIVE_SESSION_STICKY_ROUTING:
+        return jsonify({
+            "success": False,
+            "error": "Live sessions need a single worker or sticky routing (LIVE_SESSION_STICKY_ROUTING=1)",
+        }), 503
+
+
+@live_bp.route("/api/sessions", methods=["POST"])
+def open_session():
+    try:
+        batch_name = request.form.get('batch_name')
+        subject_name = request.form.get('subject_name')
+        lab_name = request.form.get('lab_name', '')
+        tiling = request.form.get('tiling') or None
+
+        if not batch_name or not subject_name:
+            return jsonify({"success": False, "error": "Batch and Subject are required"}), 400
+        if tiling not in (None, "auto", "on", "off"):
+            return jsonify({"success": False, "error": "tiling must be auto, on or off"}), 400
+
+        session = create_session(batch_name, lab_name, subject_name, tiling=tiling)
+        return jsonify({"success": True, **snapshot(session)}), 201
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+@live_bp.route("/api/sessions/<session_id>/frames", methods=["POST"])
+def post_frames(session_id):
+    session = get_session(session_id)
+    if session is None:
+        return _not_found()
+
+    uploads, clips = request.files.getlist('frames'), request.files.getlist('video')
+    if not uploads and not clips:
+        return jsonify({"success": False, "error": "No frames provided"}), 400
+
+    try:
+        # A short clip is reduced to keyframes and fed in as frames
+        frames, videos = expand_uploads(uploads, clips)
+        quality_reports = [add_frame(session, frame.read()) for frame in frames]
+        return jsonify({
+            "success": True,
+            "quality_reports": [r for r in quality_reports if r is not None],
+            "videos": videos,
+            **snapshot(session),
+        }), 200
+    except VideoError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 409
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+@live_bp.route("/api/sessions/<session_id>", methods=["GET"])
+def session_state(session_id):
+    session = get_session(session_id)
+    if session is None:
+        return _not_found()
+    return jsonify({"success": True, **snapshot(session)}), 200
+
+
+@live_bp.route("/api/sessions/<session_id>/events", methods=["GET"])
+def session_events(session_id):
+    """
+    Server-sent events: a "state" event on every change, until the session
+    closes or expires, for at most SSE_MAX_SECONDS.
+    """
+    session = get_session(session_id)
+    if session is None:
+        return _not_found()
+    # A reconnecting EventSource is not sent the state it already has
+    last_id = request.headers.get("Last-Event-ID", "")
+    first_seen = int(last_id) if last_id.isdigit() else None
+
+    def stream():
+        seen = first_seen
+        deadline = time.monotonic() + SSE_MAX_SECONDS
+        yield f"retry: {SSE_RETRY_MS}\n\n"
+        while time.monotonic() < deadline:
+            # Dropped (retention over, or idle without frames): nothing would end the stream
+            if get_session(session_id) is not session:
+                yield "event: expired\ndata: {}\n\n"
+                return
+
+            with session["changed"]:
+                # A closed session the client is up to date on changes no more
+                if session["status"] == "closed" and session["version"] == seen:
+                    return
+                session["changed"].wait_for(
+                    lambda: session["version"] != seen, timeout=SSE_KEEPALIVE_SECONDS
+                )
+                version = session["version"]
+
+            if version == seen:
+                yield ": keep-alive\n\n"
+                continue
+
+            seen = version
+            state = snapshot(session)
+            yield f"event: state\nid: {version}\ndata: {json.dumps(state)}\n\n"
+            if state["status"] == "closed":
+                return
+
+    return Response(stream(), mimetype="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no",
+    })
+
+
+@live_bp.route("/api/sessions/<session_id>/close", methods=["POST"])
+def close(session_id):
+    session = get_session(session_id)
+    if session is None:
+        return _not_found()
+    try:
+        return jsonify({"success": True, **close_session(session)}), 200
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
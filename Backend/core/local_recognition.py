@@ -0,0 +1,294 @@
+import hashlib
+import math
+import os
+import threading
+from collections import OrderedDict
+from dotenv import load_dotenv
+from core.embedding_index import (
+    add_embeddings,
+    create_index,
+    index_exists,
+    load_index,
+    rebuild_index,
+    remove_embeddings,
+    search_index,
+)
+
+load_dotenv()
+
+# -------------------------------
+# LOCAL RECOGNITION BACKEND
+# -------------------------------
+# A CPU stand-in for the Rekognition client (RECOGNITION_BACKEND=local):
+# OpenCV's YuNet detector and SFace embedding model (ONNX, run through
+# cv2.dnn) behind the detect_faces / compare_faces / search_faces_by_image /
+# index_faces calls the attendance pipeline already makes, so the pipeline
+# runs unchanged offline and without per-call cost. Collections are on-disk
+# embedding indexes (core.embedding_index), one per batch.
+#
+# Models (from github.com/opencv/opencv_zoo):
+#   face_detection_yunet_2023mar.onnx, face_recognition_sface_2021dec.onnx
+LOCAL_DETECTOR_MODEL = os.getenv("LOCAL_DETECTOR_MODEL", "models/face_detection_yunet_2023mar.onnx")
+LOCAL_EMBEDDING_MODEL = os.getenv("LOCAL_EMBEDDING_MODEL", "models/face_recognition_sface_2021dec.onnx")
+LOCAL_DETECTION_SCORE = float(os.getenv("LOCAL_DETECTION_SCORE", 0.8))
+# SFace cosine similarity at which two faces are the same person. It is
+# reported as Similarity 80 so MATCH_SIMILARITY_THRESHOLD keeps its meaning.
+LOCAL_MATCH_COSINE = float(os.getenv("LOCAL_MATCH_COSINE", 0.363))
+LOCAL_EMBEDDING_CACHE_SIZE = int(os.getenv("LOCAL_EMBEDDING_CACHE_SIZE", 2048))
+EMBEDDING_DIM = 128
+
+# Reference images with no detectable face, so sync_batch_index does not
+# fetch and re-embed them on every attendance request
+_unembeddable = set()
+
+
+class _Exceptions:
+    class ResourceNotFoundException(Exception):
+        pass
+
+    class InvalidParameterException(Exception):
+        pass
+
+
+def cosine_to_similarity(cosine):
+    """Map SFace cosine to a Rekognition-like 0-100 score (LOCAL_MATCH_COSINE -> 80)."""
+    if cosine >= LOCAL_MATCH_COSINE:
+        return min(100.0, 80.0 + 20.0 * (cosine - LOCAL_MATCH_COSINE) / (1.0 - LOCAL_MATCH_COSINE))
+    return max(0.0, 80.0 * cosine / LOCAL_MATCH_COSINE)
+
+
+def similarity_to_cosine(similarity):
+    if similarity >= 80.0:
+        return LOCAL_MATCH_COSINE + (similarity - 80.0) / 20.0 * (1.0 - LOCAL_MATCH_COSINE)
+    return similarity / 80.0 * LOCAL_MATCH_COSINE
+
+
+class LocalRecognitionClient:
+    """Implements the subset of the Rekognition API used by the backend."""
+
+    exceptions = _Exceptions
+
+    def __init__(self, detector_model=None, embedding_model=None):
+        self.detector_model = detector_model or LOCAL_DETECTOR_MODEL
+        self.embedding_model = embedding_model or LOCAL_EMBEDDING_MODEL
+        self._embeddings = OrderedDict()  # sha1(image bytes) -> _analyze() result
+        self._local = threading.local()  # cv2 models are not thread-safe
+        self._lock = threading.Lock()
+
+    # -------- models --------
+    def _models(self):
+        models = getattr(self._local, "models", None)
+        if models is None:
+            import cv2
+
+            for path in (self.detector_model, self.embedding_model):
+                if not os.path.exists(path):
+                    raise FileNotFoundError(
+                        f"Local recognition model not found: {path} (python benchmarks/fetch_models.py)"
+                    )
+
+            detector = cv2.FaceDetectorYN.create(
+                self.detector_model, "", (320, 320), LOCAL_DETECTION_SCORE
+            )
+            recognizer = cv2.FaceRecognizerSF.create(self.embedding_model, "")
+            models = self._local.models = (detector, recognizer)
+        return models
+
+    def _image_bytes(self, image):
+        if "Bytes" in image:
+            return image["Bytes"]
+        from core.aws_clients import get_client
+
+        obj = image["S3Object"]
+        return get_client("s3").get_object(Bucket=obj["Bucket"], Key=obj["Name"])["Body"].read()
+
+    def _analyze(self, image_bytes):
+        """
+        Faces of an image, cached by content: {"size", "faces" (YuNet rows),
+        "embeddings" (L2-normalised), "quality" ((sharpness, brightness) per face)}.
+        """
+        digest = hashlib.sha1(image_bytes).hexdigest()
+        with self._lock:
+            cached = self._embeddings.get(digest)
+            if cached is not None:
+                self._embeddings.move_to_end(digest)
+                return cached
+
+        import cv2
+        import numpy as np
+        from core.quality_check import decode_image
+
+        img = decode_image(image_bytes)
+        if img is None:
+            raise self.exceptions.InvalidParameterException("Request has invalid image format")
+
+        detector, recognizer = self._models()
+        height, width = img.shape[:2]
+        detector.setInputSize((width, height))
+        _, faces = detector.detect(img)
+        faces = faces if faces is not None else np.zeros((0, 15), dtype=np.float32)
+
+        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+        embeddings = np.zeros((len(faces), EMBEDDING_DIM), dtype=np.float32)
+        quality = []
+        for i, face in enumerate(faces):
+            vector = recognizer.feature(recognizer.alignCrop(img, face)).ravel()
+            embeddings[i] = vector / (np.linalg.norm(vector) or 1.0)
+
+            x, y, w, h = (int(v) for v in face[:4])
+            patch = gray[max(0, y):y + h, max(0, x):x + w]
+            if patch.size:
+                quality.append((
+                    min(100.0, float(cv2.Laplacian(patch, cv2.CV_64F).var()) / 5.0),
+                    float(patch.mean()) / 2.55,
+                ))
+            else:
+                quality.append((0.0, 0.0))
+
+        result = {"size": (width, height), "faces": faces, "embeddings": embeddings, "quality": quality}
+        with self._lock:
+            self._embeddings[digest] = result
+            while len(self._embeddings) > LOCAL_EMBEDDING_CACHE_SIZE:
+                self._embeddings.popitem(last=False)
+        return result
+
+    @staticmethod
+    def _box(face, width, height):
+        return {
+            "Left": float(face[0]) / width, "Top": float(face[1]) / height,
+            "Width": float(face[2]) / width, "Height": float(face[3]) / height,
+        }
+
+    def embed_face(self, image_bytes):
+        """L2-normalised embedding of the largest face in an image."""
+        analysis = self._analyze(image_bytes)
+        faces = analysis["faces"]
+        if not len(faces):
+            raise self.exceptions.InvalidParameterException("There are no faces in the image")
+        return analysis["embeddings"][int((faces[:, 2] * faces[:, 3]).argmax())]
+
+    # -------- Rekognition API --------
+    def detect_faces(self, Image, Attributes=None):
+        analysis = self._analyze(self._image_bytes(Image))
+        width, height = analysis["size"]
+
+        details = []
+        for face, (sharpness, brightness) in zip(analysis["faces"], analysis["quality"]):
+            # Landmarks: right eye, left eye, nose tip (then mouth corners)
+            eye_rx, eye_ry, eye_lx, eye_ly, nose_x, nose_y = (float(v) for v in face[4:10])
+            eye_dist = max(1.0, abs(eye_lx - eye_rx))
+            eye_mid_x, eye_mid_y = (eye_rx + eye_lx) / 2, (eye_ry + eye_ly) / 2
+
+            details.append({
+                "BoundingBox": self._box(face, width, height),
+                "Confidence": float(face[14]) * 100.0,
+                "Quality": {"Sharpness": sharpness, "Brightness": brightness},
+                # Rough pose from landmark geometry
+                "Pose": {
+                    "Yaw": max(-90.0, min(90.0, (nose_x - eye_mid_x) / eye_dist * 90.0)),
+                    "Pitch": max(-90.0, min(90.0, ((nose_y - eye_mid_y) / eye_dist - 0.6) * 90.0)),
+                    "Roll": math.degrees(math.atan2(eye_ly - eye_ry, eye_lx - eye_rx)),
+                },
+            })
+        return {"FaceDetails": details}
+
+    def compare_faces(self, SourceImage, TargetImage, SimilarityThreshold=80, **kwargs):
+        source = self.embed_face(self._image_bytes(SourceImage))
+        target = self._analyze(self._image_bytes(TargetImage))
+        width, height = target["size"]
+
+        # Every target face against the source in one product
+        similarities = target["embeddings"] @ source
+        matches, unmatched = [], []
+        for face, cosine in zip(target["faces"], similarities):
+            box = self._box(face, width, height)
+            similarity = cosine_to_similarity(float(cosine))
+            if similarity >= SimilarityThreshold:
+                matches.append({"Similarity": similarity, "Face": {"BoundingBox": box}})
+            else:
+                unmatched.append({"BoundingBox": box})
+
+        matches.sort(key=lambda m: m["Similarity"], reverse=True)
+        return {"FaceMatches": matches, "UnmatchedFaces": unmatched}
+
+    def search_faces_by_image(self, CollectionId, Image, FaceMatchThreshold=80, MaxFaces=1, **kwargs):
+        if not index_exists(CollectionId):
+            raise self.exceptions.ResourceNotFoundException(CollectionId)
+
+        query = self.embed_face(self._image_bytes(Image))
+        min_cosine = similarity_to_cosine(FaceMatchThreshold)
+
+        # One matrix-vector product over the memory-mapped roster matrix
+        return {"FaceMatches": [
+            {
+                "Similarity": cosine_to_similarity(cosine),
+                "Face": {"FaceId": key, "ExternalImageId": external_id},
+            }
+            for external_id, key, cosine in search_index(CollectionId, query, MaxFaces) or []
+            if cosine >= min_cosine
+        ]}
+
+    def index_faces(self, CollectionId, Image, ExternalImageId=None, **kwargs):
+        if not index_exists(CollectionId):
+            raise self.exceptions.ResourceNotFoundException(CollectionId)
+
+        image_bytes = self._image_bytes(Image)
+        # Row key: the S3 object, so re-uploading a photo replaces its row
+        key = Image["S3Object"]["Name"] if "S3Object" in Image else hashlib.sha1(image_bytes).hexdigest()
+
+        add_embeddings(CollectionId, [(key, ExternalImageId, self.embed_face(image_bytes))])
+        return {"FaceRecords": [{"Face": {"FaceId": key, "ExternalImageId": ExternalImageId}}]}
+
+    def create_collection(self, CollectionId):
+        create_index(CollectionId, EMBEDDING_DIM)
+        return {"StatusCode": 200}
+
+    def delete_faces(self, CollectionId, FaceIds):
+        if not index_exists(CollectionId):
+            raise self.exceptions.ResourceNotFoundException(CollectionId)
+        remove_embeddings(CollectionId, keys=FaceIds)
+        return {"DeletedFaces": list(FaceIds)}
+
+
+def _embed_references(client, s3_bucket, student_image_keys):
+    """(key, external_id, vector) per reference image; images without a detectable face are skipped."""
+    from core.mark_batch_attendance import get_photo_bytes_from_s3
+
+    entries = []
+    for key in student_image_keys:
+        try:
+            vector = client.embed_face(get_photo_bytes_from_s3(s3_bucket, key))
+        except Exception as e:
+            print(f"Skipping {key} in embedding index: {e}")
+            _unembeddable.add(key)
+            continue
+        # "<ER>_<Name>_<n>": search_face_crop only reads the ER prefix
+        entries.append((key, os.path.splitext(os.path.basename(key))[0], vector))
+    return entries
+
+
+def rebuild_batch_index(client, s3_bucket, student_image_keys, batch_prefix):
+    """
+    Re-embed every reference image of a batch and swap the batch index in
+    one step. Images without a detectable face are skipped.
+    """
+    entries = _embed_references(client, s3_bucket, student_image_keys)
+    rebuild_index(batch_prefix, entries, EMBEDDING_DIM)
+    return len(entries)
+
+
+def sync_batch_index(client, s3_bucket, student_image_keys, batch_prefix):
+    """
+    Add the reference images a batch index is missing, building it when it
+    does not exist. An index created by the first upload after the local
+    backend was enabled holds only that student. Returns the rows added.
+    """
+    if not index_exists(batch_prefix):
+        return rebuild_batch_index(client, s3_bucket, student_image_keys, batch_prefix)
+
+    ids, _ = load_index(batch_prefix)
+    indexed = {entry["key"] for entry in ids or []}
+    missing = [key for key in student_image_keys if key not in indexed and key not in _unembeddable]
+    entries = _embed_references(client, s3_bucket, missing)
+    add_embeddings(batch_prefix, entries)
+    return len(entries)
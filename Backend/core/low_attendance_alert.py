@@ -1,44 +1,114 @@
-import boto3
-import pandas as pd
 import io
 import os
+from core.aws_clients import get_client
+from core.notifications import normalize_phone, send_notifications
 
 BUCKET = os.getenv("BUCKET_NAME", "ict-attendances")
 THRESHOLD = 75
 
-s3 = boto3.client("s3")
-sns = boto3.client("sns")
-
+# Optional staff topic: one short summary per report on top of parent messages
 SNS_TOPIC_ARN = os.getenv("SNS_TOPIC_ARN")
 
-def trigger_alert(report_key):
-    # load students
-    students = pd.read_excel(
-        io.BytesIO(
-            s3.get_object(Bucket=BUCKET, Key="students.xlsx")["Body"].read()
-        )
-    )
 
-    # load current report
-    today = pd.read_excel(
-        io.BytesIO(
-            s3.get_object(Bucket=BUCKET, Key=report_key)["Body"].read()
-        )
-    )
+def _read_excel(s3, key, **kwargs):
+    import pandas as pd
+
+    body = s3.get_object(Bucket=BUCKET, Key=key)["Body"].read()
+    return pd.read_excel(io.BytesIO(body), **kwargs)
+
+
+def load_student_contacts(s3):
+    """
+    Enrolled students with their parent's phone, from the "Batch Info" sheet
+    of students.xlsx (written by upload_multiple_images).
+    Columns: ER Number, Name, Parent Phone, Batch Name.
+    """
+    import pandas as pd
+
+    sheets = _read_excel(s3, "students.xlsx", sheet_name=None, dtype=str)
+    students = sheets.get("Batch Info")
+    if students is None:
+        students = pd.concat(sheets.values(), ignore_index=True)
+
+    students = students.rename(columns={"Student Name": "Name"})
+    students["ER Number"] = students["ER Number"].astype(str).str.strip()
+    students["Parent Phone"] = students.get("Parent Phone", pd.Series(dtype=str)).fillna("").astype(str).str.strip()
+    return students.drop_duplicates(["Batch Name", "ER Number"] if "Batch Name" in students else ["ER Number"])
+
+
+def find_absentees(students, report):
+    """Students of the report's batch(es) whose ER number is not marked present."""
+    er_numbers = report["ER Number"].astype(str).str.strip()
+    present = er_numbers[report["Status"].astype(str).str.lower() == "present"]
 
-    present = set(today[today["Status"] == "Present"]["ER Number"])
+    in_batch = True
+    if "Batch" in report and "Batch Name" in students:
+        in_batch = students["Batch Name"].isin(report["Batch"].astype(str).unique())
 
-    absent = [
-        f"{r['Name']} ({r['ER Number']})"
-        for _, r in students.iterrows()
-        if r["ER Number"] not in present
+    return students[in_batch & ~students["ER Number"].isin(present)].drop_duplicates("ER Number")
+
+
+def parent_messages(absentees, subject):
+    """One message per parent phone, covering all of that parent's absent children."""
+    with_phone = absentees[absentees["Parent Phone"] != ""]
+    return [
+        {
+            "to": phone,
+            "subject": subject,
+            "students": [
+                {"er_number": er, "name": name}
+                for er, name in zip(group["ER Number"], group["Name"])
+            ],
+        }
+        for phone, group in with_phone.groupby("Parent Phone", sort=False)
     ]
 
-    # simple alert (absent only)
-    message = "🟥 Absent Today:\n" + "\n".join(absent)
 
-    sns.publish(
-        TopicArn=SNS_TOPIC_ARN,
-        Subject="Attendance Alert",
-        Message=message
-    )
+def _describe(report):
+    first = report.iloc[0] if len(report) else {}
+    return str(first.get("Subject", "") or "class"), str(first.get("Date", "") or "today")
+
+
+def trigger_alert(report_key, notifier=None, ledger=None):
+    """
+    Text the parent of every student absent in an attendance report, once per
+    (report, student) however often this runs. Returns send counts.
+    """
+    s3 = get_client("s3")
+    students = load_student_contacts(s3)
+    report = _read_excel(s3, report_key, dtype=str)
+
+    absentees = find_absentees(students, report)
+    # E.164, so SNS accepts them and one parent entered two ways is texted once;
+    # numbers that cannot be normalized count as missing
+    absentees = absentees.assign(**{"Parent Phone": absentees["Parent Phone"].map(normalize_phone).fillna("")})
+    subject, date = _describe(report)
+
+    def render(message):
+        names = ", ".join(s["name"] for s in message["students"])
+        verb = "was" if len(message["students"]) == 1 else "were"
+        return f"Attendance alert: {names} {verb} marked absent in {subject} on {date}."
+
+    messages = parent_messages(absentees, "Attendance Alert")
+    summary = send_notifications(report_key, messages, render, notifier, ledger)
+    summary.update({
+        "report": report_key,
+        "absent": int(len(absentees)),
+        "messages": len(messages),
+        "no_phone": int((absentees["Parent Phone"] == "").sum()),
+    })
+
+    if SNS_TOPIC_ARN and len(absentees):
+        staff = [{
+            "to": SNS_TOPIC_ARN,
+            "subject": "Attendance Alert",
+            "students": [{"er_number": er, "name": name}
+                         for er, name in zip(absentees["ER Number"], absentees["Name"])],
+        }]
+        send_notifications(
+            f"{report_key}#staff", staff,
+            lambda m: f"{len(m['students'])} absent in {subject} on {date} ({os.path.basename(report_key)})",
+            notifier, ledger,
+        )
+
+    return summary
@@ -1,8 +1,21 @@
-import boto3
 import os
+import time
 from datetime import datetime
-from openpyxl import Workbook
 from dotenv import load_dotenv
+from core.aws_clients import RECOGNITION_BACKEND, aws_error_code, get_client
+from core.embedding_index import index_name
+from core.tracing import set_attributes, traced
+from core.pipeline_metrics import (
+    STAGE_SECONDS,
+    attendance_context,
+    batch_label,
+    in_attendance_context,
+    match_call_timer,
+    observe_faces,
+    observe_matches,
+    stage_timer,
+)
+from core.attendance_events import complete_attendance
 
 load_dotenv()
 
@@ -13,13 +26,14 @@ AWS_REGION = os.getenv("AWS_REGION", "ap-south-1")
 # -------------------------------
 
 def get_photo_bytes_from_s3(bucket, key):
-    s3 = boto3.client("s3", region_name=AWS_REGION)
+    s3 = get_client("s3", AWS_REGION)
     response = s3.get_object(Bucket=bucket, Key=key)
     return response["Body"].read()
 
 
+@traced("s3.list_student_images")
 def list_student_images_from_s3(bucket, batch_prefix):
-    s3 = boto3.client("s3", region_name=AWS_REGION)
+    s3 = get_client("s3", AWS_REGION)
     paginator = s3.get_paginator("list_objects_v2")
 
     image_keys = []
@@ -28,6 +42,7 @@ def list_student_images_from_s3(bucket, batch_prefix):
             key = obj["Key"]
             if key.lower().endswith((".jpg", ".jpeg", ".png")):
                 image_keys.append(key)
+    set_attributes(prefix=batch_prefix, keys=len(image_keys))
     return image_keys
 
 
@@ -46,6 +61,14 @@ def extract_student_details_from_key(key):
 # EXCEL REPORT
 # -------------------------------
 
+def report_location(batch_name, class_name, subject, s3_bucket, region, now):
+    """(filename, s3_key, url) of the report for a run taken at `now`."""
+    filename = f"{now.strftime('%Y%m%d_%H%M%S')}_{batch_name}_{class_name}_{subject}.xlsx"
+    s3_key = f"reports/{filename}"
+    return filename, s3_key, f"https://{s3_bucket}.s3.{region}.amazonaws.com/{s3_key}"
+
+
+@traced("report.save")
 def save_attendance_to_excel(
     attendance_data,
     absent_data,
@@ -54,9 +77,13 @@ def save_attendance_to_excel(
     subject,
     s3_bucket,
     region,
+    now=None,
 ):
-    now = datetime.now()
-    filename = f"{now.strftime('%Y%m%d_%H%M%S')}_{batch_name}_{class_name}_{subject}.xlsx"
+    from openpyxl import Workbook
+
+    now = now or datetime.now()
+    filename, s3_key, report_url = report_location(batch_name, class_name, subject, s3_bucket, region, now)
+    write_started = time.perf_counter()
 
     os.makedirs("attendance_reports", exist_ok=True)
     filepath = os.path.join("attendance_reports", filename)
@@ -98,21 +125,262 @@ def save_attendance_to_excel(
         )
 
     wb.save(filepath)
+    STAGE_SECONDS.labels("excel_write", batch_label(batch_name), RECOGNITION_BACKEND).observe(time.perf_counter() - write_started)
 
-    s3 = boto3.client("s3", region_name=region)
-    s3_key = f"reports/{filename}"
-    s3.upload_file(filepath, s3_bucket, s3_key)
+    s3 = get_client("s3", region)
+    with attendance_context(batch_name):
+        s3.upload_file(filepath, s3_bucket, s3_key)
 
-    return filepath, f"https://{s3_bucket}.s3.{region}.amazonaws.com/{s3_key}"
+    return filepath, report_url
 
 
 # -------------------------------
 # MAIN ATTENDANCE LOGIC
 # -------------------------------
 
-from core.quality_check import analyze_image_quality
+from core.quality_check import analyze_image_quality, add_face_metrics, decode_image, image_size
+from core.face_selection import select_faces
+from core.face_dedup import dedup_faces, search_passes
+from core.match_scheduler import record_reference_result, references_by_student, save_hit_rates
+from core.roster_cache import get_roster
+from core.tiling import detect_faces_tiled, should_tile
+
+MATCH_SIMILARITY_THRESHOLD = 80
+# Match cropped faces against the Rekognition collection filled by
+# index_face_to_rekognition (one call per usable face) instead of comparing
+# every reference image against the whole group photo.
+FACE_CROP_MATCHING = os.getenv("FACE_CROP_MATCHING", "1") == "1"
+FACE_COLLECTION_ID = os.getenv("FACE_COLLECTION_ID", "students")
+# Local backend: "batch" keeps one embedding index per batch, "institution"
+# a single FACE_COLLECTION_ID index over every batch (searched through
+# core.ann_index once it is large)
+LOCAL_COLLECTION_SCOPE = os.getenv("LOCAL_COLLECTION_SCOPE", "batch")
+
+
+def collection_for_batch(batch_name):
+    """
+    Collection searched for a batch: the institution-wide Rekognition one,
+    or the batch's own embedding index on the local backend.
+    """
+    if RECOGNITION_BACKEND == "local" and LOCAL_COLLECTION_SCOPE == "batch":
+        return index_name(batch_name)
+    return FACE_COLLECTION_ID
+
+
+def ensure_batch_collection(rekognition, s3_bucket, batch_name, student_image_keys):
+    """
+    Collection id to search for this batch. With the local backend the
+    batch index is reconciled against the roster's reference images: built
+    when missing, and given any images it lacks (students enrolled before
+    the local backend was enabled, when a later upload created the index).
+    """
+    collection_id = collection_for_batch(batch_name)
+    if RECOGNITION_BACKEND == "local" and LOCAL_COLLECTION_SCOPE == "batch":
+        from core.local_recognition import sync_batch_index
+        sync_batch_index(rekognition, s3_bucket, student_image_keys, collection_id)
+    return collection_id
+
+
+@traced()
+def detect_and_assess(rekognition, group_bytes, idx, tiling=None):
+    """
+    Local quality check + Rekognition detect_faces for one group image.
+    Large photos are detected tile by tile (see core.tiling); tiling is
+    "auto", "on" or "off" (default: TILING_MODE).
+    Returns (quality_report, faces).
+    """
+    with stage_timer("decode_quality"):
+        quality_report = analyze_image_quality(group_bytes)
+    quality_report["image_index"] = idx
+
+    width, height = image_size(quality_report)
+    with stage_timer("detect_faces"):
+        if width and should_tile(group_bytes, width, height, tiling):
+            faces, tiles = detect_faces_tiled(rekognition, decode_image(group_bytes))
+            quality_report["tiles"] = tiles
+        else:
+            detection = rekognition.detect_faces(
+                Image={"Bytes": group_bytes}, Attributes=["ALL"]
+            )
+            faces = detection.get("FaceDetails", [])
+    add_face_metrics(quality_report, faces)
+    observe_faces(len(faces))
+    set_attributes(image_index=idx, faces=len(faces), tiles=quality_report.get("tiles"))
+
+    return quality_report, faces
+
+
+def compare_reference(rekognition, student_bytes, group_bytes):
+    """True when the student's reference face appears in the group image."""
+    with match_call_timer("compare_faces") as outcome:
+        result = rekognition.compare_faces(
+            SourceImage={"Bytes": student_bytes},
+            TargetImage={"Bytes": group_bytes},
+            SimilarityThreshold=MATCH_SIMILARITY_THRESHOLD,
+        )
+        outcome["matched"] = bool(result["FaceMatches"])
+    return outcome["matched"]
+
+
+def search_face_crop(rekognition, crop_bytes, roster, collection_id=None):
+    """ER number of the roster student whose indexed face matches the crop, or None."""
+    try:
+        with match_call_timer("search_faces_by_image") as outcome:
+            result = rekognition.search_faces_by_image(
+                CollectionId=collection_id or FACE_COLLECTION_ID,
+                Image={"Bytes": crop_bytes},
+                FaceMatchThreshold=MATCH_SIMILARITY_THRESHOLD,
+                MaxFaces=5,
+            )
+            outcome["matched"] = bool(result.get("FaceMatches"))
+    except Exception as e:
+        # Rekognition found no face inside the crop: nothing to match
+        if aws_error_code(e) == "InvalidParameterException":
+            return None
+        raise
+
+    # The collection is institution-wide; keep the best match in this batch
+    for match in result.get("FaceMatches", []):
+        er = match["Face"].get("ExternalImageId", "").split("_", 1)[0]
+        if er in roster:
+            return er
+    return None
+
+
+def select_image_crops(group_bytes, faces, quality_report):
+    """Usable face crops of one group image, tagged with its image_index."""
+    crops, rejected = select_faces(group_bytes, faces)
+    quality_report["faces_selected"] = len(crops)
+    quality_report["faces_rejected"] = rejected
+
+    for crop in crops:
+        crop["image_index"] = quality_report["image_index"]
+    return crops
+
+
+@traced()
+def match_unique_faces(rekognition, clusters, roster, reports_by_index, stats, collection_id=None):
+    """
+    One search per de-duplicated face, then one per remaining cluster member
+    while roster students are still unmatched, stopping once every roster
+    student has been found. Returns (matched_ers, image indexes of crops
+    whose search failed), for the caller to compare those images in full.
+    Raises ResourceNotFoundException when the collection is missing so the
+    caller can fall back to full-image comparison.
+    """
+    matched, failed_images = set(), set()
+    for crops, is_representative in zip(search_passes(clusters), (True, False)):
+        for i, crop in enumerate(crops):
+            if matched.issuperset(roster):
+                if is_representative:
+                    stats["match_calls_skipped"] += len(crops) - i
+                break
+            if not is_representative:
+                stats["match_calls_saved_by_dedup"] -= 1
+
+            er, failed = _search_one(rekognition, crop, roster, reports_by_index, stats, collection_id)
+            if failed:
+                failed_images.add(crop["image_index"])
+            if er:
+                matched.add(er)
+    set_attributes(unique_faces=len(clusters), matched=len(matched))
+    return matched, failed_images
+
+
+def _search_one(rekognition, crop, roster, reports_by_index, stats, collection_id):
+    """(er or None, failed) for one crop; a missing collection propagates."""
+    try:
+        stats["match_calls"] += 1
+        er = search_face_crop(rekognition, crop["bytes"], roster, collection_id)
+    except Exception as e:
+        if aws_error_code(e) == "ResourceNotFoundException":
+            raise
+        print(f"Search error for face {crop['face_index']} of image {crop['image_index']}: {e}")
+        reports_by_index[crop["image_index"]]["match_errors"] += 1
+        return None, True
+    return er, False
+
+
+@traced()
+def compare_full_images(rekognition, s3_bucket, references, images, failed_ers, stats, present_ers=()):
+    """
+    Fallback matching: compare the roster's reference images ({er: [keys]})
+    against each whole group image in `images` ([(group_bytes, quality_report)]).
+    Students already in
+    `present_ers` are skipped, a student's remaining references are skipped
+    after one matches (best hit rate first), and matching stops once the
+    whole roster is present.
+    Returns the matched ER numbers, including `present_ers`.
+    """
+    schedule = references_by_student(references)
+    matched = set(present_ers)
+    photos = {}        # each reference is downloaded once per session
+    attempted = 0
+
+    for group_bytes, quality_report in images:
+        quality_report["match_errors"] = 0
+        for er, keys in schedule.items():
+            if matched.issuperset(schedule):
+                break
+            if er in matched:
+                continue
+
+            for key in keys:
+                attempted += 1
+                try:
+                    if key not in photos:
+                        photos[key] = get_photo_bytes_from_s3(s3_bucket, key)
+
+                    stats["match_calls"] += 1
+                    found = compare_reference(rekognition, photos[key], group_bytes)
+                except Exception as e:
+                    print(f"Compare error for {key}: {e}")
+                    failed_ers.add(er)
+                    quality_report["match_errors"] += 1
+                    continue
+
+                record_reference_result(key, found)
+                if found:
+                    matched.add(er)
+                    break
+
+    total = sum(len(keys) for keys in schedule.values()) * len(images)
+    stats["match_calls_skipped"] += total - attempted
+    save_hit_rates()
+    set_attributes(images=len(images), compare_calls=attempted, matched=len(matched))
+    return matched
+
+
+def new_session_stats():
+    return {
+        "images": 0,
+        "faces_detected": 0,
+        "faces_selected": 0,
+        "unique_faces": 0,
+        "match_calls": 0,
+        "match_calls_saved_by_dedup": 0,
+        "match_calls_skipped": 0,
+    }
+
+
+def build_absent_list(roster, present_ers, failed_ers=()):
+    """
+    Roster students ({er: name}) not found in any group image, one entry
+    each. Those with a comparison that failed (even after throttling
+    retries) are flagged verification_failed rather than silently reported
+    as plain absences.
+    """
+    absent_ers = roster.keys() - present_ers
+    absent_students = [
+        {"er_number": er, "name": name} for er, name in roster.items() if er in absent_ers
+    ]
+    for s in absent_students:
+        if s["er_number"] in failed_ers:
+            s["verification_failed"] = True
+    return absent_students
 
 
+@in_attendance_context
 def mark_batch_attendance_s3(
     batch_name,
     class_name,
@@ -120,101 +388,95 @@ def mark_batch_attendance_s3(
     group_image_files,
     s3_bucket="ict-attendances",
     region="ap-south-1",
+    tiling=None,
 ):
-    rekognition = boto3.client("rekognition", region_name=region)
-
-    student_image_keys = list_student_images_from_s3(
-        s3_bucket, f"{batch_name}/"
-    )
-
-    present_students = {}
+    """
+    Returns (present, absent, report_url, quality_reports, session_stats).
+
+    1. detect + quality-check every group image and crop its usable faces
+    2. de-duplicate the crops across images (core.face_dedup)
+    3. search each unique face once; images that cannot be matched by crops
+       fall back to comparing reference images against them
+    Both stop once the whole roster is present (see core.match_scheduler).
+    The report is saved (core.attendance_events.complete_attendance) before
+    this returns.
+    """
+    rekognition = get_client("rekognition", region)
+
+    batch_roster = get_roster(s3_bucket, batch_name)
+    roster = batch_roster["students"]
+
+    present_ers = set()
+    failed_ers = set()
     quality_reports = []
+    stats = new_session_stats()
+
+    session_crops = []     # crops from every image, matched after de-duplication
+    crop_images = {}       # image_index -> (group_bytes, quality_report)
+    compare_images = []    # (group_bytes, quality_report) for full-image comparison
 
     for idx, group_img in enumerate(group_image_files, start=1):
         group_bytes = group_img.read()
+        group_img.seek(0)
 
-        quality_report = analyze_image_quality(group_bytes)
-        quality_report["image_index"] = idx
-
-        # Defaults (IMPORTANT)
-        quality_report.update(
-            {
-                "face_detected": False,
-                "face_count": 0,
-                "avg_face_confidence": 0.0,
-                "face_coverage_pct": 0.0,
-            }
-        )
-
-        detection = rekognition.detect_faces(
-            Image={"Bytes": group_bytes}, Attributes=["ALL"]
-        )
+        quality_report, faces = detect_and_assess(rekognition, group_bytes, idx, tiling)
+        quality_reports.append(quality_report)
+        stats["images"] += 1
+        stats["faces_detected"] += len(faces)
 
-        if not detection.get("FaceDetails"):
-            quality_report["error"] = "No faces detected"
-            quality_reports.append(quality_report)
+        if not faces:
             continue
 
-        faces = detection["FaceDetails"]
-        face_count = len(faces)
-
-        avg_confidence = 0.0
-        total_face_area = 0.0
-
-        for face in faces:
-            avg_confidence += float(face["Confidence"])
-            box = face["BoundingBox"]
-            total_face_area += float(box["Width"] * box["Height"])
-
-        avg_confidence /= face_count
-        face_coverage = total_face_area * 100
-
-        quality_report.update(
-            {
-                "face_detected": True,
-                "face_count": face_count,
-                "avg_face_confidence": round(avg_confidence, 2),
-                "face_coverage_pct": round(face_coverage, 2),
-            }
-        )
-
-        if face_coverage < 1.0:
-            quality_report["suggestion"] += " Faces too far. Move closer."
-
-        quality_reports.append(quality_report)
-
-        # Face comparison
-        for key in student_image_keys:
+        if FACE_CROP_MATCHING:
             try:
-                student_bytes = get_photo_bytes_from_s3(s3_bucket, key)
-                result = rekognition.compare_faces(
-                    SourceImage={"Bytes": student_bytes},
-                    TargetImage={"Bytes": group_bytes},
-                    SimilarityThreshold=80,
-                )
-
-                if result["FaceMatches"]:
-                    er, name = extract_student_details_from_key(key)
-                    present_students[er] = {"er_number": er, "name": name}
+                crops = select_image_crops(group_bytes, faces, quality_report)
+                quality_report["match_errors"] = 0
+                # Every face rejected by the selection thresholds: compare in full
+                if crops:
+                    session_crops.extend(crops)
+                    crop_images[idx] = (group_bytes, quality_report)
+                    continue
             except Exception as e:
-                print(f"Compare error for {key}: {e}")
-
-        group_img.seek(0)
-
-    batch_students = [
-        {"er_number": er, "name": name}
-        for er, name in (
-            extract_student_details_from_key(k) for k in student_image_keys
+                print(f"Crop selection failed for image {idx}, comparing full image: {e}")
+
+        compare_images.append((group_bytes, quality_report))
+
+    if session_crops:
+        clusters = dedup_faces(session_crops)
+        stats["faces_selected"] = len(session_crops)
+        stats["unique_faces"] = len(clusters)
+        stats["match_calls_saved_by_dedup"] = len(session_crops) - len(clusters)
+
+        reports_by_index = {i: report for i, (_, report) in crop_images.items()}
+        try:
+            collection_id = ensure_batch_collection(rekognition, s3_bucket, batch_name, batch_roster["keys"])
+            matched, failed_images = match_unique_faces(
+                rekognition, clusters, roster, reports_by_index, stats, collection_id
+            )
+            present_ers |= matched
+            # A failed search cannot be pinned on one student: its image is
+            # compared in full, which flags only students whose compare fails
+            compare_images.extend(crop_images[i] for i in sorted(failed_images))
+        except Exception as e:
+            print(f"Crop matching unavailable, comparing full images: {e}")
+            compare_images.extend(crop_images.values())
+
+    if compare_images:
+        present_ers = compare_full_images(
+            rekognition, s3_bucket, batch_roster["references"], compare_images, failed_ers, stats, present_ers
         )
-    ]
 
-    absent_students = [
-        s for s in batch_students if s["er_number"] not in present_students
-    ]
+    present_students = {
+        er: {"er_number": er, "name": name} for er, name in roster.items() if er in present_ers
+    }
+    absent_students = build_absent_list(roster, present_ers, failed_ers)
 
     attendance_list = list(present_students.values())
+    observe_matches(len(attendance_list))
+    set_attributes(images=stats["images"], faces=stats["faces_detected"], present=len(attendance_list))
 
-    _, report_url = save_attendance_to_excel(
+    # Report saved here; analytics, snapshot and alerts follow via core.attendance_events
+    report_url = complete_attendance(
         attendance_list,
         absent_students,
         batch_name,
@@ -224,4 +486,4 @@ def mark_batch_attendance_s3(
         region,
     )
 
-    return attendance_list, absent_students, report_url, quality_reports
+    return attendance_list, absent_students, report_url, quality_reports, stats
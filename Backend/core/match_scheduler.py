@@ -0,0 +1,77 @@
+import json
+import os
+import tempfile
+import threading
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# -------------------------------
+# REFERENCE HIT RATES
+# -------------------------------
+# How often each reference image (S3 key) matched when it was compared.
+# Students' references are tried best-first and the rest are skipped once
+# one matches, so a photo that usually works saves its siblings' calls.
+REFERENCE_HIT_RATES_FILE = os.getenv("REFERENCE_HIT_RATES_FILE", "reference_hit_rates.json")
+
+_hit_rates = None      # key -> {"hits": int, "attempts": int}
+_lock = threading.Lock()
+
+
+def _load():
+    global _hit_rates
+    if _hit_rates is None:
+        try:
+            with open(REFERENCE_HIT_RATES_FILE) as f:
+                _hit_rates = json.load(f)
+        except (OSError, ValueError):
+            _hit_rates = {}
+    return _hit_rates
+
+
+def hit_rate(key):
+    """Smoothed hit rate of a reference image; 0.5 for one never compared."""
+    with _lock:
+        counts = _load().get(key, {})
+    return (counts.get("hits", 0) + 1) / (counts.get("attempts", 0) + 2)
+
+
+def record_reference_result(key, matched):
+    with _lock:
+        counts = _load().setdefault(key, {"hits": 0, "attempts": 0})
+        counts["attempts"] += 1
+        if matched:
+            counts["hits"] += 1
+
+
+def save_hit_rates():
+    with _lock:
+        if _hit_rates is None:
+            return
+        data = json.dumps(_hit_rates)
+    tmp = None
+    try:
+        # A temp file per write: concurrent requests and workers save at once
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(REFERENCE_HIT_RATES_FILE)), suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            f.write(data)
+        os.replace(tmp, REFERENCE_HIT_RATES_FILE)
+    except OSError as e:
+        print(f"Could not save reference hit rates: {e}")
+        if tmp and os.path.exists(tmp):
+            os.remove(tmp)
+
+
+# -------------------------------
+# SCHEDULING
+# -------------------------------
+
+def references_by_student(references):
+    """
+    Roster references ({er_number: [keys]}, see core.roster_cache) with each
+    student's reference images ordered by historical hit rate (best first).
+    """
+    return {
+        er: sorted(keys, key=hit_rate, reverse=True)
+        for er, keys in references.items()
+    }
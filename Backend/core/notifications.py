@@ -0,0 +1,275 @@
+import fcntl
+import json
+import os
+import random
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from dotenv import load_dotenv
+from prometheus_client import Counter
+
+from core.aws_clients import get_client
+from core.rate_limiter import TokenBucket, is_throttling_error, worker_count
+
+load_dotenv()
+
+# -------------------------------
+# NOTIFIERS
+# -------------------------------
+# NOTIFIER picks how messages leave the app: "sns" texts each parent through
+# SNS (PhoneNumber publish, or a topic for "arn:" recipients), "file" appends them to NOTIFIER_FILE and prints
+# them (local runs and tests). Other channels plug in with register_notifier.
+NOTIFIER = os.getenv("NOTIFIER", "sns")
+NOTIFIER_FILE = os.getenv("NOTIFIER_FILE", "notifications.jsonl")
+NOTIFY_CONCURRENCY = int(os.getenv("NOTIFY_CONCURRENCY", 8))
+# Sends per second across all workers (SNS SMS default quota is 20/s)
+NOTIFY_TPS = float(os.getenv("NOTIFY_TPS", 10))
+NOTIFY_MAX_RETRIES = int(os.getenv("NOTIFY_MAX_RETRIES", 3))
+# (report, student) pairs already notified; see NotificationLedger
+NOTIFICATION_LEDGER_FILE = os.getenv("NOTIFICATION_LEDGER_FILE", "notification_ledger.jsonl")
+# Country code given to numbers entered without one (10-digit mobiles)
+NOTIFY_DEFAULT_COUNTRY_CODE = os.getenv("NOTIFY_DEFAULT_COUNTRY_CODE", "91")
+
+NOTIFICATIONS_SENT = Counter(
+    "notifications_total",
+    "Notification sends by channel and outcome",
+    ["notifier", "result"],
+)
+
+
+def normalize_phone(number, country_code=None):
+    """
+    E.164 form ("+919876543210") of a phone number as typed at enrolment,
+    or None when it cannot be one. Separators are dropped; "00" becomes
+    "+", and a national number (optionally with a trunk "0") gets the
+    default country code.
+    """
+    country_code = country_code or NOTIFY_DEFAULT_COUNTRY_CODE
+    raw = re.sub(r"[\s\-().]", "", str(number or ""))
+    if raw.startswith("+"):
+        digits = raw[1:]
+    elif raw.startswith("00"):
+        digits = raw[2:]
+    elif len(raw) == 11 and raw.startswith("0"):
+        digits = country_code + raw[1:]
+    elif len(raw) == 10:
+        digits = country_code + raw
+    else:
+        digits = raw
+    return f"+{digits}" if re.fullmatch(r"[1-9]\d{7,14}", digits) else None
+
+
+class SnsNotifier:
+    name = "sns"
+
+    def send(self, message):
+        sns = get_client("sns")
+        # Staff summaries go to a topic, parent messages straight to a phone
+        if message["to"].startswith("arn:"):
+            sns.publish(TopicArn=message["to"], Subject=message["subject"], Message=message["body"])
+            return
+        phone = normalize_phone(message["to"])
+        if phone is None:
+            raise ValueError(f"Not a valid phone number: {message['to']!r}")
+        sns.publish(
+            PhoneNumber=phone,
+            Message=message["body"],
+            MessageAttributes={
+                "AWS.SNS.SMS.SMSType": {"DataType": "String", "StringValue": "Transactional"},
+            },
+        )
+
+
+class FileNotifier:
+    """Local stand-in: one JSON line per message, echoed to the console."""
+
+    name = "file"
+
+    def __init__(self, path=None):
+        self.path = path or NOTIFIER_FILE
+        self._lock = threading.Lock()
+
+    def send(self, message):
+        line = json.dumps(dict(message, sent_at=datetime.now().isoformat()))
+        with self._lock, open(self.path, "a") as f:
+            f.write(line + "\n")
+        print(f"[notify] {message['to']}: {message['body']}")
+
+
+_notifier_factories = {"sns": SnsNotifier, "file": FileNotifier}
+_notifier = None
+
+
+def register_notifier(name, factory):
+    _notifier_factories[name] = factory
+
+
+def get_notifier():
+    global _notifier
+    if _notifier is None:
+        _notifier = _notifier_factories[NOTIFIER]()
+    return _notifier
+
+
+def set_notifier(notifier):
+    """Install a notifier instance (tests, scripts)."""
+    global _notifier
+    _notifier = notifier
+
+
+# -------------------------------
+# IDEMPOTENCY LEDGER
+# -------------------------------
+
+class NotificationLedger:
+    """
+    Append-only record of (report, student) pairs whose parent was notified,
+    shared by every worker on the host through a locked file, so re-running
+    an alert for the same report never texts a parent twice. Pairs are
+    reserved before the send (under the file lock, so two runs cannot both
+    claim one) and released again if it fails; a crash mid-send leaves the
+    pair reserved, so it is never sent twice rather than possibly twice.
+    """
+
+    RELEASED = "released"
+
+    def __init__(self, path=None):
+        self.path = path or NOTIFICATION_LEDGER_FILE
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _entries(f):
+        taken = set()
+        for line in f:
+            entry = json.loads(line) if line.strip() else None
+            if not entry:
+                continue
+            if len(entry) == 3 and entry[2] == NotificationLedger.RELEASED:
+                taken.discard(NotificationLedger.key(entry[0], entry[1]))
+            else:
+                taken.add(NotificationLedger.key(entry[0], entry[1]))
+        return taken
+
+    def _read(self):
+        try:
+            with open(self.path) as f:
+                return self._entries(f)
+        except FileNotFoundError:
+            return set()
+
+    @staticmethod
+    def key(report_key, er_number):
+        return json.dumps([report_key, str(er_number)])
+
+    def sent(self, report_key, er_numbers):
+        done = self._read()
+        return {er for er in er_numbers if self.key(report_key, er) in done}
+
+    def _append(self, lines, select=None):
+        """Append lines under the file lock; select(taken) picks them from what is already recorded."""
+        with self._lock, open(self.path, "a+") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                if select:
+                    f.seek(0)
+                    lines = select(self._entries(f))
+                for line in lines:
+                    f.write(line + "\n")
+                f.flush()
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+        return lines
+
+    def reserve(self, report_key, er_numbers):
+        """Claim the students not yet recorded for this report; returns the ones claimed."""
+        claimed = set()
+
+        def select(taken):
+            for er in dict.fromkeys(str(er) for er in er_numbers):
+                if self.key(report_key, er) not in taken:
+                    claimed.add(er)
+            return [self.key(report_key, er) for er in claimed]
+
+        self._append([], select)
+        return claimed
+
+    def record(self, report_key, er_numbers):
+        self._append([self.key(report_key, er) for er in er_numbers])
+
+    def release(self, report_key, er_numbers):
+        """Give back reservations whose send failed, so a later run retries them."""
+        self._append([json.dumps([report_key, str(er), self.RELEASED]) for er in er_numbers])
+
+
+# -------------------------------
+# FAN-OUT
+# -------------------------------
+
+_bucket = None
+
+
+def _get_bucket():
+    global _bucket
+    if _bucket is None:
+        _bucket = TokenBucket(NOTIFY_TPS / worker_count())
+    return _bucket
+
+
+def _send_with_retry(notifier, message):
+    bucket = _get_bucket()
+    for attempt in range(NOTIFY_MAX_RETRIES + 1):
+        bucket.acquire()
+        try:
+            notifier.send(message)
+            bucket.succeeded()
+            return
+        except Exception as e:
+            if not is_throttling_error(e) or attempt == NOTIFY_MAX_RETRIES:
+                raise
+            bucket.throttled()
+            time.sleep(random.uniform(0, min(10.0, 0.5 * (2 ** attempt))))
+
+
+def send_notifications(report_key, messages, render, notifier=None, ledger=None):
+    """
+    Send messages ({"to", "subject", "students": [{"er_number", "name"}]})
+    with NOTIFY_CONCURRENCY workers under the NOTIFY_TPS budget. Students
+    are reserved in the ledger first; those already notified (or being
+    notified by another run) for this report are dropped from their message
+    and a message left with none is not sent; render(message) then builds
+    the text from the remaining students.
+    Returns {"sent", "skipped_duplicate", "failed"} counted in messages.
+    """
+    notifier = notifier or get_notifier()
+    ledger = ledger or NotificationLedger()
+
+    summary = {"sent": 0, "skipped_duplicate": 0, "failed": 0}
+    pending = []
+    claimed = ledger.reserve(report_key, [s["er_number"] for m in messages for s in m["students"]])
+    for message in messages:
+        students = [s for s in message["students"] if str(s["er_number"]) in claimed]
+        if not students:
+            summary["skipped_duplicate"] += 1
+            continue
+        message = dict(message, students=students)
+        message["body"] = render(message)
+        pending.append(message)
+
+    def deliver(message):
+        try:
+            _send_with_retry(notifier, message)
+        except Exception as e:
+            print(f"Notification to {message['to']} failed: {e}")
+            ledger.release(report_key, [s["er_number"] for s in message["students"]])
+            NOTIFICATIONS_SENT.labels(notifier.name, "failed").inc()
+            return False
+        NOTIFICATIONS_SENT.labels(notifier.name, "sent").inc()
+        return True
+
+    if pending:
+        with ThreadPoolExecutor(max_workers=min(NOTIFY_CONCURRENCY, len(pending))) as pool:
+            for ok in pool.map(deliver, pending):
+                summary["sent" if ok else "failed"] += 1
+    return summary
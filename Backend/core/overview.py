@@ -1,130 +1,22 @@
 import io
 import os
-import pandas as pd
 from flask import Blueprint, jsonify
 from dotenv import load_dotenv
-import boto3
 from datetime import timezone
+from core.aws_clients import get_client
+from core.eligibility_snapshot import latest_snapshot, snapshot_info, students_below
+from core.response_cache import cached_response
 
 # -----------------------
 # Load environment
 # -----------------------
 load_dotenv()
 
-AWS_REGION = os.getenv("AWS_REGION", "ap-south-1")
-AWS_ACCESS_KEY = os.getenv("AWS_ACCESS_KEY")
-AWS_SECRET_KEY = os.getenv("AWS_SECRET_KEY")
-
 # 🔴 MUST MATCH EXACT BUCKET NAME
 BUCKET_NAME = os.getenv("BUCKET_NAME", "ict-attendances")
 
-# -----------------------
-# S3 client
-# -----------------------
-s3_client = boto3.client(
-    "s3",
-    region_name=AWS_REGION,
-    aws_access_key_id=AWS_ACCESS_KEY,
-    aws_secret_access_key=AWS_SECRET_KEY
-)
-
 dashboard_bp = Blueprint("dashboard_api", __name__)
 
-# =====================================================
-# 🔹 LOW ATTENDANCE HELPER FUNCTION
-# =====================================================
-def get_low_attendance_students(threshold=75):
-    """
-    Calculate low attendance students using reports in S3
-    """
-
-    # 1️⃣ Load students.xlsx
-    students_obj = s3_client.get_object(
-        Bucket=BUCKET_NAME,
-        Key="students.xlsx"
-    )
-    students_body = students_obj["Body"].read()
-    df_students = pd.read_excel(io.BytesIO(students_body))
-
-    # Expected columns:
-    # ER Number | Name | Batch | Section
-    students = df_students.to_dict(orient="records")
-
-    # 2️⃣ List reports
-    response = s3_client.list_objects_v2(
-        Bucket=BUCKET_NAME,
-        Prefix="reports/"
-    )
-
-    attendance_map = {}
-    total_classes = 0
-
-    for obj in response.get("Contents", []):
-        key = obj["Key"]
-
-        if not key.endswith((".xlsx", ".csv")):
-            continue
-
-        total_classes += 1
-
-        report_obj = s3_client.get_object(
-            Bucket=BUCKET_NAME,
-            Key=key
-        )
-        body = report_obj["Body"].read()
-
-        df = (
-            pd.read_csv(io.BytesIO(body))
-            if key.endswith(".csv")
-            else pd.read_excel(io.BytesIO(body))
-        )
-
-        if "ER Number" not in df.columns or "Status" not in df.columns:
-            continue
-
-        present_ers = set(
-            df[df["Status"].str.lower() == "present"]["ER Number"]
-        )
-
-        for s in students:
-            er = s["ER Number"]
-
-            attendance_map.setdefault(
-                er,
-                {
-                    "name": s.get("Name", "Unknown"),
-                    "batch": s.get("Batch", "Unknown"),
-                    "section": s.get("Section", "Unknown"),
-                    "present": 0
-                }
-            )
-
-            if er in present_ers:
-                attendance_map[er]["present"] += 1
-
-    # 3️⃣ Calculate percentages
-    low_attendance = []
-
-    for er, data in attendance_map.items():
-        percentage = (
-            round((data["present"] / total_classes) * 100, 2)
-            if total_classes > 0 else 0
-        )
-
-        if percentage < threshold:
-            low_attendance.append({
-                "erNumber": er,
-                "name": data["name"],
-                "batch": data["batch"],
-                "section": data["section"],
-                "presentClasses": data["present"],
-                "totalClasses": total_classes,
-                "attendancePercentage": percentage
-            })
-
-    return low_attendance
-
-
 # =====================================================
 # 🔹 LOW ATTENDANCE API
 # =====================================================
@@ -133,13 +25,27 @@ def trigger_low_attendance_alert():
     try:
         threshold = float(os.getenv("LOW_ATTENDANCE_THRESHOLD", 75))
 
-        students = get_low_attendance_students(threshold)
+        # Served from the latest eligibility snapshot (core.eligibility_snapshot)
+        snapshot = latest_snapshot()
+        students = [
+            {
+                "erNumber": s["er_number"],
+                "name": s["name"],
+                "batch": s["batch"],
+                "section": "Unknown",
+                "presentClasses": s["present_count"],
+                "totalClasses": s["total_classes"],
+                "attendancePercentage": s["attendance_percentage"]
+            }
+            for s in students_below(threshold)
+        ]
 
         return jsonify({
             "success": True,
             "threshold": threshold,
             "lowAttendanceCount": len(students),
-            "students": students
+            "students": students,
+            "snapshot": snapshot_info(snapshot)
         })
 
     except Exception as e:
@@ -154,8 +60,12 @@ def trigger_low_attendance_alert():
 # 🔹 OVERVIEW API (UNCHANGED)
 # =====================================================
 @dashboard_bp.route("/api/overview", methods=["GET"])
+@cached_response
 def class_overview():
     try:
+        import pandas as pd
+
+        s3_client = get_client("s3")
         print("DEBUG: Using bucket ->", BUCKET_NAME)
 
         # 1️⃣ Load students.xlsx
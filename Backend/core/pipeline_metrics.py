@@ -0,0 +1,205 @@
+import asyncio
+import contextvars
+import os
+import time
+from contextlib import contextmanager
+from functools import wraps
+from prometheus_client import Counter, Histogram
+from core.aws_clients import RECOGNITION_BACKEND
+from core.roster_cache import is_known_batch
+from core.tracing import span
+
+# -------------------------------
+# PIPELINE METRICS
+# -------------------------------
+# Where /take_attendance time goes, stage by stage, labelled by batch and
+# recognition backend. The batch is set once per run with
+# attendance_context(batch_name) and picked up by every stage below it
+# (the async pipeline copies the context into its worker threads).
+# batch_name comes straight from the request, so only batches with a roster
+# in S3 get their own label; anything else is counted as "other".
+STAGE_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 30, 50, 75, 100, 150, 200)
+
+STAGE_SECONDS = Histogram(
+    "attendance_stage_seconds",
+    "Attendance pipeline stage latency (decode_quality, detect_faces, excel_write)",
+    ["stage", "batch", "backend"],
+    buckets=STAGE_BUCKETS,
+)
+
+MATCH_CALL_SECONDS = Histogram(
+    "attendance_match_call_seconds",
+    "Latency of one matching call (search_faces_by_image / compare_faces)",
+    ["api", "batch", "backend"],
+    buckets=STAGE_BUCKETS,
+)
+
+MATCH_CALLS = Counter(
+    "attendance_match_calls_total",
+    "Matching calls by outcome (match, no_match, error)",
+    ["api", "batch", "backend", "result"],
+)
+
+FACES_PER_IMAGE = Histogram(
+    "attendance_faces_per_image",
+    "Faces detected per group image",
+    ["batch", "backend"],
+    buckets=COUNT_BUCKETS,
+)
+
+MATCHES_PER_SESSION = Histogram(
+    "attendance_matches_per_session",
+    "Students marked present per attendance run",
+    ["batch", "backend"],
+    buckets=COUNT_BUCKETS,
+)
+
+S3_SECONDS = Histogram(
+    "s3_request_seconds",
+    "S3 call latency",
+    ["operation", "batch"],
+    buckets=STAGE_BUCKETS,
+)
+
+S3_BYTES = Counter(
+    "s3_bytes_total",
+    "Bytes read from / written to S3",
+    ["operation", "batch"],
+)
+
+_batch = contextvars.ContextVar("attendance_batch", default="-")
+
+
+@contextmanager
+def attendance_context(batch_name):
+    token = _batch.set(batch_name or "-")
+    try:
+        yield
+    finally:
+        _batch.reset(token)
+
+
+def current_batch():
+    return _batch.get()
+
+
+def batch_label(batch):
+    """The metric label for a batch name: itself if it has a roster, else "other"."""
+    return batch if batch == "-" or is_known_batch(batch) else "other"
+
+
+def _batch_label():
+    # Read when observed: the roster is loaded before the first stage runs
+    return batch_label(_batch.get())
+
+
+def in_attendance_context(fn):
+    """
+    Run a pipeline (sync or async) under attendance_context(its batch_name),
+    in a span named after it.
+    """
+    def batch_of(args, kwargs):
+        return kwargs["batch_name"] if "batch_name" in kwargs else args[0]
+
+    if asyncio.iscoroutinefunction(fn):
+        @wraps(fn)
+        async def async_wrapper(*args, **kwargs):
+            batch = batch_of(args, kwargs)
+            with attendance_context(batch), span(fn.__name__, batch=batch, backend=RECOGNITION_BACKEND):
+                return await fn(*args, **kwargs)
+        return async_wrapper
+
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        batch = batch_of(args, kwargs)
+        with attendance_context(batch), span(fn.__name__, batch=batch, backend=RECOGNITION_BACKEND):
+            return fn(*args, **kwargs)
+    return wrapper
+
+
+@contextmanager
+def stage_timer(stage):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.labels(stage, _batch_label(), RECOGNITION_BACKEND).observe(time.perf_counter() - start)
+
+
+@contextmanager
+def match_call_timer(api):
+    """Times one matching call; set outcome["matched"] inside the block."""
+    outcome = {"matched": False}
+    start = time.perf_counter()
+    result = "error"
+    try:
+        yield outcome
+        result = "match" if outcome["matched"] else "no_match"
+    finally:
+        batch = _batch_label()
+        MATCH_CALL_SECONDS.labels(api, batch, RECOGNITION_BACKEND).observe(time.perf_counter() - start)
+        MATCH_CALLS.labels(api, batch, RECOGNITION_BACKEND, result).inc()
+
+
+def observe_faces(count):
+    FACES_PER_IMAGE.labels(_batch_label(), RECOGNITION_BACKEND).observe(count)
+
+
+def observe_matches(count):
+    MATCHES_PER_SESSION.labels(_batch_label(), RECOGNITION_BACKEND).observe(count)
+
+
+# -------------------------------
+# S3
+# -------------------------------
+
+def _body_size(body):
+    if isinstance(body, (bytes, bytearray, str)):
+        return len(body)
+    return None
+
+
+def _transfer_size(operation, args, kwargs, response):
+    if operation == "get_object":
+        return (response or {}).get("ContentLength")
+    if operation == "put_object":
+        return _body_size(kwargs.get("Body"))
+    if operation == "upload_file":
+        try:
+            return os.path.getsize(kwargs.get("Filename") or args[0])
+        except (IndexError, OSError):
+            return None
+    return None
+
+
+class InstrumentedS3Client:
+    """
+    Wraps an S3 client so every call is timed and object reads / writes are
+    counted in bytes; everything else (exceptions, meta, paginators) passes
+    through.
+    """
+
+    def __init__(self, client):
+        self._client = client
+
+    def __getattr__(self, name):
+        attr = getattr(self._client, name)
+        if name.startswith("_") or name in ("exceptions", "meta") or not callable(attr):
+            return attr
+        if name in ("get_paginator", "get_waiter", "can_paginate"):
+            return attr
+
+        def timed(*args, **kwargs):
+            batch = _batch_label()
+            start = time.perf_counter()
+            try:
+                response = attr(*args, **kwargs)
+            finally:
+                S3_SECONDS.labels(name, batch).observe(time.perf_counter() - start)
+            size = _transfer_size(name, args, kwargs, response)
+            if size:
+                S3_BYTES.labels(name, batch).inc(size)
+            return response
+
+        return timed
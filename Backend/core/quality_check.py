@@ -1,5 +1,29 @@
 import io
 
+def decode_image(image_bytes):
+    """Decode image bytes to a BGR array (None if undecodable)."""
+    import cv2
+    import numpy as np
+
+    return cv2.imdecode(np.frombuffer(image_bytes, np.uint8), cv2.IMREAD_COLOR)
+
+
+def image_size(quality_report):
+    """(width, height) from a quality report's "WxH" resolution, or (0, 0)."""
+    try:
+        width, height = quality_report["resolution"].split("x")
+        return int(width), int(height)
+    except (KeyError, ValueError):
+        return 0, 0
+
+
+def laplacian_variance(gray):
+    """Sharpness of a grayscale image: variance of its Laplacian (low = blurry)."""
+    import cv2
+
+    return cv2.Laplacian(gray, cv2.CV_64F).var()
+
+
 def analyze_image_quality(image_bytes):
     # Lazy import to avoid startup crash if libraries are missing
     import cv2
@@ -17,7 +41,7 @@ def analyze_image_quality(image_bytes):
         gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
 
         # 1. Blur Detection (Laplacian Variance)
-        blur_score = cv2.Laplacian(gray, cv2.CV_64F).var()
+        blur_score = laplacian_variance(gray)
         is_blurry = bool(blur_score < 100.0)  # Threshold can be tuned
 
         # 2. Lighting Check (Mean Brightness)
@@ -55,3 +79,44 @@ def analyze_image_quality(image_bytes):
     except Exception as e:
         print(f"Error in quality check: {e}")
         return {"error": str(e)}
+
+
+def add_face_metrics(quality_report, faces):
+    """
+    Merge Rekognition FaceDetails into a quality report: face count,
+    average confidence and the share of the image covered by faces.
+    """
+    quality_report.update({
+        "face_detected": False,
+        "face_count": 0,
+        "avg_face_confidence": 0.0,
+        "face_coverage_pct": 0.0,
+    })
+
+    if not faces:
+        quality_report["error"] = "No faces detected"
+        return quality_report
+
+    face_count = len(faces)
+    avg_confidence = 0.0
+    total_face_area = 0.0
+
+    for face in faces:
+        avg_confidence += float(face["Confidence"])
+        box = face["BoundingBox"]
+        total_face_area += float(box["Width"] * box["Height"])
+
+    avg_confidence /= face_count
+    face_coverage = total_face_area * 100
+
+    quality_report.update({
+        "face_detected": True,
+        "face_count": face_count,
+        "avg_face_confidence": round(avg_confidence, 2),
+        "face_coverage_pct": round(face_coverage, 2),
+    })
+
+    if face_coverage < 1.0:
+        quality_report["suggestion"] = (quality_report.get("suggestion", "") + " Faces too far. Move closer.")
+
+    return quality_report
@@ -0,0 +1,207 @@
+import os
+import random
+import threading
+import time
+
+from prometheus_client import Counter, Gauge
+from core.aws_clients import aws_error_code
+
+# -----------------------
+# Rekognition call budget
+# -----------------------
+# REKOGNITION_TPS is the account-wide budget per API (override one API with
+# e.g. REKOGNITION_TPS_COMPARE_FACES). Buckets live in each process, so the
+# budget is split evenly across the gunicorn workers (WEB_CONCURRENCY, which
+# gunicorn.conf.py sets to the worker count it runs; unset means a single
+# process such as `python main.py`). The adaptive backoff below absorbs
+# whatever else (other hosts, other apps) shares the quota.
+REKOGNITION_TPS = float(os.getenv("REKOGNITION_TPS", 5))
+
+
+def worker_count():
+    """Processes sharing this host's budgets; read when a bucket is created (after fork)."""
+    return max(1, int(os.getenv("WEB_CONCURRENCY", 1)))
+RATE_LIMIT_MAX_RETRIES = int(os.getenv("RATE_LIMIT_MAX_RETRIES", 5))
+RATE_LIMIT_BASE_DELAY = float(os.getenv("RATE_LIMIT_BASE_DELAY", 0.2))
+RATE_LIMIT_MAX_DELAY = float(os.getenv("RATE_LIMIT_MAX_DELAY", 10))
+
+THROTTLE_ERROR_CODES = {
+    "ProvisionedThroughputExceededException",
+    "ThrottlingException",
+    "LimitExceededException",
+    "TooManyRequestsException",
+}
+
+# Retried with the same backoff, without slowing the bucket down. botocore's
+# own retries are off for these clients (core/aws_clients.py) so throttles
+# are not retried twice; this keeps the transient errors it would retry.
+TRANSIENT_ERROR_CODES = {
+    "InternalServerError",
+    "InternalFailure",
+    "ServiceUnavailable",
+    "ServiceUnavailableException",
+    "RequestTimeout",
+    "RequestTimeoutException",
+}
+
+# -----------------------
+# Metrics
+# -----------------------
+API_CALLS = Counter(
+    "rekognition_calls_total",
+    "Rekognition API calls issued (including retries)",
+    ["api"]
+)
+
+API_THROTTLES = Counter(
+    "rekognition_throttles_total",
+    "Rekognition calls rejected with a throttling error",
+    ["api"]
+)
+
+API_RETRIES = Counter(
+    "rekognition_retries_total",
+    "Rekognition calls retried after throttling or a transient error",
+    ["api"]
+)
+
+API_RATE = Gauge(
+    "rekognition_rate_limit_tps",
+    "Current adaptive per-process rate limit (summed over live workers)",
+    ["api"],
+    multiprocess_mode="livesum"
+)
+
+
+class TokenBucket:
+    """
+    Blocking token bucket with AIMD rate adaptation: the rate halves on every
+    throttle and creeps back up by 5% of the ceiling per successful call.
+    """
+
+    def __init__(self, rate, burst=None, min_rate=0.2):
+        self.max_rate = rate
+        self.min_rate = min(min_rate, rate)
+        self.rate = rate
+        self.burst = burst or max(1.0, rate)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def throttled(self):
+        with self._lock:
+            self.rate = max(self.min_rate, self.rate / 2)
+            self.tokens = min(self.tokens, 0)
+            return self.rate
+
+    def succeeded(self):
+        with self._lock:
+            if self.rate < self.max_rate:
+                self.rate = min(self.max_rate, self.rate + self.max_rate * 0.05)
+            return self.rate
+
+
+_buckets = {}
+_buckets_lock = threading.Lock()
+
+
+def _api_rate(api):
+    rate = float(os.getenv(f"REKOGNITION_TPS_{api.upper()}", REKOGNITION_TPS))
+    return rate / worker_count()
+
+
+def get_bucket(api):
+    bucket = _buckets.get(api)
+    if bucket is None:
+        with _buckets_lock:
+            bucket = _buckets.get(api)
+            if bucket is None:
+                bucket = TokenBucket(_api_rate(api))
+                _buckets[api] = bucket
+                API_RATE.labels(api).set(bucket.rate)
+    return bucket
+
+
+def is_throttling_error(error):
+    return aws_error_code(error) in THROTTLE_ERROR_CODES
+
+
+def is_transient_error(error):
+    """5xx-style service errors and dropped / timed-out connections."""
+    if aws_error_code(error) in TRANSIENT_ERROR_CODES:
+        return True
+    status = getattr(error, "response", {}).get("ResponseMetadata", {}).get("HTTPStatusCode")
+    if status in (500, 502, 503, 504):
+        return True
+    try:
+        from botocore.exceptions import ConnectionError, HTTPClientError
+    except ImportError:
+        return False
+    return isinstance(error, (ConnectionError, HTTPClientError))
+
+
+def call_with_rate_limit(api, fn, **kwargs):
+    """
+    Run one API call through its token bucket, retrying throttled calls and
+    transient errors with exponential backoff (full jitter). Other errors
+    raise at once; retryable ones raise once the retries are used up.
+    """
+    bucket = get_bucket(api)
+
+    for attempt in range(RATE_LIMIT_MAX_RETRIES + 1):
+        bucket.acquire()
+        API_CALLS.labels(api).inc()
+        try:
+            result = fn(**kwargs)
+        except Exception as e:
+            if is_throttling_error(e):
+                API_THROTTLES.labels(api).inc()
+                API_RATE.labels(api).set(bucket.throttled())
+            elif not is_transient_error(e):
+                raise
+            if attempt == RATE_LIMIT_MAX_RETRIES:
+                raise
+            API_RETRIES.labels(api).inc()
+            delay = min(RATE_LIMIT_MAX_DELAY, RATE_LIMIT_BASE_DELAY * (2 ** attempt))
+            time.sleep(random.uniform(0, delay))
+            continue
+
+        API_RATE.labels(api).set(bucket.succeeded())
+        return result
+
+
+class RateLimitedClient:
+    """
+    Wraps a boto3 client so every API method goes through
+    call_with_rate_limit; everything else (exceptions, meta) passes through.
+    """
+
+    def __init__(self, client):
+        self._client = client
+
+    def __getattr__(self, name):
+        attr = getattr(self._client, name)
+        if name.startswith("_") or name in ("exceptions", "meta") or not callable(attr):
+            return attr
+        if name in ("get_paginator", "get_waiter", "can_paginate"):
+            return attr
+
+        def limited(**kwargs):
+            return call_with_rate_limit(name, attr, **kwargs)
+
+        return limited
@@ -1,27 +1,16 @@
 import os
 import io
 import csv
-import boto3
-import pandas as pd
 from datetime import datetime, timezone
 from dotenv import load_dotenv
+from core.aws_clients import get_client
 
 # Load environment values
 load_dotenv()
 
 AWS_REGION = os.getenv("AWS_REGION", "ap-south-1")
-AWS_ACCESS_KEY = os.getenv("AWS_ACCESS_KEY")
-AWS_SECRET_KEY = os.getenv("AWS_SECRET_KEY")
 BUCKET_NAME = os.getenv("BUCKET_NAME", "ict-attendance")
 
-# Initialize S3 client
-s3_client = boto3.client(
-    "s3",
-    region_name=AWS_REGION,
-    aws_access_key_id=AWS_ACCESS_KEY,
-    aws_secret_access_key=AWS_SECRET_KEY,
-)
-
 # 🔹 Subject mapping dictionary
 SUBJECT_MAP = {
     "OS": "Operating System",
@@ -72,6 +61,9 @@ def load_master_students():
     Returns: dict {batch: {section: [students]}}
     """
     try:
+        import pandas as pd
+
+        s3_client = get_client("s3")
         s3_obj = s3_client.get_object(Bucket=BUCKET_NAME, Key="reports/students.xlsx")
         body = s3_obj["Body"].read()
         df = pd.read_excel(io.BytesIO(body))
@@ -93,6 +85,9 @@ def load_master_students():
 
 def list_s3_reports():
     try:
+        import pandas as pd
+
+        s3_client = get_client("s3")
         grouped_reports = {}  # {batch: {section: [reports]}}
         continuation_token = None
 
@@ -0,0 +1,326 @@
+import collections
+import cProfile
+import io
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime
+from dotenv import load_dotenv
+from flask import Blueprint, g, jsonify, request, send_file, session
+
+load_dotenv()
+
+# -------------------------------
+# REQUEST PROFILING
+# -------------------------------
+# Opt-in (PROFILING=1). While on, a sampler thread records the stack of every
+# in-flight request's thread every PROFILE_SAMPLE_INTERVAL seconds; requests
+# that take longer than PROFILE_SLOW_SECONDS keep that sampled profile.
+# A request whose X-Debug-Profile header carries PROFILE_ADMIN_TOKEN is
+# instead run under cProfile, for exact call counts (never without a token).
+# Profiles are saved as PROFILE_DIR/<profile id>.json (+ .prof for cProfile,
+# loadable with pstats / snakeviz) and served by /admin/profiles. Profile ids
+# are generated here, never taken from the request; the X-Profile-ID response
+# header names a cProfile'd request's profile.
+# Only the request's own thread is profiled; async views and work handed to
+# thread pools show up as waits.
+PROFILING = os.getenv("PROFILING", "0") == "1"
+PROFILE_SLOW_SECONDS = float(os.getenv("PROFILE_SLOW_SECONDS", 5))
+PROFILE_SAMPLE_INTERVAL = float(os.getenv("PROFILE_SAMPLE_INTERVAL", 0.01))
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", 100))
+PROFILE_ADMIN_TOKEN = os.getenv("PROFILE_ADMIN_TOKEN") or None   # empty counts as unset
+PROFILE_HEADER = "X-Debug-Profile"
+TOP_FUNCTIONS = 40
+MAX_STACK_DEPTH = 64
+
+profiling_bp = Blueprint("profiling", __name__)
+
+
+# -------------------------------
+# SAMPLER
+# -------------------------------
+
+def _frame_name(frame):
+    # Function identity (its first line), so samples at different lines add up
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class StackSampler:
+    """Counts the folded stacks of registered threads, root frame first."""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self._threads = {}      # thread id -> Counter of folded stacks
+        self._lock = threading.Lock()
+        threading.Thread(target=self._run, name="request-profiler", daemon=True).start()
+
+    def start(self, thread_id):
+        with self._lock:
+            self._threads[thread_id] = collections.Counter()
+
+    def stop(self, thread_id):
+        with self._lock:
+            return self._threads.pop(thread_id, collections.Counter())
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                if not self._threads:
+                    continue
+                frames = sys._current_frames()
+                for thread_id, stacks in self._threads.items():
+                    frame = frames.get(thread_id)
+                    names = []
+                    while frame is not None and len(names) < MAX_STACK_DEPTH:
+                        names.append(_frame_name(frame))
+                        frame = frame.f_back
+                    if names:
+                        stacks[";".join(reversed(names))] += 1
+
+
+def summarize_samples(stacks, interval):
+    """
+    (top, hot): functions by time on the stack (cumulative) and by time at
+    its top (self), estimated from sample counts.
+    """
+    cumulative, own = collections.Counter(), collections.Counter()
+    for stack, count in stacks.items():
+        frames = stack.split(";")
+        own[frames[-1]] += count
+        for name in set(frames):
+            cumulative[name] += count
+
+    def row(name):
+        return {
+            "function": name,
+            "samples": cumulative[name],
+            "cumulative_s": round(cumulative[name] * interval, 3),
+            "self_s": round(own[name] * interval, 3),
+        }
+
+    return (
+        [row(name) for name, _ in cumulative.most_common(TOP_FUNCTIONS)],
+        [row(name) for name, _ in own.most_common(TOP_FUNCTIONS)],
+    )
+
+
+def summarize_cprofile(profile):
+    """(top, hot): functions by cumulative and by self time."""
+    stats = pstats.Stats(profile).stats
+
+    def rows(field):
+        ranked = sorted(stats.items(), key=lambda item: item[1][field], reverse=True)[:TOP_FUNCTIONS]
+        return [
+            {
+                "function": f"{func} ({os.path.basename(filename)}:{line})",
+                "calls": calls,
+                "cumulative_s": round(cumulative, 4),
+                "self_s": round(total, 4),
+            }
+            for (filename, line, func), (_, calls, total, cumulative, _) in ranked
+        ]
+
+    return rows(3), rows(2)
+
+
+_sampler = None
+_sampler_lock = threading.Lock()
+
+
+def _get_sampler():
+    global _sampler
+    if _sampler is None:
+        with _sampler_lock:
+            if _sampler is None:
+                _sampler = StackSampler(PROFILE_SAMPLE_INTERVAL)
+    return _sampler
+
+
+# -------------------------------
+# STORAGE
+# -------------------------------
+
+def _path(profile_id, ext):
+    # Ids are server-generated; admin lookups may pass anything
+    safe = "".join(c for c in profile_id if c.isalnum())[:64]
+    return os.path.join(PROFILE_DIR, f"{safe}{ext}")
+
+
+def save_profile(record, profile=None):
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    if profile is not None:
+        profile.dump_stats(_path(record["profile_id"], ".prof"))
+        record["pstats"] = True
+    tmp = _path(record["profile_id"], ".json.tmp")
+    with open(tmp, "w") as f:
+        json.dump(record, f)
+    os.replace(tmp, _path(record["profile_id"], ".json"))
+
+    # Oldest profiles go first
+    saved = sorted(
+        (os.path.join(PROFILE_DIR, name) for name in os.listdir(PROFILE_DIR) if name.endswith(".json")),
+        key=os.path.getmtime,
+    )
+    for old in saved[:-PROFILE_KEEP]:
+        for path in (old, old[:-len(".json")] + ".prof"):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+
+def load_profile(profile_id):
+    try:
+        with open(_path(profile_id, ".json")) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def list_profiles():
+    if not os.path.isdir(PROFILE_DIR):
+        return []
+    records = []
+    for name in os.listdir(PROFILE_DIR):
+        if not name.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(PROFILE_DIR, name)) as f:
+                record = json.load(f)
+        except (OSError, ValueError):
+            continue
+        record.pop("top", None)
+        record.pop("hot", None)
+        records.append(record)
+    return sorted(records, key=lambda r: r["started_at"], reverse=True)
+
+
+# -------------------------------
+# REQUEST HOOKS
+# -------------------------------
+
+def _token_ok(value):
+    return PROFILE_ADMIN_TOKEN is not None and value == PROFILE_ADMIN_TOKEN
+
+
+def _start_profiling():
+    g.profile_started = time.perf_counter()
+    g.profile_started_at = datetime.now().isoformat()
+    g.profile_id = uuid.uuid4().hex
+
+    if PROFILE_HEADER in request.headers and _token_ok(request.headers[PROFILE_HEADER]):
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+            g.cprofile = profile
+            return
+        except ValueError:
+            # Another profiler is active in this process: fall back to sampling
+            pass
+    _get_sampler().start(threading.get_ident())
+    g.sampling = True
+
+
+def _finish_profiling(error=None):
+    started = g.pop("profile_started", None)
+    if started is None:
+        return
+    duration = time.perf_counter() - started
+    profile = g.pop("cprofile", None)
+
+    if profile is not None:
+        profile.disable()
+        mode, (top, hot) = "cprofile", summarize_cprofile(profile)
+    elif g.pop("sampling", False):
+        stacks = _get_sampler().stop(threading.get_ident())
+        if duration < PROFILE_SLOW_SECONDS:
+            return
+        mode, (top, hot) = "sampling", summarize_samples(stacks, PROFILE_SAMPLE_INTERVAL)
+    else:
+        return
+
+    record = {
+        "profile_id": g.pop("profile_id"),
+        "request_id": g.get("request_id"),
+        "method": request.method,
+        "route": request.url_rule.rule if request.url_rule else "<unmatched>",
+        "path": request.path,
+        "status": g.get("status_code"),
+        "error": str(error) if error else None,
+        "started_at": g.pop("profile_started_at"),
+        "duration_s": round(duration, 3),
+        "mode": mode,
+        "top": top,
+        "hot": hot,
+    }
+    try:
+        save_profile(record, profile)
+    except OSError as e:
+        print(f"Could not save profile {record['profile_id']}: {e}")
+
+
+def _profile_header(response):
+    if g.get("cprofile") is not None:
+        response.headers["X-Profile-ID"] = g.profile_id
+    return response
+
+
+def init_profiling(app):
+    """Install the profiling hooks (when PROFILING=1) and the admin endpoints."""
+    app.register_blueprint(profiling_bp)
+    if PROFILING:
+        app.before_request(_start_profiling)
+        app.after_request(_profile_header)
+        app.teardown_request(_finish_profiling)
+
+
+# -------------------------------
+# ADMIN ENDPOINTS
+# -------------------------------
+
+def admin_authorized():
+    """Logged-in dashboard session, or X-Admin-Token matching PROFILE_ADMIN_TOKEN."""
+    if session.get("logged_in"):
+        return True
+    return PROFILE_ADMIN_TOKEN is not None and request.headers.get("X-Admin-Token") == PROFILE_ADMIN_TOKEN
+
+
+def admin_forbidden():
+    return jsonify({"success": False, "error": "Admin login or X-Admin-Token required"}), 403
+
+
+@profiling_bp.route("/admin/profiles", methods=["GET"])
+def profiles():
+    if not admin_authorized():
+        return admin_forbidden()
+    return jsonify({"success": True, "enabled": PROFILING, "profiles": list_profiles()}), 200
+
+
+@profiling_bp.route("/admin/profiles/<profile_id>", methods=["GET"])
+def profile_detail(profile_id):
+    if not admin_authorized():
+        return admin_forbidden()
+    record = load_profile(profile_id)
+    if record is None:
+        return jsonify({"success": False, "error": "Profile not found"}), 404
+    return jsonify({"success": True, **record}), 200
+
+
+@profiling_bp.route("/admin/profiles/<profile_id>/pstats", methods=["GET"])
+def profile_pstats(profile_id):
+    if not admin_authorized():
+        return admin_forbidden()
+    path = _path(profile_id, ".prof")
+    if not os.path.exists(path):
+        return jsonify({"success": False, "error": "No cProfile data for this request"}), 404
+    with open(path, "rb") as f:
+        data = io.BytesIO(f.read())
+    return send_file(data, mimetype="application/octet-stream", as_attachment=True,
+                     download_name=os.path.basename(path))
@@ -0,0 +1,202 @@
+import os
+import threading
+import time
+from functools import wraps
+
+from dotenv import load_dotenv
+from flask import current_app, request
+from prometheus_client import Counter
+from core.aws_clients import get_client
+
+# -----------------------
+# Load environment
+# -----------------------
+load_dotenv()
+
+BUCKET_NAME = os.getenv("BUCKET_NAME", "ict-attendances")
+REPORTS_PREFIX = "reports/"
+
+# Fresh for TTL seconds, then served stale (and refreshed in the background)
+# for another STALE_TTL seconds before a caller has to wait for a recompute.
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", 300))
+RESPONSE_CACHE_STALE_TTL = float(os.getenv("RESPONSE_CACHE_STALE_TTL", 600))
+# How often the reports/ listing is polled for writes made by other processes
+REPORTS_WATERMARK_INTERVAL = float(os.getenv("REPORTS_WATERMARK_INTERVAL", 30))
+
+# -----------------------
+# Metrics
+# -----------------------
+CACHE_REQUESTS = Counter(
+    "response_cache_requests_total",
+    "Response cache lookups (hit rate = hit / all)",
+    ["endpoint", "result"]
+)
+
+CACHE_INVALIDATIONS = Counter(
+    "response_cache_invalidations_total",
+    "Response cache invalidations",
+    ["reason"]
+)
+
+# -----------------------
+# Cache state
+# -----------------------
+_lock = threading.Lock()
+_entries = {}            # key -> {"stored_at": float, "body": bytes, "status": int, "headers": list}
+_refreshing = set()      # keys with a background revalidation in flight
+_generation = 0          # bumped on invalidation so in-flight recomputes are not stored
+_NOT_POLLED = object()   # distinct from None, which means reports/ was empty
+_watermark = {"value": _NOT_POLLED, "checked_at": 0.0}
+_watermark_lock = threading.Lock()
+
+
+def invalidate_reports_cache(reason="report_write"):
+    """
+    Drop every cached analytics response. Called whenever something is
+    written under reports/.
+    """
+    global _generation
+    with _lock:
+        _entries.clear()
+        _generation += 1
+    CACHE_INVALIDATIONS.labels(reason).inc()
+
+
+def _reports_watermark():
+    """Latest LastModified under reports/ (None when the prefix is empty)."""
+    s3 = get_client("s3")
+    paginator = s3.get_paginator("list_objects_v2")
+
+    latest = None
+    for page in paginator.paginate(Bucket=BUCKET_NAME, Prefix=REPORTS_PREFIX):
+        for obj in page.get("Contents", []):
+            if latest is None or obj["LastModified"] > latest:
+                latest = obj["LastModified"]
+    return latest
+
+
+def _check_reports_watermark():
+    """
+    Catch report writes made by other workers / processes: if the newest
+    object under reports/ changed since the last poll, invalidate.
+    """
+    now = time.monotonic()
+    if now - _watermark["checked_at"] < REPORTS_WATERMARK_INTERVAL:
+        return
+
+    # Only one request pays for the listing per interval
+    if not _watermark_lock.acquire(blocking=False):
+        return
+    try:
+        _watermark["checked_at"] = now
+        latest = _reports_watermark()
+        previous = _watermark["value"]
+        _watermark["value"] = latest
+        if previous is not _NOT_POLLED and latest != previous:
+            invalidate_reports_cache("reports_listing_changed")
+    except Exception as e:
+        print("RESPONSE CACHE: could not check reports/ listing:", e)
+    finally:
+        _watermark_lock.release()
+
+
+def _cache_key(view_kwargs, param_names):
+    # Only the parameters the view reads: any other query string (cache
+    # busters, tracking tags) would otherwise add an entry per value
+    params = "&".join(
+        f"{k}={v}" for k in sorted(param_names) for v in request.args.getlist(k)
+    )
+    view_args = "&".join(f"{k}={v}" for k, v in sorted(view_kwargs.items()))
+    return f"{request.endpoint}|{view_args}|{params}"
+
+
+def _store(key, response, generation):
+    if response.status_code != 200:
+        return
+    headers = [(k, v) for k, v in response.headers if k.lower() != "content-length"]
+    with _lock:
+        if generation != _generation:
+            return
+        _entries[key] = {
+            "stored_at": time.monotonic(),
+            "body": response.get_data(),
+            "status": response.status_code,
+            "headers": headers,
+        }
+
+
+def _build_response(entry, result):
+    response = current_app.response_class(
+        entry["body"], status=entry["status"], headers=entry["headers"]
+    )
+    response.headers["X-Cache"] = result
+    return response
+
+
+def _revalidate(app, view, key, path, query_string, view_kwargs):
+    generation = _generation
+    try:
+        with app.test_request_context(path, query_string=query_string):
+            response = app.make_response(view(**view_kwargs))
+            _store(key, response, generation)
+    except Exception as e:
+        print(f"RESPONSE CACHE: background refresh failed for {key}:", e)
+    finally:
+        with _lock:
+            _refreshing.discard(key)
+
+
+def cached_response(view=None, params=()):
+    """
+    Cache a GET view's 200 responses keyed by endpoint + the query
+    `params` it reads (none by default), with stale-while-revalidate once
+    the entry is older than the TTL. Use as @cached_response or
+    @cached_response(params=("batch",)).
+    """
+    if view is None:
+        return lambda view: cached_response(view, params)
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        _check_reports_watermark()
+
+        key = _cache_key(kwargs, params)
+        endpoint = request.endpoint
+
+        with _lock:
+            generation = _generation
+            entry = _entries.get(key)
+            age = time.monotonic() - entry["stored_at"] if entry else None
+
+            if entry and age <= RESPONSE_CACHE_TTL:
+                result = "hit"
+            elif entry and age <= RESPONSE_CACHE_TTL + RESPONSE_CACHE_STALE_TTL:
+                result = "stale"
+                start_refresh = key not in _refreshing
+                _refreshing.add(key)
+            else:
+                result = "miss"
+
+        CACHE_REQUESTS.labels(endpoint, result).inc()
+
+        if result == "hit":
+            return _build_response(entry, "HIT")
+
+        if result == "stale":
+            if start_refresh:
+                threading.Thread(
+                    target=_revalidate,
+                    args=(
+                        current_app._get_current_object(), view, key,
+                        request.path, request.query_string, kwargs
+                    ),
+                    daemon=True
+                ).start()
+            return _build_response(entry, "STALE")
+
+        response = current_app.make_response(view(*args, **kwargs))
+        _store(key, response, generation)
+        response.headers["X-Cache"] = "MISS"
+        return response
+
+    return wrapper
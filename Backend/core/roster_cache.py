@@ -0,0 +1,85 @@
+import os
+import threading
+import time
+from dotenv import load_dotenv
+from prometheus_client import Counter
+from core.tracing import set_attributes
+
+load_dotenv()
+
+# -------------------------------
+# ROSTER CACHE
+# -------------------------------
+# A batch's roster (its students and their reference photos) is rebuilt from
+# an S3 listing only when it is older than ROSTER_CACHE_TTL seconds or after
+# an enrolment in this process (upload_multiple_images); other workers pick
+# enrolments up within the TTL.
+ROSTER_CACHE_TTL = int(os.getenv("ROSTER_CACHE_TTL", 300))
+
+ROSTER_CACHE_REQUESTS = Counter(
+    "roster_cache_requests_total",
+    "Roster lookups by attendance requests",
+    ["result"],
+)
+
+_rosters = {}      # (bucket, batch_name) -> (loaded_at, roster)
+_known_batches = set()   # batch names that have had students (metric labels)
+_lock = threading.Lock()
+
+
+def parse_reference_key(key):
+    """
+    (er_number, name) of "<batch>/<ER>_<Name>_<n>.jpg", without the photo
+    index upload_multiple_images appends.
+    """
+    name_part = os.path.splitext(os.path.basename(key))[0]
+    parts = name_part.split("_")
+
+    if len(parts) >= 3 and parts[-1].isdigit():
+        parts = parts[:-1]
+    if len(parts) >= 2:
+        return parts[0].strip(), " ".join(parts[1:]).strip()
+    return name_part.strip(), name_part.strip()
+
+
+def build_roster(student_image_keys):
+    """
+    {"keys": [...], "students": {er: name}, "references": {er: [keys]}},
+    students in listing order.
+    """
+    students, references = {}, {}
+    for key in student_image_keys:
+        er, name = parse_reference_key(key)
+        students.setdefault(er, name)
+        references.setdefault(er, []).append(key)
+    return {"keys": list(student_image_keys), "students": students, "references": references}
+
+
+def get_roster(s3_bucket, batch_name):
+    from core.mark_batch_attendance import list_student_images_from_s3
+
+    cache_key = (s3_bucket, batch_name)
+    cached = _rosters.get(cache_key)
+    if cached and time.monotonic() - cached[0] < ROSTER_CACHE_TTL:
+        ROSTER_CACHE_REQUESTS.labels(result="hit").inc()
+        set_attributes(roster_cache="hit")
+        return cached[1]
+
+    ROSTER_CACHE_REQUESTS.labels(result="miss").inc()
+    set_attributes(roster_cache="miss")
+    roster = build_roster(list_student_images_from_s3(s3_bucket, f"{batch_name}/"))
+    with _lock:
+        _rosters[cache_key] = (time.monotonic(), roster)
+        if roster["students"]:
+            _known_batches.add(batch_name)
+    return roster
+
+
+def is_known_batch(batch_name):
+    """True once a roster with students has been listed for the batch in this process."""
+    return batch_name in _known_batches
+
+
+def invalidate_roster(s3_bucket, batch_name):
+    with _lock:
+        _rosters.pop((s3_bucket, batch_name), None)
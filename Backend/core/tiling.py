@@ -0,0 +1,111 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# -------------------------------
+# TILING SETTINGS
+# -------------------------------
+# "auto" tiles photos whose long side reaches TILING_MIN_LONG_SIDE (or that
+# are over Rekognition's 5 MB inline-image limit); "on" / "off" force it.
+TILING_MODE = os.getenv("TILING_MODE", "auto")
+TILING_MIN_LONG_SIDE = int(os.getenv("TILING_MIN_LONG_SIDE", 3000))
+TILE_SIZE_PX = int(os.getenv("TILE_SIZE_PX", 1600))
+TILE_OVERLAP = float(os.getenv("TILE_OVERLAP", 0.25))
+TILE_WORKERS = int(os.getenv("TILE_WORKERS", 4))
+# Two boxes are the same face when their intersection covers this share of
+# the smaller box (a face cut at a tile edge is mostly inside the full one)
+TILE_NMS_OVERLAP = float(os.getenv("TILE_NMS_OVERLAP", 0.5))
+REKOGNITION_MAX_IMAGE_BYTES = 5 * 1024 * 1024
+
+
+def should_tile(image_bytes, width, height, mode=None):
+    mode = mode or TILING_MODE
+    if mode == "on":
+        return True
+    if mode == "off":
+        return False
+    return max(width, height) >= TILING_MIN_LONG_SIDE or len(image_bytes) > REKOGNITION_MAX_IMAGE_BYTES
+
+
+def tile_grid(width, height, tile_size=TILE_SIZE_PX, overlap=TILE_OVERLAP):
+    """(x, y, w, h) tiles covering the image, neighbours overlapping by `overlap`."""
+    def starts(length):
+        if length <= tile_size:
+            return [0]
+        step = max(1, int(tile_size * (1 - overlap)))
+        positions = list(range(0, length - tile_size, step))
+        positions.append(length - tile_size)
+        return positions
+
+    return [
+        (x, y, min(tile_size, width - x), min(tile_size, height - y))
+        for y in starts(height)
+        for x in starts(width)
+    ]
+
+
+def _to_full_image(face, tile, width, height):
+    """Re-express a face detected in a tile in whole-image ratios."""
+    x, y, w, h = tile
+    box = face["BoundingBox"]
+    mapped = dict(face)
+    mapped.pop("Landmarks", None)    # tile-relative; not used downstream
+    mapped["BoundingBox"] = {
+        "Left": (x + box["Left"] * w) / width,
+        "Top": (y + box["Top"] * h) / height,
+        "Width": box["Width"] * w / width,
+        "Height": box["Height"] * h / height,
+    }
+    return mapped
+
+
+def _overlap_of_smaller(a, b):
+    a, b = a["BoundingBox"], b["BoundingBox"]
+    ix = max(0.0, min(a["Left"] + a["Width"], b["Left"] + b["Width"]) - max(a["Left"], b["Left"]))
+    iy = max(0.0, min(a["Top"] + a["Height"], b["Top"] + b["Height"]) - max(a["Top"], b["Top"]))
+    smaller = min(a["Width"] * a["Height"], b["Width"] * b["Height"])
+    return (ix * iy) / smaller if smaller > 0 else 0.0
+
+
+def non_max_suppression(faces, threshold=TILE_NMS_OVERLAP):
+    """
+    Collapse duplicates from overlapping tiles, keeping the larger and more
+    confident detection (a face clipped by a tile edge loses to the whole one).
+    """
+    ranked = sorted(
+        faces,
+        key=lambda f: (f["BoundingBox"]["Width"] * f["BoundingBox"]["Height"], f.get("Confidence", 0)),
+        reverse=True,
+    )
+    kept = []
+    for face in ranked:
+        if all(_overlap_of_smaller(face, other) < threshold for other in kept):
+            kept.append(face)
+    return kept
+
+
+def detect_faces_tiled(rekognition, img):
+    """
+    Run detect_faces on overlapping tiles of a decoded image in parallel.
+    Returns (faces in whole-image ratios after NMS, tile count).
+    """
+    import cv2
+
+    height, width = img.shape[:2]
+    tiles = tile_grid(width, height)
+
+    def detect(tile):
+        x, y, w, h = tile
+        ok, buf = cv2.imencode(".jpg", img[y:y + h, x:x + w], [cv2.IMWRITE_JPEG_QUALITY, 92])
+        if not ok:
+            raise ValueError("Could not encode tile")
+        detection = rekognition.detect_faces(Image={"Bytes": buf.tobytes()}, Attributes=["ALL"])
+        return [_to_full_image(face, tile, width, height) for face in detection.get("FaceDetails", [])]
+
+    with ThreadPoolExecutor(max_workers=min(TILE_WORKERS, len(tiles))) as pool:
+        per_tile = list(pool.map(detect, tiles))
+
+    faces = [face for tile_faces in per_tile for face in tile_faces]
+    return non_max_suppression(faces), len(tiles)
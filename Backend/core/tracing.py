@@ -0,0 +1,309 @@
+import collections
+import contextvars
+import json
+import os
+import random
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# -------------------------------
+# TRACING
+# -------------------------------
+# Spans for each Flask request, the attendance pipeline stages and every
+# AWS call made through core.aws_clients, so a slow /take_attendance can be
+# broken down (S3 listing, reference downloads, detection, compare calls).
+#
+# TRACING: "off" (default), "console" (one JSON line per finished span),
+# "memory" (last TRACE_MEMORY_SPANS spans, served to admins by /api/traces) or "otlp"
+# (OpenTelemetry collector, see OTEL_EXPORTER_OTLP_ENDPOINT). When the
+# opentelemetry-sdk package is installed spans are real OpenTelemetry spans;
+# otherwise a small built-in tracer with the same IDs and semantics is used
+# ("otlp" then needs the package). TRACE_SAMPLE_RATIO samples whole traces:
+# child spans follow their root's decision.
+TRACING = os.getenv("TRACING", "off")
+TRACING_ENABLED = TRACING != "off"
+TRACE_SAMPLE_RATIO = float(os.getenv("TRACE_SAMPLE_RATIO", 1.0))
+TRACE_MEMORY_SPANS = int(os.getenv("TRACE_MEMORY_SPANS", 2000))
+TRACE_SERVICE_NAME = os.getenv("TRACE_SERVICE_NAME", "attendance-backend")
+
+_tracer = None
+_tracer_lock = threading.Lock()
+
+
+def _clean(attributes):
+    """Span attributes must be str / bool / int / float."""
+    return {
+        k: v if isinstance(v, (str, bool, int, float)) else str(v)
+        for k, v in attributes.items() if v is not None
+    }
+
+
+# -------------------------------
+# BUILT-IN TRACER
+# -------------------------------
+
+_current = contextvars.ContextVar("trace_span", default=None)
+_memory = collections.deque(maxlen=TRACE_MEMORY_SPANS)
+
+
+class _Span:
+    def __init__(self, name, parent, attributes):
+        self.name = name
+        self.trace_id = parent.trace_id if parent else secrets.token_hex(16)
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent.span_id if parent else None
+        self.sampled = parent.sampled if parent else random.random() < TRACE_SAMPLE_RATIO
+        self.attributes = _clean(attributes)
+        self.events = []
+        self.status = "OK"
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+
+    def set_attribute(self, key, value):
+        self.attributes.update(_clean({key: value}))
+
+    def record_exception(self, error):
+        self.status = "ERROR"
+        self.events.append({"name": "exception", "type": type(error).__name__, "message": str(error)})
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start": self.start_ns / 1e9,
+            "duration_ms": round((self.end_ns - self.start_ns) / 1e6, 3),
+            "status": self.status,
+            "attributes": self.attributes,
+            "events": self.events,
+        }
+
+
+class _BuiltinTracer:
+    def start(self, name, attributes):
+        span = _Span(name, _current.get(), attributes)
+        return span, _current.set(span)
+
+    def end(self, span, token):
+        _current.reset(token)
+        span.end_ns = time.time_ns()
+        if not span.sampled:
+            return
+        if TRACING == "memory":
+            _memory.append(span.to_dict())
+        else:
+            print(json.dumps({"span": span.to_dict()}))
+
+    def current(self):
+        return _current.get()
+
+    def finished_spans(self):
+        return list(_memory)
+
+
+# -------------------------------
+# OPENTELEMETRY
+# -------------------------------
+
+class _OtelTracer:
+    def __init__(self):
+        from opentelemetry import trace
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import SpanProcessor, TracerProvider
+        from opentelemetry.sdk.trace.export import (
+            BatchSpanProcessor, ConsoleSpanExporter, SimpleSpanProcessor,
+        )
+        from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+
+        provider = TracerProvider(
+            sampler=ParentBased(TraceIdRatioBased(TRACE_SAMPLE_RATIO)),
+            resource=Resource.create({"service.name": TRACE_SERVICE_NAME}),
+        )
+        self.memory = None
+        if TRACING == "memory":
+            # The SDK's InMemorySpanExporter keeps every span; this keeps the last
+            # TRACE_MEMORY_SPANS, like the built-in tracer
+            memory = self.memory = collections.deque(maxlen=TRACE_MEMORY_SPANS)
+
+            class _RecentSpans(SpanProcessor):
+                def on_end(self, span):
+                    memory.append(span)
+
+            provider.add_span_processor(_RecentSpans())
+        elif TRACING == "otlp":
+            from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+
+            provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+        else:
+            provider.add_span_processor(SimpleSpanProcessor(ConsoleSpanExporter()))
+
+        self._trace = trace
+        self._tracer = provider.get_tracer("core.tracing")
+
+    def start(self, name, attributes):
+        from opentelemetry import context
+
+        span = self._tracer.start_span(name, attributes=_clean(attributes))
+        return span, context.attach(self._trace.set_span_in_context(span))
+
+    def end(self, span, token):
+        from opentelemetry import context
+
+        context.detach(token)
+        span.end()
+
+    def current(self):
+        span = self._trace.get_current_span()
+        return span if span.is_recording() else None
+
+    def finished_spans(self):
+        if self.memory is None:
+            return []
+        spans = list(self.memory)
+        return [
+            {
+                "name": s.name,
+                "trace_id": format(s.context.trace_id, "032x"),
+                "span_id": format(s.context.span_id, "016x"),
+                "parent_id": format(s.parent.span_id, "016x") if s.parent else None,
+                "start": s.start_time / 1e9,
+                "duration_ms": round((s.end_time - s.start_time) / 1e6, 3),
+                "status": s.status.status_code.name,
+                "attributes": dict(s.attributes or {}),
+                "events": [{"name": e.name, **dict(e.attributes or {})} for e in s.events],
+            }
+            for s in spans
+        ]
+
+
+def get_tracer():
+    global _tracer
+    if _tracer is None:
+        with _tracer_lock:
+            if _tracer is None:
+                try:
+                    _tracer = _OtelTracer()
+                except ImportError:
+                    if TRACING == "otlp":
+                        print("opentelemetry-sdk / OTLP exporter not installed, printing spans instead")
+                    _tracer = _BuiltinTracer()
+    return _tracer
+
+
+# -------------------------------
+# API
+# -------------------------------
+
+def start_span(name, **attributes):
+    """Open a span as the current one; returns a handle for end_span (None when off)."""
+    if not TRACING_ENABLED:
+        return None
+    tracer = get_tracer()
+    span, token = tracer.start(name, attributes)
+    return tracer, span, token
+
+
+def end_span(handle, error=None, **attributes):
+    if handle is None:
+        return
+    tracer, span, token = handle
+    for key, value in _clean(attributes).items():
+        span.set_attribute(key, value)
+    if error is not None:
+        span.record_exception(error)
+        if hasattr(span, "set_status"):
+            from opentelemetry.trace import Status, StatusCode
+            span.set_status(Status(StatusCode.ERROR, str(error)))
+    tracer.end(span, token)
+
+
+@contextmanager
+def span(name, **attributes):
+    """with span("detect_faces", image_index=3) as s: ... s.set_attribute(...)"""
+    handle = start_span(name, **attributes)
+    try:
+        yield handle[1] if handle else _NO_SPAN
+    except Exception as e:
+        end_span(handle, error=e)
+        handle = None
+        raise
+    finally:
+        end_span(handle)
+
+
+def traced(name=None):
+    """Decorator: run the function in a span (named after it by default)."""
+    def decorate(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not TRACING_ENABLED:
+                return fn(*args, **kwargs)
+            with span(name or fn.__name__):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def set_attributes(**attributes):
+    """Add attributes to the current span, if any."""
+    if not TRACING_ENABLED:
+        return
+    current = get_tracer().current()
+    if current is not None:
+        for key, value in _clean(attributes).items():
+            current.set_attribute(key, value)
+
+
+def recent_traces(limit=50):
+    """Finished spans of the latest traces (memory exporter), grouped by trace."""
+    traces = collections.OrderedDict()
+    for finished in get_tracer().finished_spans() if TRACING_ENABLED else []:
+        traces.setdefault(finished["trace_id"], []).append(finished)
+    return [
+        {"trace_id": trace_id, "spans": sorted(spans, key=lambda s: s["start"])}
+        for trace_id, spans in list(traces.items())[-limit:]
+    ]
+
+
+class _NoSpan:
+    def set_attribute(self, key, value):
+        pass
+
+
+_NO_SPAN = _NoSpan()
+
+
+class TracedClient:
+    """
+    Wraps an AWS client (or local stand-in) so every API call is a span
+    named "<service>.<operation>"; everything else passes through.
+    """
+
+    def __init__(self, client, service):
+        self._client = client
+        self._service = service
+
+    def __getattr__(self, name):
+        attr = getattr(self._client, name)
+        if name.startswith("_") or name in ("exceptions", "meta") or not callable(attr):
+            return attr
+        if name in ("get_paginator", "get_waiter", "can_paginate"):
+            return attr
+
+        def traced(*args, **kwargs):
+            from core.pipeline_metrics import current_batch
+
+            attributes = {"rpc.system": "aws-api", "rpc.service": self._service, "rpc.method": name, "batch": current_batch()}
+            if "Key" in kwargs:
+                attributes["aws.s3.key"] = kwargs["Key"]
+            with span(f"{self._service}.{name}", **attributes):
+                return attr(*args, **kwargs)
+
+        return traced
@@ -1,23 +1,14 @@
-import boto3
-import pandas as pd
 from datetime import datetime
 import os
-from openpyxl import Workbook
+from core.aws_clients import get_client
 
-AWS_REGION = os.getenv("AWS_REGION", "ap-south-1")
-AWS_ACCESS_KEY = os.getenv("AWS_ACCESS_KEY")
-AWS_SECRET_KEY = os.getenv("AWS_SECRET_KEY")
 BUCKET_NAME = "ict-attendances"
 EXCEL_FILE = 'students.xlsx'
 
-s3_client = boto3.client(
-    "s3",
-    region_name=AWS_REGION,
-    aws_access_key_id=AWS_ACCESS_KEY,
-    aws_secret_access_key=AWS_SECRET_KEY,
-)
-
 def sync_students_to_excel():
+    from openpyxl import Workbook
+
+    s3_client = get_client("s3")
     response = s3_client.list_objects_v2(Bucket=BUCKET_NAME)
 
     if "Contents" not in response:
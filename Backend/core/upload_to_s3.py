@@ -1,24 +1,17 @@
 import os
-import boto3
 from werkzeug.utils import secure_filename
-from openpyxl import Workbook, load_workbook
 from datetime import datetime
 import re
-import sys
-from aws_config import AWS_ACCESS_KEY, AWS_SECRET_KEY, AWS_REGION
+from aws_config import AWS_REGION
+from core.aws_clients import get_client
+from core.mark_batch_attendance import collection_for_batch
+from core.roster_cache import invalidate_roster
 
 ALLOWED_EXTENSIONS = {'.jpg', '.jpeg', '.png'}
 MAX_FILE_SIZE_MB = 5
 EXCEL_FILE = 'students.xlsx'
 BUCKET_NAME = 'ict-attendances'
 
-s3 = boto3.client(
-    's3',
-    region_name=AWS_REGION,
-    aws_access_key_id=AWS_ACCESS_KEY,
-    aws_secret_access_key=AWS_SECRET_KEY
-)
-
 def allowed_file(filename):
     _, ext = os.path.splitext(filename)
     return ext.lower() in ALLOWED_EXTENSIONS
@@ -30,13 +23,15 @@ def file_size_okay(file_obj):
     return size_mb <= MAX_FILE_SIZE_MB
 
 def upload_file_to_s3(bucket_name, file_path, s3_key):
-    s3.upload_file(file_path, bucket_name, s3_key)
+    get_client("s3", AWS_REGION).upload_file(file_path, bucket_name, s3_key)
 
 def sanitize_for_s3_key(text: str) -> str:
     text = text.strip().replace(" ", "_")
     return re.sub(r'[^a-zA-Z0-9_\-]', '', text)
 
 def update_student_excel(batch_name, er_number, name, parent_phone):
+    from openpyxl import Workbook, load_workbook
+
     if os.path.exists(EXCEL_FILE):
         wb = load_workbook(EXCEL_FILE)
     else:
@@ -96,12 +91,13 @@ def upload_multiple_images(batch_name, er_number, name, parent_phone, image_file
         local_path = os.path.join("uploads", new_filename)
 
         image_file.save(local_path)
-        s3.upload_file(local_path, BUCKET_NAME, s3_key)
+        get_client("s3", AWS_REGION).upload_file(local_path, BUCKET_NAME, s3_key)
         results.append(f"✅ Uploaded: {s3_key}")
 
-        index_face_to_rekognition(er_number, sanitized_name, s3_key)
+        index_face_to_rekognition(er_number, sanitized_name, s3_key, collection_for_batch(sanitized_batch))
         os.remove(local_path)
 
+    invalidate_roster(BUCKET_NAME, sanitized_batch)
     update_student_excel(batch_name, er_number, name, parent_phone)
     upload_file_to_s3(BUCKET_NAME, EXCEL_FILE, EXCEL_FILE)
     results.append("✅ Excel updated & uploaded")
@@ -109,7 +105,7 @@ def upload_multiple_images(batch_name, er_number, name, parent_phone, image_file
     return results
 
 def index_face_to_rekognition(er_number, student_name, s3_key, collection_id="students"):
-    rekognition = boto3.client("rekognition", region_name=AWS_REGION)
+    rekognition = get_client("rekognition", AWS_REGION)
     external_id = f"{er_number}_{student_name}"
 
     try:
@@ -0,0 +1,176 @@
+import heapq
+import io
+import os
+import tempfile
+from dotenv import load_dotenv
+from core.quality_check import laplacian_variance
+
+load_dotenv()
+
+# -------------------------------
+# VIDEO KEYFRAMES
+# -------------------------------
+# A classroom clip is reduced to a few sharp, mutually distinct frames before
+# matching. Frames are sampled at VIDEO_SAMPLE_FPS and grouped into scenes
+# (a new scene starts when the picture changes by VIDEO_SCENE_DIFF); the
+# sharpest frame of each scene is a candidate and the VIDEO_MAX_KEYFRAMES
+# sharpest candidates are kept. Only the current scene's best frame and the
+# kept keyframes (as JPEG) are held in memory.
+VIDEO_EXTENSIONS = {'.mp4', '.mov', '.avi', '.mkv', '.webm', '.3gp'}
+VIDEO_MAX_KEYFRAMES = int(os.getenv("VIDEO_MAX_KEYFRAMES", 6))
+VIDEO_SAMPLE_FPS = float(os.getenv("VIDEO_SAMPLE_FPS", 2))
+VIDEO_MAX_SECONDS = float(os.getenv("VIDEO_MAX_SECONDS", 120))
+# Mean absolute difference (0-1) of downscaled grayscale frames
+VIDEO_SCENE_DIFF = float(os.getenv("VIDEO_SCENE_DIFF", 0.08))
+# Frames below this Laplacian variance are never keyframes
+VIDEO_MIN_SHARPNESS = float(os.getenv("VIDEO_MIN_SHARPNESS", 30))
+# Largest clip copied to disk for decoding (the app sets no request size limit)
+VIDEO_MAX_BYTES = int(os.getenv("VIDEO_MAX_BYTES", 200 * 1024 * 1024))
+THUMBNAIL_WIDTH = 160
+SHARPNESS_WIDTH = 640
+
+
+class VideoError(Exception):
+    """An uploaded clip that cannot be used: too large or not decodable (a client error)."""
+
+
+def is_video(filename, mimetype=None):
+    return (
+        os.path.splitext(filename or "")[1].lower() in VIDEO_EXTENSIONS
+        or (mimetype or "").startswith("video/")
+    )
+
+
+def _copy_capped(src, dst, limit):
+    copied = 0
+    while True:
+        chunk = src.read(1024 * 1024)
+        if not chunk:
+            return copied
+        copied += len(chunk)
+        if copied > limit:
+            raise VideoError(f"Video is larger than the {limit}-byte limit (VIDEO_MAX_BYTES)")
+        dst.write(chunk)
+
+
+def _resize_to_width(img, width):
+    import cv2
+
+    height, current = img.shape[:2]
+    if current <= width:
+        return img
+    return cv2.resize(img, (width, int(height * width / current)), interpolation=cv2.INTER_AREA)
+
+
+def _encode(frame):
+    import cv2
+
+    ok, buf = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, 92])
+    if not ok:
+        raise ValueError("Could not encode keyframe")
+    return buf.tobytes()
+
+
+def extract_keyframes(video_file):
+    """
+    Keyframes of an uploaded clip (file-like), in time order:
+    ([{"bytes" (JPEG), "timestamp", "sharpness"}], {"frames_read", "frames_sampled", "scenes"}).
+    """
+    import cv2
+    import numpy as np
+
+    # OpenCV decodes from a path; the upload is copied in chunks, not read whole
+    with tempfile.NamedTemporaryFile(suffix=".video") as tmp:
+        _copy_capped(video_file, tmp, VIDEO_MAX_BYTES)
+        tmp.flush()
+
+        capture = cv2.VideoCapture(tmp.name)
+        if not capture.isOpened():
+            raise VideoError("Could not decode video")
+
+        fps = capture.get(cv2.CAP_PROP_FPS) or 25.0
+        step = max(1, int(round(fps / VIDEO_SAMPLE_FPS)))
+        max_frames = int(fps * VIDEO_MAX_SECONDS)
+
+        kept = []               # min-heap of (sharpness, frame_no, jpeg)
+        scene_ref = None        # thumbnail of the scene's first frame
+        best = None             # (sharpness, frame_no, frame) of the current scene
+        info = {"frames_read": 0, "frames_sampled": 0, "scenes": 0}
+
+        def close_scene():
+            if best is None or best[0] < VIDEO_MIN_SHARPNESS:
+                return
+            info["scenes"] += 1
+            entry = (best[0], best[1], _encode(best[2]))
+            if len(kept) < VIDEO_MAX_KEYFRAMES:
+                heapq.heappush(kept, entry)
+            elif entry[0] > kept[0][0]:
+                heapq.heapreplace(kept, entry)
+
+        try:
+            frame_no = -1
+            while frame_no + 1 < max_frames:
+                frame_no += 1
+                # grab() skips decoding of frames that are not sampled
+                if not capture.grab():
+                    break
+                info["frames_read"] += 1
+                if frame_no % step:
+                    continue
+
+                ok, frame = capture.retrieve()
+                if not ok:
+                    break
+                info["frames_sampled"] += 1
+
+                gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+                thumbnail = _resize_to_width(gray, THUMBNAIL_WIDTH).astype(np.float32) / 255.0
+                sharpness = float(laplacian_variance(_resize_to_width(gray, SHARPNESS_WIDTH)))
+
+                if scene_ref is None or float(np.abs(thumbnail - scene_ref).mean()) > VIDEO_SCENE_DIFF:
+                    close_scene()
+                    scene_ref, best = thumbnail, None
+
+                if best is None or sharpness > best[0]:
+                    best = (sharpness, frame_no, frame)
+
+            close_scene()
+        finally:
+            capture.release()
+
+    keyframes = [
+        {"bytes": jpeg, "timestamp": round(frame_no / fps, 2), "sharpness": round(sharpness, 2)}
+        for sharpness, frame_no, jpeg in sorted(kept, key=lambda entry: entry[1])
+    ]
+    return keyframes, info
+
+
+def keyframe_files(keyframes):
+    """Keyframes as file-like objects for the still-image pipelines."""
+    return [io.BytesIO(keyframe["bytes"]) for keyframe in keyframes]
+
+
+def expand_uploads(files, video_files=()):
+    """
+    Uploaded stills plus the keyframes of any uploaded clips. Everything in
+    video_files is a clip; in files, those named or typed as video are.
+    Returns (image files, [{"filename", "keyframes" (timestamps), ...info}]).
+    Raises VideoError for a clip that is too large or cannot be decoded.
+    """
+    images, videos = [], []
+    clips = list(video_files)
+    for f in files:
+        if is_video(getattr(f, "filename", ""), getattr(f, "mimetype", None)):
+            clips.append(f)
+        else:
+            images.append(f)
+
+    for f in clips:
+        keyframes, info = extract_keyframes(f.stream if hasattr(f, "stream") else f)
+        images.extend(keyframe_files(keyframes))
+        videos.append({
+            "filename": getattr(f, "filename", None),
+            "keyframes": [k["timestamp"] for k in keyframes],
+            **info,
+        })
+    return images, videos
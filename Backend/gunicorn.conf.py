@@ -0,0 +1,96 @@
+import glob
+import multiprocessing
+import os
+
+# -------------------------
+# Production serving profile (gunicorn -c gunicorn.conf.py wsgi:app)
+# -------------------------
+
+bind = os.getenv("GUNICORN_BIND", f"0.0.0.0:{os.getenv('PORT', '5000')}")
+
+# Worker processes x threads per worker. Requests mostly wait on S3 /
+# Rekognition, so threads (gthread) are cheap concurrency inside a worker.
+# WEB_CONCURRENCY is exported with the default filled in: the per-process
+# AWS / SNS rate limits divide their budgets by it (core.rate_limiter).
+os.environ.setdefault("WEB_CONCURRENCY", str(multiprocessing.cpu_count() * 2 + 1))
+workers = int(os.environ["WEB_CONCURRENCY"])
+threads = int(os.getenv("GUNICORN_THREADS", 4))
+worker_class = "gthread"
+
+# /take_attendance runs one compare_faces per reference image per group
+# photo, so a single request can legitimately take minutes.
+timeout = int(os.getenv("GUNICORN_TIMEOUT", 300))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", 120))
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", 5))
+
+# Recycle workers now and then to cap memory growth from pandas/cv2
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", 1000))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", 100))
+
+# Import the app once in the master; workers are forked from it
+preload_app = True
+
+# Prometheus multiprocess mode: each worker writes its samples under this
+# directory and /metrics merges them. Set before the app (and so
+# prometheus_client) is imported, and emptied so a restart does not resume
+# the previous run's counters.
+PROMETHEUS_MULTIPROC_DIR = os.environ.setdefault(
+    "PROMETHEUS_MULTIPROC_DIR", "/tmp/attendance-prometheus"
+)
+os.makedirs(PROMETHEUS_MULTIPROC_DIR, exist_ok=True)
+for stale in glob.glob(os.path.join(PROMETHEUS_MULTIPROC_DIR, "*.db")):
+    os.remove(stale)
+
+accesslog = "-"
+errorlog = "-"
+loglevel = os.getenv("GUNICORN_LOG_LEVEL", "info")
+
+# Heavy libraries imported in the master before forking, so every worker
+# shares them copy-on-write instead of paying the import on first request.
+PRELOAD_MODULES = [
+    m.strip() for m in os.getenv("GUNICORN_PRELOAD_MODULES", "pandas,openpyxl").split(",") if m.strip()
+]
+
+
+def when_ready(server):
+    import importlib
+
+    for module in PRELOAD_MODULES:
+        try:
+            importlib.import_module(module)
+        except ImportError as e:
+            server.log.warning("Could not preload %s: %s", module, e)
+
+
+def post_fork(server, worker):
+    # boto3 clients must not be shared across processes: drop anything the
+    # master created so each worker builds its own (shared by its threads).
+    from core.aws_clients import reset_clients
+    from core.eligibility_snapshot import start_snapshot_scheduler
+
+    reset_clients()
+    # -w / --workers on the command line overrides this file: keep the
+    # rate limiters' divisor in line with what is actually running
+    os.environ["WEB_CONCURRENCY"] = str(server.cfg.workers)
+    # Threads do not survive the fork: each worker refreshes its own copy
+    start_snapshot_scheduler()
+
+
+def child_exit(server, worker):
+    # Keep live-only gauges (e.g. the per-worker Rekognition rate) accurate
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
+
+
+def post_worker_init(worker):
+    if os.getenv("WARM_AWS_CLIENTS", "1") != "1":
+        return
+
+    from core.aws_clients import get_client
+
+    for service in ("s3", "rekognition"):
+        try:
+            get_client(service)
+        except Exception as e:
+            worker.log.warning("Could not create %s client: %s", service, e)
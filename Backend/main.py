@@ -3,26 +3,31 @@ import sys
 import io
 import csv
 from datetime import datetime, timedelta, timezone
-import boto3
 from flask import jsonify
 import time
+import uuid
 import logging
 # from core.list_s3_reports import list_s3_reports
 from dotenv import load_dotenv
 from flask import (
     Flask, render_template, request, redirect, url_for,
-    session, send_file, jsonify
+    session, send_file, jsonify, g
 )
 from flask_cors import CORS
 from flask import send_from_directory
 from werkzeug.utils import secure_filename
-from prometheus_client import Counter, Histogram, generate_latest, CONTENT_TYPE_LATEST
+from prometheus_client import (
+    CollectorRegistry, Counter, Histogram, generate_latest, multiprocess, CONTENT_TYPE_LATEST
+)
 
 sys.dont_write_bytecode = True
 
 # Load .env variables
 load_dotenv()
 
+from core.tracing import TRACING, end_span, recent_traces, start_span
+from core.request_profiler import admin_authorized, admin_forbidden
+
 AWS_REGION = os.getenv("AWS_REGION", "ap-south-1")
 AWS_ACCESS_KEY = os.getenv("AWS_ACCESS_KEY")
 AWS_SECRET_KEY = os.getenv("AWS_SECRET_KEY")
@@ -72,21 +77,40 @@ REQUEST_COUNT = Counter(
     ["method", "endpoint", "status"]
 )
 
+# Attendance requests run for seconds to minutes, so the default buckets
+# (which stop at 10s) would put most of them in +Inf
 REQUEST_LATENCY = Histogram(
     "flask_http_request_latency_seconds",
     "Request latency",
-    ["endpoint"]
+    ["endpoint"],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300)
 )
 
 @app.before_request
 def start_timer():
-    request.start_time = time.time()
+    request.start_time = time.perf_counter()
+    # Caller's X-Request-ID or a new one; echoed back, recorded in saved profiles
+    g.request_id = request.headers.get("X-Request-ID") or uuid.uuid4().hex
+    # Root span of the request (core.tracing; no-op unless TRACING is set)
+    route = request.url_rule.rule if request.url_rule else "<unmatched>"
+    g.trace_span = start_span(f"{request.method} {route}", **{
+        "http.method": request.method,
+        "http.route": route,
+        "http.target": request.path,
+        "request_id": g.request_id,
+    })
+
+@app.teardown_request
+def end_request_span(error=None):
+    end_span(g.pop("trace_span", None), error=error, **{"http.status_code": g.pop("status_code", None)})
 
 @app.after_request
 def record_metrics(response):
     try:
-        endpoint = request.path
-        duration = time.time() - request.start_time
+        # The matched route ("/api/student/<er_number>"), not the raw path,
+        # so there is one series per route rather than per student or file
+        endpoint = request.url_rule.rule if request.url_rule else "<unmatched>"
+        duration = time.perf_counter() - request.start_time
 
         REQUEST_COUNT.labels(
             method=request.method,
@@ -95,14 +119,35 @@ def record_metrics(response):
         ).inc()
 
         REQUEST_LATENCY.labels(endpoint).observe(duration)
+        g.status_code = response.status_code
+        response.headers["X-Request-ID"] = g.request_id
     except Exception:
         pass
     return response
 
+
 @app.route("/metrics")
 def metrics():
+    # Under gunicorn (PROMETHEUS_MULTIPROC_DIR set) every worker writes its
+    # samples to that directory and any worker serves the merged view
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), 200, {"Content-Type": CONTENT_TYPE_LATEST}
     return generate_latest(), 200, {"Content-Type": CONTENT_TYPE_LATEST}
 
+
+@app.route("/api/traces")
+def traces():
+    # Recent traces kept by TRACING=memory, newest last. Span attributes
+    # include S3 keys naming students, so admins only (as /admin/profiles)
+    if not admin_authorized():
+        return admin_forbidden()
+    if TRACING != "memory":
+        return jsonify({"success": False, "error": "Set TRACING=memory to keep traces"}), 404
+    limit = request.args.get("limit", 20, type=int)
+    return jsonify({"success": True, "traces": recent_traces(limit)})
+
 # -------------------------
 # Global Error Handlers (return JSON for API errors)
 # -------------------------
@@ -118,26 +163,18 @@ def internal_error(error):
 def handle_exception(e):
     return jsonify({"error": "An error occurred", "details": str(e)}), 500
 
-# Initialize AWS clients
-rekognition_client = boto3.client(
-    "rekognition",
-    region_name=AWS_REGION,
-    aws_access_key_id=AWS_ACCESS_KEY,
-    aws_secret_access_key=AWS_SECRET_KEY
-)
-s3_client = boto3.client(
-    "s3",
-    region_name=AWS_REGION,
-    aws_access_key_id=AWS_ACCESS_KEY,
-    aws_secret_access_key=AWS_SECRET_KEY
-)
+# AWS clients are created on first use and shared (see core.aws_clients)
+from core.aws_clients import get_client
 
 # Import core functions
 from core.upload_to_s3 import upload_multiple_images
 from core.update_excel import sync_students_to_excel
 from core.mark_batch_attendance import mark_batch_attendance_s3
+from core.video_keyframes import VideoError, expand_uploads
+from core.notifications import normalize_phone
 from core.generate_attendance_charts import generate_overall_attendance
 from core.overview import dashboard_bp
+from core.response_cache import invalidate_reports_cache
 
 USER = {'username': 'admin', 'password': 'admin'}
 
@@ -206,6 +243,12 @@ def upload_image():
        or not image_files or not any(getattr(f, 'filename', '') for f in image_files):
         return jsonify({"error": "❌ All fields are required and images must be selected."}), 400
 
+    # Stored in E.164 so absence alerts can text it as-is
+    phone = normalize_phone(parent_phone)
+    if phone is None:
+        return jsonify({"error": "❌ Parent phone must be a valid phone number."}), 400
+    parent_phone = phone
+
     try:
         # ✅ Upload images to S3 (FIXED CALL)
         upload_results = upload_multiple_images(
@@ -264,25 +307,39 @@ def take_attendance():
         batch_name = request.form.get('batch_name')
         subject_name = request.form.get('subject_name')
         lab_name = request.form.get('lab_name', '')
+        tiling = request.form.get('tiling') or None   # auto / on / off
 
-        group_images = request.files.getlist('class_images')
-        if not batch_name or not subject_name or not group_images:
+        uploads = request.files.getlist('class_images')
+        clips = request.files.getlist('class_video')
+        if not batch_name or not subject_name or not (uploads or clips):
             return jsonify({"success": False, "error": "Batch, Subject, and class_images are required"}), 400
+        if tiling not in (None, "auto", "on", "off"):
+            return jsonify({"success": False, "error": "tiling must be auto, on or off"}), 400
+
+        # Clips are reduced to a few sharp, distinct keyframes
+        group_images, videos = expand_uploads(uploads, clips)
+        if not group_images:
+            return jsonify({"success": False, "error": "No usable frames found in the uploaded video"}), 400
 
         # Run batch attendance
-        attendance_list, absent_students, file_url, quality_reports = mark_batch_attendance_s3(
+        attendance_list, absent_students, file_url, quality_reports, session_stats = mark_batch_attendance_s3(
             batch_name=batch_name,
             class_name=lab_name,
             subject=subject_name,
-            group_image_files=group_images
+            group_image_files=group_images,
+            tiling=tiling
         )
         return jsonify({
             "success": True,
             "present": attendance_list,      # full objects with er_number + name
             "absent": absent_students,       # full objects with er_number + name
             "report_url": file_url,
-            "quality_reports": quality_reports # ✅ Return quality reports
+            "quality_reports": quality_reports, # ✅ Return quality reports
+            "session": session_stats,           # matching work done / saved
+            "videos": videos                    # keyframes taken from clips
         }), 200
+    except VideoError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
 
@@ -341,12 +398,13 @@ def download_attendance():
 
     try:
         # ✅ Upload CSV to S3 with public-read ACL
-        s3_client.upload_fileobj(
+        get_client("s3").upload_fileobj(
             csv_bytes,
             "ict-attendances",
             s3_key,
             ExtraArgs={'ACL': 'public-read'}   # 👈 makes file public
         )
+        invalidate_reports_cache()
 
         # ✅ Permanent Public URL
         public_url = f"https://ict-attendances.s3.ap-south-1.amazonaws.com/{s3_key}"
@@ -378,7 +436,7 @@ def upload_excel():
     file = request.files['file']
     batch_name = request.form.get('batch_name', 'default_batch')
     from werkzeug.utils import secure_filename
-    s3 = boto3.client('s3')
+    s3 = get_client("s3")
     s3.upload_fileobj(file, BUCKET_NAME, f"{batch_name}/{filename}")
 
     return jsonify({"success": True, "message": "File uploaded to S3"})
@@ -387,6 +445,7 @@ def upload_excel():
 @app.route("/api/reports", methods=["GET"])
 def list_reports():
     try:
+        s3_client = get_client("s3")
         response = s3_client.list_objects_v2(Bucket=BUCKET_NAME, Prefix="reports/")
 
         reports = []
@@ -433,7 +492,7 @@ def list_reports():
 def students_count():
     try:
         # Example: read students Excel file from S3
-        s3_obj = s3_client.get_object(Bucket=BUCKET_NAME, Key="students.xlsx")
+        s3_obj = get_client("s3").get_object(Bucket=BUCKET_NAME, Key="students.xlsx")
         body = s3_obj["Body"].read()
 
         import pandas as pd, io
@@ -449,7 +508,8 @@ def students_count():
 
 # from core.generate_attendance_charts import generate_charts
 from flask import Flask, render_template
-from core.generate_attendance_charts import generate_overall_attendance, get_student_details
+from core.generate_attendance_charts import generate_overall_attendance, get_student_details, render_subject_pie_chart
+from core.eligibility_snapshot import latest_snapshot, snapshot_info, start_snapshot_scheduler
 
 # app = Flask(__name__)
 
@@ -458,7 +518,7 @@ def dashboard():
     if not session.get('logged_in'):
         return redirect(url_for('login'))
     try:
-        charts = generate_overall_attendance()
+        charts = generate_overall_attendance(chart="png")
 
         return render_template(
             "dashboard.html",
@@ -474,14 +534,22 @@ def dashboard():
 @app.route('/api/eligibility', methods=['GET'])
 def api_eligibility():
     try:
-        charts = generate_overall_attendance()
-        # Transform for frontend - extracting students list with percentage
-        students = charts.get("students", [])
-        return jsonify({
+        # Chart is opt-in for JSON callers: ?chart=svg or ?chart=data
+        chart = request.args.get('chart')
+        if chart and chart not in ("svg", "data"):
+            return jsonify({"success": False, "error": "chart must be 'svg' or 'data'"}), 400
+
+        # Served from the latest eligibility snapshot (core.eligibility_snapshot)
+        snapshot = latest_snapshot()
+        payload = {
             "success": True,
-            "students": students,
-            "avg_attendance": charts.get("avg_attendance_pct", "0%")
-        })
+            "students": snapshot["students"],
+            "avg_attendance": snapshot["avg_attendance_pct"],
+            "snapshot": snapshot_info(snapshot)
+        }
+        if chart:
+            payload["subject_chart"] = render_subject_pie_chart(snapshot["subject_summary"], chart)
+        return jsonify(payload)
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
 
@@ -500,9 +568,23 @@ def api_student_details(er_number):
 
 
 from core.overview import dashboard_bp
+from core.async_attendance import async_bp
+from core.live_sessions import live_bp
+from core.request_profiler import init_profiling
 # Register Blueprints
 app.register_blueprint(dashboard_bp)
+app.register_blueprint(async_bp)
+app.register_blueprint(live_bp)
+
+# Opt-in profiling of slow / flagged requests, served under /admin/profiles
+init_profiling(app)
 
+# Eligibility / low-attendance snapshots are rebuilt in the background, but
+# not at import: under gunicorn's preload a master thread holding the build
+# lock would be forked into every worker. gunicorn starts the scheduler in
+# post_fork (gunicorn.conf.py); the development server starts it here.
 if __name__ == '__main__':
-    print("[INFO] Starting Flask server on http://0.0.0.0:5000 ...")
-    app.run(host="0.0.0.0", port=5000, debug=True)
\ No newline at end of file
+    start_snapshot_scheduler()
+    port = int(os.getenv("PORT", 5000))
+    print(f"[INFO] Starting Flask server on http://0.0.0.0:{port} ...")
+    app.run(host="0.0.0.0", port=port, debug=True)
\ No newline at end of file
@@ -0,0 +1,10 @@
+"""
+WSGI entrypoint for production serving:
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+`python main.py` remains the development server.
+"""
+from main import app
+
+application = app